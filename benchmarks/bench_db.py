@@ -0,0 +1,234 @@
+"""
+Database track: todo DAL reads and the full flask request cycle of each route.
+Runs against the database configured in the env (see DB_BACKEND), which must already be migrated.
+The benchmark users and their todos are deleted once done.
+
+Usage:
+    python -m benchmarks.bench_db --sizes 10 1000 100000
+"""
+
+import argparse
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+from benchmarks.harness import Results, calls_for, measure
+from src.common import PriorityType
+from src.core import Todo, TodoQuery, User, set_password
+from src.data import (
+    TransactionManager,
+    delete_todos,
+    delete_user,
+    get_todos_from_user,
+    get_todos_page_from_user,
+    iter_todos_from_user,
+    save_todos,
+    save_user,
+    search_todos,
+)
+
+BENCHMARK_PASSWORD = "benchmark_password"
+_SEED_BATCH_SIZE = 1000
+_ROUTE_LIST_SIZE = 1000
+_BULK_SIZE = 100
+
+
+def _new_todos(user_id: int, size: int) -> List[Todo]:
+    now = datetime.now()
+    priorities = list(PriorityType)
+    return [
+        Todo(
+            id=None,
+            user_id=user_id,
+            description=f"Benchmark todo {i}",
+            date_created=now,
+            date_due=now + timedelta(days=i % 30) if i % 3 else None,
+            priority=priorities[i % len(priorities)],
+            completed=bool(i % 2),
+        )
+        for i in range(size)
+    ]
+
+
+def create_user(size: int) -> User:
+    """
+    Saves a benchmark user with the given amount of todos.
+    """
+    user = User(id=None, username=f"benchmark_{uuid.uuid4().hex[:12]}", password=None)
+    set_password(user, BENCHMARK_PASSWORD)
+
+    with TransactionManager() as conn:
+        user.id = save_user(user, conn)
+
+    for start in range(0, size, _SEED_BATCH_SIZE):
+        with TransactionManager() as conn:
+            save_todos(_new_todos(user.id, min(_SEED_BATCH_SIZE, size - start)), conn)
+
+    return user
+
+
+def remove_user(user: User):
+    """
+    Deletes a benchmark user along with all of its todos.
+    """
+    with TransactionManager() as conn:
+        todo_ids = [x.id for x in get_todos_from_user(user.id, conn)]
+        for start in range(0, len(todo_ids), _SEED_BATCH_SIZE):
+            delete_todos(todo_ids[start : start + _SEED_BATCH_SIZE], user.id, conn)
+        delete_user(user, conn)
+
+
+def run_dal(sizes: List[int]) -> Results:
+    results: Results = {}
+    query = TodoQuery()
+
+    for size in sizes:
+        user = create_user(size)
+        number = calls_for(size, budget=2_000)
+        try:
+            with TransactionManager(debug=True) as conn:
+                results[f"dal.get_todos_from_user.{size}"] = measure(
+                    lambda: get_todos_from_user(user.id, conn), number=number
+                )
+                results[f"dal.iter_todos_from_user.{size}"] = measure(
+                    lambda: sum(1 for _ in iter_todos_from_user(user.id, query, conn)),
+                    number=number,
+                )
+                results[f"dal.get_todos_page_from_user.{size}"] = measure(
+                    lambda: get_todos_page_from_user(user.id, query, 100, None, conn),
+                    number=10,
+                )
+                # every todo matches, so every one of them is ranked
+                results[f"dal.search_todos.{size}"] = measure(
+                    lambda: search_todos(user.id, "benchmark", 100, None, conn),
+                    number=10,
+                )
+        finally:
+            remove_user(user)
+
+    return results
+
+
+def _create_app():
+    from src.main import create_app
+
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["WTF_CSRF_ENABLED"] = False
+    return app
+
+
+def run_routes() -> Results:
+    results: Results = {}
+    app = _create_app()
+    user = create_user(_ROUTE_LIST_SIZE)
+
+    try:
+        client = app.test_client()
+        login = {"username": user.username, "password": BENCHMARK_PASSWORD}
+        results["route.users.login"] = measure(
+            lambda: client.post("/users/login", json=login), number=1, repeat=3
+        )
+        results["route.users.put"] = measure(
+            lambda: client.put("/users/", json={"username": user.username}), number=10
+        )
+        results["route.csrf"] = measure(lambda: client.get("/csrf"), number=100)
+
+        todo = {
+            "description": "Benchmark todo",
+            "date_due": datetime.now().isoformat(),
+            "priority": PriorityType.NORMAL,
+            "completed": False,
+        }
+        results["route.enforce_json"] = measure(
+            lambda: _preprocess(app, todo), number=100
+        )
+
+        first_page = client.get("/todos/?limit=100")
+        results[f"route.todos.get.{_ROUTE_LIST_SIZE}"] = measure(
+            lambda: client.get("/todos/?limit=100"), number=10
+        )
+        results[f"route.todos.get_not_modified.{_ROUTE_LIST_SIZE}"] = measure(
+            lambda: client.get(
+                "/todos/?limit=100", headers={"If-None-Match": first_page.headers["ETag"]}
+            ),
+            number=10,
+        )
+        results[f"route.todos.get_stream.{_ROUTE_LIST_SIZE}"] = measure(
+            lambda: client.get("/todos/?stream=true").get_data(), number=2
+        )
+        results[f"route.todos.search.{_ROUTE_LIST_SIZE}"] = measure(
+            lambda: client.get("/todos/search?q=benchmark&limit=100"), number=10
+        )
+
+        results["route.todos.post"] = measure(
+            lambda: client.post("/todos/", json=todo), number=10
+        )
+        with TransactionManager() as conn:
+            # dumped here instead of reusing the GET response, whose dates aren't in the format the routes take
+            existing_todos = [
+                x.to_todo().model_dump(mode="json")
+                for x in get_todos_from_user(user.id, conn)
+            ]
+        existing = {**existing_todos[0], "description": "Updated benchmark todo"}
+        results["route.todos.put"] = measure(
+            lambda: client.put("/todos/", json=existing), number=10
+        )
+        # 1 warm up + 5 repeats, of 10 single deletes and then of 2 bulk deletes
+        created = _post_todo_ids(client, todo, 6 * 10 + 6 * 2 * _BULK_SIZE)
+        results["route.todos.delete"] = measure(
+            lambda: client.delete(f"/todos/{next(created)}"), number=10
+        )
+
+        bulk = {"todos": [todo] * _BULK_SIZE}
+        results[f"route.todos.bulk_post.{_BULK_SIZE}"] = measure(
+            lambda: client.post("/todos/bulk", json=bulk), number=2
+        )
+        bulk_existing = {"todos": existing_todos[:_BULK_SIZE]}
+        results[f"route.todos.bulk_put.{_BULK_SIZE}"] = measure(
+            lambda: client.put("/todos/bulk", json=bulk_existing), number=2
+        )
+        results[f"route.todos.bulk_delete.{_BULK_SIZE}"] = measure(
+            lambda: client.delete(
+                "/todos/bulk", json={"ids": [next(created) for _ in range(_BULK_SIZE)]}
+            ),
+            number=2,
+        )
+    finally:
+        remove_user(user)
+
+    return results
+
+
+def _preprocess(app, todo):
+    with app.test_request_context("/todos/", method="POST", json=todo):
+        app.preprocess_request()
+
+
+def _post_todo_ids(client, todo, count: int) -> Iterator[int]:
+    # the todos to delete are created before timing
+    todo_ids: List[int] = []
+    while len(todo_ids) < count:
+        response = client.post("/todos/bulk", json={"todos": [todo] * _BULK_SIZE})
+        todo_ids.extend(x["id"] for x in response.get_json()["data"]["results"])
+
+    return iter(todo_ids)
+
+
+def run(sizes: List[int]) -> Results:
+    return {**run_dal(sizes), **run_routes()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100_000])
+    args = parser.parse_args()
+
+    for name, result in run(args.sizes).items():
+        print(f"{name:<40} | median: {result['median_ms']:10.3f}ms | min: {result['min_ms']:10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Measures how many logins (password checks) per second the password hasher sustains.
+
+Usage:
+    python -m benchmarks.bench_hashing --workers 1 2 4 --logins 64
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.hashing import PasswordHasher
+
+
+def bench_logins(workers: int, logins: int, method: str) -> float:
+    """
+    Returns the amount of password checks per second done by a hasher with the given amount of processes.
+    """
+    hasher = PasswordHasher(
+        workers=workers,
+        queue_depth=logins,
+        method=method,
+        salt_length=16,
+        timeout=600,
+    )
+    password_hash = hasher.hash("benchmark_password")  # also starts the pool before timing
+
+    # one thread per pending login, the same way concurrent requests would wait on the pool
+    with ThreadPoolExecutor(max_workers=logins) as clients:
+        start = time.perf_counter()
+        results = list(
+            clients.map(
+                lambda _: hasher.verify(password_hash, "benchmark_password"),
+                range(logins),
+            )
+        )
+        elapsed = time.perf_counter() - start
+
+    hasher.shutdown()
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--method", default=os.getenv("HASH_METHOD", "scrypt:32768:8:1"))
+    args = parser.parse_args()
+
+    print(f"method: {args.method}, logins per run: {args.logins}, cpus: {os.cpu_count()}")
+    for workers in args.workers:
+        rate = bench_logins(workers, args.logins, args.method)
+        cores = min(workers, os.cpu_count() or 1)
+        print(f"workers: {workers:>3} | logins/sec: {rate:8.1f} | logins/sec per core: {rate / cores:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Load test comparing gunicorn sync workers against gevent workers (SERVER_MODE=gevent): every client logs in
+as the same benchmark user and lists its todos in a loop, one connection per request, for a fixed duration.
+Reports the requests per second, the p50 and p99 latencies and the failed requests at each concurrency.
+Runs against the database configured in the env (see DB_BACKEND), which must already be migrated.
+
+Usage:
+    python -m benchmarks.bench_load --clients 10 100 1000 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import urllib.request
+from http.cookiejar import CookieJar
+from typing import Dict, List, Tuple
+
+from benchmarks.bench_db import BENCHMARK_PASSWORD, create_user, remove_user
+from benchmarks.harness import start_gunicorn, wait_until_up
+from src.core import User
+
+_MODES: Dict[str, List[str]] = {
+    "sync": ["-k", "sync"],
+    "gevent": ["-k", "gevent", "--worker-connections", "100"],
+}
+
+
+def _login(url: str, user: User) -> str:
+    # the session cookie of a logged in user, csrf included
+    cookies = CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookies))
+    with opener.open(f"{url}/csrf") as response:
+        csrf_token = json.load(response)["csrf_token"]
+
+    request = urllib.request.Request(
+        f"{url}/users/login",
+        data=json.dumps({"username": user.username, "password": BENCHMARK_PASSWORD}).encode(),
+        headers={"Content-Type": "application/json", "X-CSRF-Token": csrf_token},
+        method="POST",
+    )
+    opener.open(request).close()
+    return "; ".join(f"{x.name}={x.value}" for x in cookies)
+
+
+async def _get(port: int, path: str, cookie: str) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(
+            (
+                f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\nConnection: close\r\n\r\n"
+            ).encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()  # the rest of the response, until the server closes the connection
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def _load(port: int, path: str, cookie: str, clients: int, duration: float) -> Tuple[List[float], int]:
+    latencies: List[float] = []
+    failures = 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal failures
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(_get(port, path, cookie), timeout=30)
+            except (OSError, asyncio.TimeoutError):
+                status = 0
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                failures += 1
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, failures
+
+
+def bench_load(mode: str, workers: int, clients: List[int], duration: float, user: User) -> Dict[int, Dict[str, float]]:
+    """
+    Returns the requests per second, p50 and p99 latencies in milliseconds and the amount of failed requests
+    of a gunicorn server in the given mode, for each amount of concurrent clients.
+    """
+    env = {**os.environ, "SERVER_MODE": mode if mode == "gevent" else "sync"}
+    server, url = start_gunicorn(["-w", str(workers), "--backlog", "2048", *_MODES[mode]], env=env)
+    try:
+        wait_until_up(server, url)
+        cookie = _login(url, user)
+        port = int(url.rsplit(":", 1)[1])
+
+        results: Dict[int, Dict[str, float]] = {}
+        for amount in clients:
+            latencies, failures = asyncio.run(_load(port, "/todos/", cookie, amount, duration))
+            latencies.sort()
+            results[amount] = {
+                "rps": len(latencies) / duration,
+                "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+                "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+                "failures": failures,
+            }
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=list(_MODES), default=list(_MODES))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--todos", type=int, default=100)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    user = create_user(args.todos)
+    try:
+        print(f"workers: {args.workers}, todos listed per request: {args.todos}, {args.duration}s per run")
+        for mode in args.modes:
+            for amount, result in bench_load(mode, args.workers, args.clients, args.duration, user).items():
+                print(
+                    f"{mode:<7} | clients: {amount:>5}"
+                    + f" | req/s: {result['rps']:8.1f}"
+                    + f" | p50: {result['p50_ms']:8.1f}ms"
+                    + f" | p99: {result['p99_ms']:8.1f}ms"
+                    + f" | failed: {result['failures']:>5}"
+                )
+    finally:
+        remove_user(user)
+
+
+if __name__ == "__main__":
+    main()
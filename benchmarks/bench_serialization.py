@@ -0,0 +1,121 @@
+"""
+Pure python track: row to todo conversion and list serialisation, no database needed.
+The trusted read path (TodoRecord) is measured next to the validated one (Todo) it replaced.
+
+Usage:
+    python -m benchmarks.bench_serialization --sizes 10 1000 100000
+"""
+
+import argparse
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import List
+
+from flask import Flask
+
+from benchmarks.harness import Results, calls_for, measure
+from src.common import PriorityType
+from src.core import Todo, TodoRecord
+from src.data.todo_methods import _record_from_row
+from src.routes import FastJSONProvider
+from src.routes.compression import _compressors
+from src.routes.responses import success_response
+
+_Row = namedtuple(
+    "_Row", "id user_id description date_created date_due priority completed"
+)
+
+
+def make_rows(size: int) -> List[_Row]:
+    """
+    Returns rows shaped like the ones returned by the todo queries.
+    """
+    now = datetime.now()
+    priorities = [x.name for x in PriorityType]
+    return [
+        _Row(
+            id=i,
+            user_id=1,
+            description=f"Benchmark todo {i}",
+            date_created=now,
+            date_due=now + timedelta(days=i % 30) if i % 3 else None,
+            priority=priorities[i % len(priorities)],
+            completed=bool(i % 2),
+        )
+        for i in range(1, size + 1)
+    ]
+
+
+def _validated_from_row(td: _Row) -> Todo:
+    # how rows were read before TodoRecord
+    return Todo(
+        id=td.id,
+        user_id=td.user_id,
+        description=td.description,
+        date_created=td.date_created,
+        date_due=td.date_due,
+        priority=PriorityType[td.priority],
+        completed=td.completed,
+    )
+
+
+def _compress(compressor, body: bytes) -> bytes:
+    return compressor.compress(body) + compressor.flush()
+
+
+def run(sizes: List[int]) -> Results:
+    results: Results = {}
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    default_app = Flask(__name__)  # flask's own provider, for comparison
+    compressors = _compressors({"gzip": 6, "br": 4, "zstd": 3})
+
+    for size in sizes:
+        rows = make_rows(size)
+        records: List[TodoRecord] = [_record_from_row(x) for x in rows]
+        todos: List[Todo] = [x.to_todo() for x in records]
+        dumped = [x.to_dict() for x in records]
+        number = calls_for(size)
+
+        results[f"todo.record_from_row.{size}"] = measure(
+            lambda: [_record_from_row(x) for x in rows], number=number
+        )
+        results[f"todo.validated_from_row.{size}"] = measure(
+            lambda: [_validated_from_row(x) for x in rows], number=number
+        )
+        results[f"todo.record_to_dict.{size}"] = measure(
+            lambda: [x.to_dict() for x in records], number=number
+        )
+        results[f"todo.model_dump.{size}"] = measure(
+            lambda: [x.model_dump() for x in todos], number=number
+        )
+
+        with app.app_context():
+            results[f"response.success.{size}"] = measure(
+                lambda: success_response(200, dumped).get_data(), number=number
+            )
+        with default_app.app_context():
+            results[f"response.success_default_json.{size}"] = measure(
+                lambda: success_response(200, dumped).get_data(), number=number
+            )
+
+        body = app.json.dumps_bytes(dumped)
+        for encoding, compressor in compressors.items():
+            results[f"response.compress_{encoding}.{size}"] = measure(
+                lambda: _compress(compressor(), body), number=number
+            )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100_000])
+    args = parser.parse_args()
+
+    for name, result in run(args.sizes).items():
+        print(f"{name:<40} | median: {result['median_ms']:10.3f}ms | min: {result['min_ms']:10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
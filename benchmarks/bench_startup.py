@@ -0,0 +1,83 @@
+"""
+Measures how long gunicorn takes to start answering requests and how much memory its processes use,
+with and without --preload. Runs against the database configured in the env (see DB_BACKEND), Linux only.
+PSS splits the pages shared between processes (ex. the code imported before the fork) among them,
+so unlike RSS its total is the memory actually used.
+
+Usage:
+    python -m benchmarks.bench_startup --workers 4 --runs 3
+"""
+
+import argparse
+import os
+import statistics
+import time
+from typing import Dict, List
+
+from benchmarks.harness import start_gunicorn, wait_until_up
+
+
+def _children(pid: int) -> List[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as file:
+        return [int(x) for x in file.read().split()]
+
+
+def _memory_kb(pid: int) -> Dict[str, int]:
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                memory[key.lower()] = int(value.split()[0])
+    return memory
+
+
+def bench_startup(workers: int, preload: bool, settle: float) -> Dict[str, float]:
+    """
+    Returns the seconds until the server answered its first request and the total rss and pss
+    in megabytes of the gunicorn master and its workers once they all started.
+    """
+    options = ["-w", str(workers)]
+    if preload:
+        options.append("--preload")
+
+    start = time.perf_counter()
+    server, url = start_gunicorn(options)
+    try:
+        wait_until_up(server, url)
+        ready = time.perf_counter() - start
+
+        time.sleep(settle)  # lets the other workers finish loading the app
+        pids = [server.pid, *_children(server.pid)]
+        memory = [_memory_kb(x) for x in pids]
+        return {
+            "ready_s": ready,
+            "rss_mb": sum(x["rss"] for x in memory) / 1024,
+            "pss_mb": sum(x["pss"] for x in memory) / 1024,
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--settle", type=float, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    print(f"workers: {args.workers}, runs: {args.runs} (medians)")
+    for preload in (False, True):
+        runs = [bench_startup(args.workers, preload, args.settle) for _ in range(args.runs)]
+        print(
+            f"preload: {str(preload):<5}"
+            + f" | ready: {statistics.median(x['ready_s'] for x in runs):6.3f}s"
+            + f" | rss: {statistics.median(x['rss_mb'] for x in runs):7.1f}MB"
+            + f" | pss: {statistics.median(x['pss_mb'] for x in runs):7.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
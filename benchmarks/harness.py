@@ -0,0 +1,121 @@
+"""
+Timing and baseline helpers shared by the benchmark tracks.
+"""
+
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Callable, Dict, List, Optional, Tuple
+
+Results = Dict[str, Dict[str, float]]
+
+
+def measure(fn: Callable, number: int = 1, repeat: int = 5) -> Dict[str, float]:
+    """
+    Times the function and returns the minimum and median milliseconds per call over the repeats.
+    Parameters:
+        - fn: The function to time, called without arguments
+        - number: The amount of calls per repeat, the time of a repeat is divided by it
+        - repeat: The amount of times the calls are timed
+    Returns:
+        A dict with the min_ms and median_ms per call.
+
+    Usage:
+        results["todo.model_dump.1000"] = measure(lambda: [x.model_dump() for x in todos], number=10)
+    """
+    fn()  # warms up caches, lazy imports and the statement registry before timing
+
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+
+    return {
+        "min_ms": min(timings) * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+    }
+
+
+def calls_for(size: int, budget: int = 10_000) -> int:
+    """
+    Returns the amount of calls per repeat for a benchmark over the given amount of items,
+    so every size processes roughly the same amount of items per repeat.
+    """
+    return max(1, budget // size)
+
+
+def save_results(path: str, results: Results):
+    """
+    Writes the results as a json baseline.
+    """
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path: str) -> Results:
+    """
+    Reads a json baseline written by save_results.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def find_regressions(results: Results, baseline: Results, tolerance: float) -> List[str]:
+    """
+    Returns a description of every benchmark whose median is slower than the baseline by more than the tolerance.
+    Benchmarks missing from either side are ignored.
+    Parameters:
+        - results: The results of the current run
+        - baseline: The results to compare against
+        - tolerance: The allowed slowdown as a fraction of the baseline (ex. 0.25 for 25%)
+    """
+    regressions: List[str] = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+
+        before = baseline[name]["median_ms"]
+        after = result["median_ms"]
+        if after > before * (1 + tolerance):
+            regressions.append(
+                f"{name}: {before:.3f}ms -> {after:.3f}ms (+{(after / before - 1) * 100:.0f}%)"
+            )
+
+    return regressions
+
+
+def start_gunicorn(
+    options: List[str], env: Optional[Dict[str, str]] = None
+) -> Tuple[subprocess.Popen, str]:
+    """
+    Starts gunicorn serving the app on a free local port with the given extra options (ex. ["-w", "4"]),
+    and returns its process along with the base url of the server. The caller must terminate it.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    command = [sys.executable, "-m", "gunicorn", "-b", f"127.0.0.1:{port}", *options, "src.main:create_app()"]
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def wait_until_up(server: subprocess.Popen, url: str):
+    """
+    Waits until the server started by start_gunicorn answers its first request.
+    """
+    while True:
+        if server.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            with urllib.request.urlopen(f"{url}/", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.01)
@@ -0,0 +1,72 @@
+"""
+Runs the benchmark tracks and compares them against a json baseline.
+The pure track needs no database, the db track runs against the one configured in the env (see benchmarks.bench_db).
+Exits with 1 when a benchmark is slower than its baseline by more than the tolerance.
+
+Usage:
+    python -m benchmarks.run --track pure --update-baseline
+    python -m benchmarks.run --track pure db --baseline benchmarks/baseline.json --tolerance 0.25
+"""
+
+import argparse
+import os
+import sys
+
+from benchmarks.harness import Results, find_regressions, load_results, save_results
+
+
+def _run_hashing(logins: int) -> Results:
+    from benchmarks.bench_hashing import bench_logins
+
+    rate = bench_logins(1, logins, os.getenv("HASH_METHOD", "scrypt:32768:8:1"))
+    per_login_ms = 1000 / rate
+    return {"hashing.login": {"min_ms": per_login_ms, "median_ms": per_login_ms}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--track", nargs="+", choices=["pure", "db"], default=["pure"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100_000])
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--baseline", default="benchmarks/baseline.json")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results: Results = {}
+    if "pure" in args.track:
+        from benchmarks import bench_serialization
+
+        results.update(bench_serialization.run(args.sizes))
+        results.update(_run_hashing(args.logins))
+    if "db" in args.track:
+        from benchmarks import bench_db
+
+        results.update(bench_db.run(args.sizes))
+
+    for name, result in results.items():
+        print(f"{name:<40} | median: {result['median_ms']:10.3f}ms | min: {result['min_ms']:10.3f}ms")
+
+    if args.update_baseline:
+        # other tracks already in the baseline are kept
+        baseline = load_results(args.baseline) if os.path.exists(args.baseline) else {}
+        save_results(args.baseline, {**baseline, **results})
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --update-baseline to create one")
+        return
+
+    regressions = find_regressions(results, load_results(args.baseline), args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.tolerance * 100:.0f}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+    print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
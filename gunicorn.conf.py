@@ -0,0 +1,41 @@
+# loaded by gunicorn from the working directory, see the Makefile
+import glob
+import os
+
+
+def on_starting(server):
+    # values left by a previous run would be added to the new ones
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(multiproc_dir, "*.db")):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    # the counters of the worker are kept, its live gauges are dropped
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    # with --preload the app is already imported, freezing it keeps the gc of the workers from writing to
+    # (and so copying) the pages they share with the master
+    if server.cfg.preload_app:
+        import gc
+
+        gc.collect()
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # with --preload the master created the app, so the worker inherits its pooled connections
+    # and a logging queue whose writer thread didn't survive the fork
+    if server.cfg.preload_app:
+        from src.common.log_config import init_logging
+        from src.data.db import dispose_engine
+
+        dispose_engine()
+        init_logging()
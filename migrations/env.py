@@ -2,10 +2,11 @@ import os
 from logging.config import fileConfig
 
 from alembic import context
-from sqlalchemy import URL, engine_from_config, pool
+from sqlalchemy import engine_from_config, pool
 from dotenv import load_dotenv
 
 from src.data.SAClasses import _Base
+from src.data.db import get_db_backend, get_db_url
 
 load_dotenv()
 config = context.config
@@ -14,16 +15,10 @@ if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
 target_metadata = _Base.metadata
-target_metadata.schema = os.getenv("DB_SCHEMA")
+if get_db_backend() == "postgresql":
+    target_metadata.schema = os.getenv("DB_SCHEMA")
 
-DB_URL = URL.create(
-    "postgresql+psycopg2",
-    username=os.getenv("DB_USER"),
-    password=os.getenv("DB_PASSWORD"),
-    host=os.getenv("DB_HOST"),
-    port=os.getenv("DB_PORT"),  # type: ignore
-    database=os.getenv("DB_NAME"),
-)
+DB_URL = get_db_url()
 
 
 def run_migrations_offline() -> None:
@@ -74,6 +69,7 @@ def run_migrations_online() -> None:
             target_metadata=target_metadata,
             version_table_schema=target_metadata.schema,
             include_schemas=True,
+            render_as_batch=connection.dialect.name == "sqlite",
         )
 
         with context.begin_transaction():
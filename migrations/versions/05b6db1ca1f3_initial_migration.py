@@ -26,7 +26,8 @@ schema = os.getenv("DB_SCHEMA")
 def upgrade() -> None:
     """Upgrade schema."""
     conn = op.get_bind()
-    conn.execute(sa.text("SET search_path TO :schema"), {"schema": schema})
+    if conn.dialect.name == "postgresql":
+        conn.execute(sa.text("SET search_path TO :schema"), {"schema": schema})
 
     op.create_table(
         "users",
@@ -46,7 +47,10 @@ def upgrade() -> None:
         sa.Column("date_due", sa.DateTime(), nullable=True),
         sa.Column(
             "priority",
-            sa.Enum("URGENT", "IMPORTANT", "NORMAL", "OPTIONAL", name="prioritytype"),
+            # sqlite has no enums, the rank is stored instead so priorities still sort in order
+            sa.Enum(
+                "URGENT", "IMPORTANT", "NORMAL", "OPTIONAL", name="prioritytype"
+            ).with_variant(sa.Integer(), "sqlite"),
             nullable=False,
         ),
         sa.Column("completed", sa.Boolean(), nullable=False),
@@ -69,7 +73,8 @@ def upgrade() -> None:
 def downgrade() -> None:
     """Downgrade schema."""
     conn = op.get_bind()
-    conn.execute(sa.text("SET search_path TO :schema"), {"schema": schema})
+    if conn.dialect.name == "postgresql":
+        conn.execute(sa.text("SET search_path TO :schema"), {"schema": schema})
 
     op.drop_index("todo_user_id_fkey", table_name="todos", postgresql_using="hash")
     op.drop_table("todos")
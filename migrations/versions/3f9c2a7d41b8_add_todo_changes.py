@@ -0,0 +1,103 @@
+"""Add todo changes
+
+Revision ID: 3f9c2a7d41b8
+Revises: be7dbec3f5ce
+Create Date: 2026-10-18 14:02:37.815406
+
+"""
+
+import os
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from dotenv import load_dotenv
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9c2a7d41b8"
+down_revision: Union[str, Sequence[str], None] = "be7dbec3f5ce"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+load_dotenv()
+schema = os.getenv("DB_SCHEMA")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        conn.execute(sa.text("SET search_path TO :schema"), {"schema": schema})
+
+    # the todo_version of the user when the todo was last saved or updated
+    op.add_column(
+        "todos",
+        sa.Column(
+            "change_version", sa.BigInteger(), server_default="0", nullable=False
+        ),
+    )
+    conn.execute(
+        sa.text(
+            "UPDATE todos SET change_version = "
+            + "(SELECT todo_version FROM users WHERE users.id = todos.user_id)"
+        )
+    )
+
+    # what is left of a deleted todo, so clients syncing their changes learn about the deletion
+    op.create_table(
+        "todo_tombstones",
+        sa.Column("todo_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("change_version", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("todo_id"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "todo_tombstone_user_id_change_version_idx",
+        "todo_tombstones",
+        ["user_id", "change_version"],
+        unique=False,
+    )
+
+    if conn.dialect.name == "sqlite":
+        # sqlite gives the id of the last todo to the next one once it is deleted (postgres never reuses them),
+        # so the new todo mustn't be reported as deleted to the clients syncing their changes
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS todo_clear_tombstone AFTER INSERT ON todos "
+            + "BEGIN DELETE FROM todo_tombstones WHERE todo_id = NEW.id; END"
+        )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "todo_user_id_change_version_idx",
+            "todos",
+            ["user_id", "change_version"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        conn.execute(sa.text("SET search_path TO :schema"), {"schema": schema})
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "todo_user_id_change_version_idx",
+            table_name="todos",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+    if conn.dialect.name == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS todo_clear_tombstone")
+
+    op.drop_index(
+        "todo_tombstone_user_id_change_version_idx", table_name="todo_tombstones"
+    )
+    op.drop_table("todo_tombstones")
+    op.drop_column("todos", "change_version")
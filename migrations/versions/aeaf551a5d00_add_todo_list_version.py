@@ -0,0 +1,46 @@
+"""Add todo list version
+
+Revision ID: aeaf551a5d00
+Revises: 05b6db1ca1f3
+Create Date: 2026-10-18 10:12:41.530214
+
+"""
+
+import os
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from dotenv import load_dotenv
+
+# revision identifiers, used by Alembic.
+revision: str = "aeaf551a5d00"
+down_revision: Union[str, Sequence[str], None] = "05b6db1ca1f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+load_dotenv()
+schema = os.getenv("DB_SCHEMA")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        conn.execute(sa.text("SET search_path TO :schema"), {"schema": schema})
+
+    op.add_column(
+        "users",
+        sa.Column(
+            "todo_version", sa.BigInteger(), server_default="0", nullable=False
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        conn.execute(sa.text("SET search_path TO :schema"), {"schema": schema})
+
+    op.drop_column("users", "todo_version")
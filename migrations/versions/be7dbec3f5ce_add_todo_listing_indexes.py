@@ -0,0 +1,85 @@
+"""Add todo listing indexes
+
+Revision ID: be7dbec3f5ce
+Revises: aeaf551a5d00
+Create Date: 2026-10-18 11:03:18.224907
+
+"""
+
+import os
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from dotenv import load_dotenv
+
+# revision identifiers, used by Alembic.
+revision: str = "be7dbec3f5ce"
+down_revision: Union[str, Sequence[str], None] = "aeaf551a5d00"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+load_dotenv()
+schema = os.getenv("DB_SCHEMA")
+
+# one index per sort order of GET /todos/, each ending in id for the keyset pagination
+indexes = {
+    "todo_user_id_id_idx": ["user_id", "id"],
+    "todo_user_id_date_due_id_idx": ["user_id", "date_due", "id"],
+    "todo_user_id_priority_id_idx": ["user_id", "priority", "id"],
+    "todo_user_id_date_created_id_idx": ["user_id", "date_created", "id"],
+    "todo_user_id_completed_date_due_idx": ["user_id", "completed", "date_due"],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        conn.execute(sa.text("SET search_path TO :schema"), {"schema": schema})
+
+    # built concurrently so the todos table stays writable while the indexes are created
+    with op.get_context().autocommit_block():
+        for name, columns in indexes.items():
+            op.create_index(
+                name,
+                "todos",
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+        # every lookup it served is now covered by todo_user_id_id_idx
+        op.drop_index(
+            "todo_user_id_fkey",
+            table_name="todos",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        conn.execute(sa.text("SET search_path TO :schema"), {"schema": schema})
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "todo_user_id_fkey",
+            "todos",
+            ["user_id"],
+            unique=False,
+            postgresql_using="hash",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+        for name in indexes:
+            op.drop_index(
+                name,
+                table_name="todos",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,76 @@
+"""Add todo search
+
+Revision ID: c81d5e0b97a4
+Revises: 3f9c2a7d41b8
+Create Date: 2026-10-18 15:21:46.530127
+
+"""
+
+import os
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from dotenv import load_dotenv
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "c81d5e0b97a4"
+down_revision: Union[str, Sequence[str], None] = "3f9c2a7d41b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+load_dotenv()
+schema = os.getenv("DB_SCHEMA")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return  # sqlite searches the descriptions as they are, see todo_methods
+    conn.execute(sa.text("SET search_path TO :schema"), {"schema": schema})
+
+    # kept up to date by postgres on every insert and update, adding it rewrites the table once
+    op.add_column(
+        "todos",
+        sa.Column(
+            "description_tsv",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('english', description)", persisted=True),
+            nullable=True,
+        ),
+    )
+
+    # btree_gin lets the user_id be part of the gin index, so a search only reads the entries of its user
+    # instead of the matches of every user. It is a trusted extension, the owner of the database can create it
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "todo_user_id_description_tsv_idx",
+            "todos",
+            ["user_id", "description_tsv"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(sa.text("SET search_path TO :schema"), {"schema": schema})
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "todo_user_id_description_tsv_idx",
+            table_name="todos",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+    # the btree_gin extension is left in place, other indexes may have come to rely on it
+    op.drop_column("todos", "description_tsv")
@@ -1,3 +1,5 @@
 from .types import PriorityType
+from .pagination import encode_cursor, decode_cursor
+from .cache import TTLCache
 
-__all__ = ["PriorityType"]
+__all__ = ["PriorityType", "encode_cursor", "decode_cursor", "TTLCache"]
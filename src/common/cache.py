@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Bounded in-process cache whose entries expire after a time to live.
+    When full, the least recently used entry is evicted to make room for new ones.
+    It is safe to share between threads, but every worker process keeps its own copy.
+
+    Parameters:
+        max_size: The maximum amount of entries kept in the cache, 0 disables the cache
+        ttl: The amount of seconds an entry is considered valid for
+
+    Usage:
+        cache = TTLCache(max_size=1024, ttl=30)
+        value = cache.get(key)
+        if value is None:
+            value = load_value(key)
+            cache.put(key, value)
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.__entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.__lock = threading.Lock()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached value for the key, or None if it is missing or expired.
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.__entries[key]
+                self.misses += 1
+                return None
+
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Stores the value for the key, evicting the least recently used entry if the cache is full.
+        """
+        if self.max_size <= 0:
+            return
+
+        with self.__lock:
+            self.__entries[key] = (time.monotonic() + self.ttl, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """
+        Removes the entry for the key if there is one.
+        """
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self):
+        """
+        Removes every entry from the cache.
+        """
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the current size of the cache along with its hit and miss counters.
+        """
+        with self.__lock:
+            return {"size": len(self.__entries), "hits": self.hits, "misses": self.misses}
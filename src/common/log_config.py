@@ -0,0 +1,215 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+_TEXT_FORMAT = "[%(asctime)s] [%(levelname)s @ %(name)s] %(message)s"
+_TEXT_DATE_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """
+    Formats every record as a single line json object with its time, level, logger and message,
+    plus the traceback if there is one and how many similar records were dropped by the RateLimitFilter.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most limit records per logger and level every window seconds, from then on only
+    one in every sample_every is kept until the window ends (0 drops all of them). The next record that is
+    let through carries the amount of records dropped before it in its suppressed attribute.
+    Records below min_level are never limited.
+
+    Parameters:
+        limit: The amount of records let through per logger and level every window
+        window: The length of a window in seconds
+        sample_every: Keep one in this amount of records past the limit, 0 to keep none
+        min_level: The lowest level that is rate limited
+
+    Usage:
+        handler.addFilter(RateLimitFilter(limit=20, window=1, sample_every=100))
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        window: float,
+        sample_every: int = 0,
+        min_level: int = logging.WARNING,
+    ):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.sample_every = sample_every
+        self.min_level = min_level
+        self.__lock = threading.Lock()
+        # (logger, level) -> [window start, records in the window, records dropped since the last one kept]
+        self.__counters: Dict[Tuple[str, int], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.min_level:
+            return True
+
+        now = time.monotonic()
+        key = (record.name, record.levelno)
+        with self.__lock:
+            counter = self.__counters.get(key)
+            if counter is None or now - counter[0] >= self.window:
+                dropped = counter[2] if counter is not None else 0
+                counter = [now, 0, dropped]
+                self.__counters[key] = counter
+
+            counter[1] += 1
+            over = counter[1] - self.limit
+            if over > 0 and (self.sample_every <= 0 or over % self.sample_every != 0):
+                counter[2] += 1
+                return False
+
+            record.suppressed = counter[2]
+            counter[2] = 0
+            return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    # the records are only put on the queue here, the listener thread formats and writes them
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # only what can't be read from another thread is resolved, the rest is formatted by the listener
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:  # a full queue means the disk can't keep up, so the record is dropped
+            self.dropped += 1
+
+
+def _parse_levels(levels: str) -> Dict[str, str]:
+    # "TODODAL=DEBUG,werkzeug=WARNING"
+    result: Dict[str, str] = {}
+    for item in levels.split(","):
+        if not item.strip():
+            continue
+        name, _, level = item.partition("=")
+        result[name.strip()] = level.strip().upper()
+    return result
+
+
+def _build_output_handler(log_file: str, log_format: str) -> logging.Handler:
+    if log_file == "-":
+        handler: logging.Handler = logging.StreamHandler(sys.stderr)
+    else:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        handler = logging.FileHandler(log_file)
+
+    if log_format == "json":
+        handler.setFormatter(JSONLinesFormatter())
+    elif log_format == "text":
+        handler.setFormatter(
+            logging.Formatter(
+                os.getenv("LOG_TEXT_FORMAT", _TEXT_FORMAT),
+                datefmt=os.getenv("LOG_DATE_FORMAT", _TEXT_DATE_FORMAT),
+            )
+        )
+    else:
+        raise ValueError(f"Unknown log format {log_format}")
+    return handler
+
+
+def init_logging() -> QueueListener:
+    """
+    Sets up the logging of the process: loggers only put their records on a bounded queue,
+    and a background thread formats them and writes them to LOG_FILE, so requests never wait on the disk.
+    Warnings and errors are rate limited per logger, see RateLimitFilter. Calling it again replaces the
+    previous setup, ex. in a forked worker whose listener thread didn't survive the fork.
+
+    Usage:
+        init_logging()
+        logging.getLogger("TODOROUTE").warning("Validation error in POST todo route: %s", e)
+    """
+    global _listener, _queue_handler
+    stop_logging()
+
+    handler = _build_output_handler(
+        os.getenv("LOG_FILE", "log/test.log"), os.getenv("LOG_FORMAT", "json").lower()
+    )
+    log_queue: queue.Queue = queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", 10_000)))
+    queue_handler = _NonBlockingQueueHandler(log_queue)
+    # filtered before being queued, so a flood of bad requests costs neither queue space nor formatting
+    queue_handler.addFilter(
+        RateLimitFilter(
+            limit=int(os.getenv("LOG_RATE_LIMIT", 20)),
+            window=float(os.getenv("LOG_RATE_WINDOW", 1)),
+            sample_every=int(os.getenv("LOG_RATE_SAMPLE", 100)),
+        )
+    )
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+        existing.close()
+    root.addHandler(queue_handler)
+    _queue_handler = queue_handler
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """
+    Writes the records still in the queue and stops the listener thread, if logging was set up.
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+
+    logging.getLogger().removeHandler(_queue_handler)  # type: ignore
+    _queue_handler = None
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(stop_logging)
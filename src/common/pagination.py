@@ -0,0 +1,45 @@
+import base64
+import json
+
+
+def encode_cursor(*values) -> str:
+    """
+    Encodes the keyset values of the last item of a page into an opaque cursor string.
+    Parameters:
+        values: The values of the keyset columns (ex. the id) of the last item on the page.
+
+    Returns:
+        An url safe string that can be handed to the client to request the next page.
+
+    Usage:
+        next_cursor = encode_cursor(last_todo.id)
+    """
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decodes a cursor created by encode_cursor back into its keyset values.
+    Parameters:
+        cursor: The opaque cursor string as provided by the client.
+
+    Returns:
+        A tuple with the keyset values stored in the cursor.
+
+    Raises:
+        ValueError if the cursor is malformed.
+
+    Usage:
+        (after_id,) = decode_cursor(request.args["after"])
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError(f"Malformed cursor: {e}")
+
+    if not isinstance(values, list):
+        raise ValueError("Malformed cursor")
+
+    return tuple(values)
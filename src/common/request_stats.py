@@ -0,0 +1,63 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+
+class RequestStats:
+    """
+    Time spent by a single request, filled in by the database engine hooks while the request runs.
+    """
+
+    __slots__ = ("start", "queries", "db_time", "pool_wait")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+
+    def elapsed(self) -> float:
+        """
+        Returns the amount of seconds since the request started.
+        """
+        return time.perf_counter() - self.start
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "_current_stats", default=None
+)
+
+
+def begin_request_stats() -> RequestStats:
+    """
+    Starts accounting the time of the current request, see current_request_stats.
+    """
+    stats = RequestStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """
+    Returns the stats of the current request, or None outside of a request (ex. migrations, scripts).
+    """
+    return _current_stats.get()
+
+
+def record_query(seconds: float):
+    """
+    Adds a query that took the given amount of seconds to the current request, if any.
+    """
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += seconds
+
+
+def record_pool_wait(seconds: float):
+    """
+    Adds the given amount of seconds spent waiting for a pooled connection to the current request, if any.
+    """
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.pool_wait += seconds
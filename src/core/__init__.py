@@ -1,5 +1,8 @@
 from .pydantic_todo import Todo
+from .pydantic_todo_query import TodoQuery
+from .todo_record import TodoRecord
 from .pydantic_user import User
-from .auth import set_password, check_password
+from .hashing import HashingUnavailable, get_password_hasher
+from .auth import set_password, check_password, password_needs_rehash
 
-__all__ = ['Todo', 'User', 'set_password', 'check_password']
+__all__ = ['Todo', 'TodoQuery', 'TodoRecord', 'User', 'set_password', 'check_password', 'password_needs_rehash', 'HashingUnavailable', 'get_password_hasher']
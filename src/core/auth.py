@@ -1,5 +1,5 @@
 from . import User
-from werkzeug.security import generate_password_hash, check_password_hash
+from .hashing import get_password_hasher
 
 def set_password(new_user: User, raw_text_password: str):
     """
@@ -8,10 +8,13 @@ def set_password(new_user: User, raw_text_password: str):
         new_user: The user object with no password as obtained from the signup form.
         raw_text_password: The raw text password as obtained form the signup form.
 
+    Raises:
+        HashingUnavailable if the hashing pool is saturated.
+
     Usage:
         set_password(new_user, raw_text_password)
     """
-    hash = generate_password_hash(raw_text_password)
+    hash = get_password_hasher().hash(raw_text_password)
     new_user.password = hash
 
 def check_password(password_hash: str, raw_text_password: str) -> bool:
@@ -24,8 +27,27 @@ def check_password(password_hash: str, raw_text_password: str) -> bool:
     Returns:
         A boolean value representing whether or not the password is valid and correct.
 
+    Raises:
+        HashingUnavailable if the hashing pool is saturated.
+
     Usage:
         (after the login form has been validated)
         valid_user = check_password(password_hash, raw_text_password)
     """
-    return check_password_hash(password_hash, raw_text_password)
+    return get_password_hasher().verify(password_hash, raw_text_password)
+
+def password_needs_rehash(password_hash: str) -> bool:
+    """
+    Takes in a password hash and checks whether it was made with other hashing parameters than the configured ones.
+    Parameters:
+        password_hash: The password as provided by get_user_password.
+
+    Returns:
+        A boolean value representing whether or not the password should be hashed again.
+
+    Usage:
+        (after the password has been checked)
+        if password_needs_rehash(password_hash):
+            set_password(user, raw_text_password)
+    """
+    return get_password_hasher().needs_rehash(password_hash)
@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Optional
+
+from dotenv import load_dotenv
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingUnavailable(Exception):
+    """
+    Raised when a password can't be hashed or checked because the hashing pool is saturated.
+    Should be answered with a 503 so clients retry later instead of piling up on the workers.
+    """
+
+
+class PasswordHasher:
+    """
+    Runs password hashing (scrypt by default) in a bounded pool of processes so bursts of logins don't
+    starve the web workers of CPU. Once the amount of pending jobs reaches the queue depth new jobs are
+    rejected with HashingUnavailable instead of being queued.
+
+    Parameters:
+        workers: The amount of processes in the pool, 0 hashes in the calling thread instead
+        queue_depth: The maximum amount of jobs that can be pending (running or queued) at once
+        method: The werkzeug hashing method and parameters (ex. scrypt:32768:8:1)
+        salt_length: The length of the salt for new hashes
+        timeout: The maximum amount of seconds to wait for a job before giving up
+
+    Usage:
+        hasher = PasswordHasher(workers=2, queue_depth=8, method="scrypt:32768:8:1", salt_length=16, timeout=10)
+        password_hash = hasher.hash(raw_text_password)
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_depth: int,
+        method: str,
+        salt_length: int,
+        timeout: float,
+    ):
+        self.workers = workers
+        self.method = method
+        self.salt_length = salt_length
+        self.timeout = timeout
+        self.__slots = threading.BoundedSemaphore(queue_depth)
+        self.__lock = threading.Lock()
+        self.__executor: Optional[ProcessPoolExecutor] = None
+        self.__pid: Optional[int] = None
+        self.__hash_prefix: Optional[str] = None
+
+    def __get_executor(self) -> ProcessPoolExecutor:
+        with self.__lock:
+            # built lazily and per process so every forked worker gets a pool of its own
+            if self.__executor is None or self.__pid != os.getpid():
+                self.__executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self.__pid = os.getpid()
+            return self.__executor
+
+    def __run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+
+        if not self.__slots.acquire(blocking=False):
+            raise HashingUnavailable("Password hashing queue is full")
+
+        try:
+            future: Future = self.__get_executor().submit(fn, *args)
+        except Exception:
+            self.__slots.release()
+            raise
+        # the slot is only freed once the job is done, even if we stop waiting for it
+        future.add_done_callback(lambda _: self.__slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise HashingUnavailable("Password hashing timed out")
+
+    def hash(self, raw_text_password: str) -> str:
+        """
+        Returns the hash of the raw password using the configured method and parameters.
+        """
+        return self.__run(
+            generate_password_hash, raw_text_password, self.method, self.salt_length
+        )
+
+    def verify(self, password_hash: str, raw_text_password: str) -> bool:
+        """
+        Returns whether or not the raw password matches the hash.
+        """
+        return self.__run(check_password_hash, password_hash, raw_text_password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """
+        Returns whether or not the hash was made with a method or parameters other than the configured ones.
+        """
+        if self.__hash_prefix is None:
+            # hashes store the method with its defaults filled in (ex. scrypt is stored as scrypt:32768:8:1),
+            # so the configured one is expanded the same way, once, by hashing an empty password with it
+            self.__hash_prefix = generate_password_hash("", self.method, 1).split("$", 1)[0]
+        return password_hash.split("$", 1)[0] != self.__hash_prefix
+
+    def shutdown(self):
+        """
+        Stops the processes of the pool, if it was started.
+        """
+        with self.__lock:
+            if self.__executor is not None and self.__pid == os.getpid():
+                self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+
+def _hasher_from_env() -> PasswordHasher:
+    load_dotenv()
+    return PasswordHasher(
+        workers=int(os.getenv("HASH_WORKERS", 1)),
+        queue_depth=int(os.getenv("HASH_QUEUE_DEPTH", 8)),
+        method=os.getenv("HASH_METHOD", "scrypt:32768:8:1"),
+        salt_length=int(os.getenv("HASH_SALT_LENGTH", 16)),
+        timeout=float(os.getenv("HASH_TIMEOUT", 10)),
+    )
+
+
+_password_hasher: Optional[PasswordHasher] = None
+_password_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    """
+    Returns the password hasher of the process, creating it on first use so importing the core doesn't read
+    the config. The pool of the hasher starts with the first job, see PasswordHasher.
+    """
+    global _password_hasher
+    hasher = _password_hasher
+    if hasher is not None:
+        return hasher
+
+    with _password_hasher_lock:
+        if _password_hasher is None:
+            _password_hasher = _hasher_from_env()
+        return _password_hasher
@@ -16,7 +16,10 @@ class Todo(BaseModel):
     completed: bool
 
     def __eq__(self, o):
-        if not isinstance(o, Todo):
+        # records are read only todos loaded from the database, see TodoRecord
+        from src.core.todo_record import TodoRecord
+
+        if not isinstance(o, (Todo, TodoRecord)):
             raise TypeError
 
         if self.id != o.id:
@@ -0,0 +1,14 @@
+from datetime import datetime
+from typing import Literal, Optional, Set
+
+from pydantic import BaseModel
+
+from src.common import PriorityType
+
+
+class TodoQuery(BaseModel):
+    completed: Optional[bool] = None
+    priority: Optional[Set[PriorityType]] = None  # any of the given priorities
+    due_before: Optional[datetime] = None  # exclusive
+    due_after: Optional[datetime] = None  # inclusive
+    sort: Literal["id", "date_due", "priority", "date_created"] = "id"
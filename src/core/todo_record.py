@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+
+from src.common import PriorityType
+from src.core.pydantic_todo import Todo
+
+
+class TodoRecord(NamedTuple):
+    """
+    Read only todo as loaded from the database, which is trusted so it skips the validation of Todo.
+    Has the same fields as Todo and compares equal to the Todo with the same values.
+    """
+
+    id: int
+    user_id: int
+    description: str
+    date_created: datetime
+    date_due: Optional[datetime]
+    priority: PriorityType
+    completed: bool
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the same dict as Todo.model_dump.
+        """
+        return self._asdict()
+
+    def to_todo(self) -> Todo:
+        """
+        Returns a validated Todo with the same values, for code that needs to change it.
+        """
+        return Todo(**self._asdict())
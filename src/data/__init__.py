@@ -1,10 +1,24 @@
-from .db import TransactionManager, ping_db
+from .db import (
+    TransactionManager,
+    begin_connection_scope,
+    end_connection_scope,
+    ping_db,
+)
+from .statements import invalidate_prepared_statements
 from .todo_methods import (
-    delete_todo,
+    delete_owned_todo,
+    delete_todos,
+    get_todo_changes,
     get_todo_id,
+    get_todo_version,
     get_todos_from_user,
-    update_todo,
+    get_todos_page_from_user,
+    iter_todos_from_user,
+    search_todos,
+    update_owned_todo,
+    update_todos,
     save_todo,
+    save_todos,
 )
 from .user_methods import (
     delete_user,
@@ -12,18 +26,30 @@ from .user_methods import (
     get_user_from_name,
     get_user_password,
     update_user,
+    get_user_cache,
     update_user_password,
     save_user,
 )
 
 __all__ = [
     "TransactionManager",
+    "begin_connection_scope",
+    "end_connection_scope",
     "ping_db",
+    "invalidate_prepared_statements",
     "save_todo",
+    "save_todos",
+    "get_todo_changes",
     "get_todo_id",
+    "get_todo_version",
     "get_todos_from_user",
-    "update_todo",
-    "delete_todo",
+    "get_todos_page_from_user",
+    "iter_todos_from_user",
+    "search_todos",
+    "update_owned_todo",
+    "update_todos",
+    "delete_owned_todo",
+    "delete_todos",
     "save_user",
     "get_user_id",
     "get_user_from_name",
@@ -31,4 +57,5 @@ __all__ = [
     "update_user",
     "update_user_password",
     "delete_user",
+    "get_user_cache",
 ]
@@ -0,0 +1,41 @@
+from .db import (
+    AsyncTransactionManager,
+    async_to_sync,
+    get_async_engine,
+    run_coroutine,
+)
+from .todo_methods import (
+    delete_owned_todo,
+    delete_todos,
+    get_todo_changes,
+    get_todo_id,
+    get_todo_version,
+    get_todos_from_user,
+    get_todos_page_from_user,
+    iter_todos_from_user,
+    search_todos,
+    update_owned_todo,
+    update_todos,
+    save_todo,
+    save_todos,
+)
+
+__all__ = [
+    "AsyncTransactionManager",
+    "async_to_sync",
+    "get_async_engine",
+    "run_coroutine",
+    "save_todo",
+    "save_todos",
+    "get_todo_changes",
+    "get_todo_id",
+    "get_todo_version",
+    "get_todos_from_user",
+    "get_todos_page_from_user",
+    "iter_todos_from_user",
+    "search_todos",
+    "update_owned_todo",
+    "update_todos",
+    "delete_owned_todo",
+    "delete_todos",
+]
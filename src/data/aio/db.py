@@ -0,0 +1,183 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Coroutine, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import URL
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+
+from src.common.request_stats import record_pool_wait
+from src.data.db import install_query_hooks
+from src.data.slow_queries import slow_query_log_from_env
+
+_logger = logging.getLogger("ASYNCDBSETUP")
+
+
+def _async_db_init() -> AsyncEngine:
+    load_dotenv()
+    url = URL.create(
+        "postgresql+asyncpg",
+        username=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),  # type: ignore
+        database=os.getenv("DB_NAME"),
+    )
+
+    engine = create_async_engine(
+        url,
+        connect_args={"server_settings": {"search_path": os.getenv("DB_SCHEMA")}},
+        pool_pre_ping=True,
+        pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", -1)),
+    )
+    install_query_hooks(engine.sync_engine, slow_query_log_from_env())
+    return engine
+
+
+_async_engine: Optional[AsyncEngine] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_pid, _async_engine
+    with _loop_lock:
+        # started lazily and per process, since neither the loop thread nor the pool survive a fork
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            _async_engine = None
+            threading.Thread(
+                target=_loop.run_forever, name="async-db-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Returns the async engine, creating it on first use.
+    Must be called from the shared event loop (ex. within a coroutine given to run_coroutine).
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = _async_db_init()
+    return _async_engine
+
+
+def run_coroutine(coro: Coroutine) -> Any:
+    """
+    Runs the coroutine on the event loop shared by every thread of the process and waits for its result.
+    Every request keeps its own context (flask's request, current_user...) while the database pool and its
+    connections are shared between all of them, which is what lets a worker have many queries in flight at once.
+
+    Usage:
+        result = run_coroutine(some_async_db_method(...args))
+    """
+    loop = _get_loop()
+    context = contextvars.copy_context()
+    future: concurrent.futures.Future = concurrent.futures.Future()
+
+    def copy_result(task: asyncio.Task):
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())  # type: ignore
+        else:
+            future.set_result(task.result())
+
+    def start():
+        # tasks copy the current context, which is the caller's one while this callback runs
+        loop.create_task(coro).add_done_callback(copy_result)
+
+    loop.call_soon_threadsafe(start, context=context)
+    return future.result()
+
+
+def async_to_sync(func):
+    """
+    Replacement for Flask.async_to_sync that runs async views on the shared event loop through run_coroutine
+    instead of starting a new event loop per request.
+
+    Usage:
+        app.async_to_sync = async_to_sync
+    """
+
+    def wrapper(*args, **kwargs):
+        return run_coroutine(func(*args, **kwargs))
+
+    return wrapper
+
+
+_current_async_connection: ContextVar[Optional[AsyncConnection]] = ContextVar(
+    "_current_async_connection", default=None
+)
+
+
+class AsyncTransactionManager:
+    """
+    Async counterpart of TransactionManager, backed by the async engine.
+    It automatically opens, closes, rollbacks and commits sessions for the user.
+    Managers nested inside another one share its connection and run as a savepoint of the outer transaction.
+
+    Parameters:
+        debug: A boolean value used to determine whether or not the transaction should rollback by default
+
+    Usage:
+        In BL:
+        The transaction manager connection is passed to other methods for querying.
+            async with AsyncTransactionManager() as conn:
+                await some_async_db_method(...args, conn)
+
+        In DAL:
+        The connection can be used as usual.
+            await conn.execute(text("SOME SQL QUERY"))
+    """
+
+    def __init__(self, debug: bool = False):
+        self.__debug = debug
+        self.__owned_connection: Optional[AsyncConnection] = None
+
+    async def __aenter__(self) -> AsyncConnection:
+        connection = _current_async_connection.get()
+        if connection is None:
+            start = time.perf_counter()
+            connection = await get_async_engine().connect()
+            record_pool_wait(time.perf_counter() - start)
+            self.__owned_connection = connection
+            self.__token = _current_async_connection.set(connection)
+
+        try:
+            if connection.in_transaction():
+                self.__transaction = await connection.begin_nested()
+            else:
+                self.__transaction = await connection.begin()
+        except Exception:
+            await self.__release_owned_connection()
+            raise
+
+        return connection
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type or self.__debug:
+                await self.__transaction.rollback()
+            else:
+                await self.__transaction.commit()
+        finally:
+            await self.__release_owned_connection()
+
+    async def __release_owned_connection(self):
+        if self.__owned_connection is not None:
+            await self.__owned_connection.close()
+            _current_async_connection.reset(self.__token)
+            self.__owned_connection = None
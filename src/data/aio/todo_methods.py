@@ -0,0 +1,341 @@
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from psycopg2.errors import NoData
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.common import PriorityType
+from src.core import Todo, TodoQuery, TodoRecord
+from src.data.statements import Statement
+from src.data.todo_methods import (
+    _BUMP_TODO_VERSION,
+    _DELETE_OWNED_TODO,
+    _DELETE_TODOS,
+    _GET_TODO_CHANGES,
+    _GET_TODO_ID,
+    _GET_TODO_VERSION,
+    _GET_TODOS_FROM_USER,
+    _SEARCH_TODOS,
+    _SAVE_TODO,
+    _SAVE_TODOS,
+    _SAVE_TOMBSTONES,
+    _STREAM_BATCH_SIZE,
+    _UPDATE_OWNED_TODO,
+    _UPDATE_TODOS,
+    _changes_from_rows,
+    _filtered_params,
+    _filtered_statement,
+    _page_last_key,
+    _page_params,
+    _record_from_row,
+    _search_params,
+    _search_results_from_rows,
+)
+
+_logger = logging.getLogger("ASYNCTODODAL")
+
+# the same statements as the sync DAL, asyncpg already prepares and caches them per connection
+
+
+def _adapt(value):
+    # asyncpg sends enums by label, the psycopg2 adapter for PriorityType doesn't apply here
+    if isinstance(value, PriorityType):
+        return value.name
+    if isinstance(value, list):
+        return [_adapt(x) for x in value]
+    return value
+
+
+async def _execute(conn: AsyncConnection, stmt: Statement, params: Dict):
+    return await conn.execute(
+        stmt.clause, {key: _adapt(value) for key, value in params.items()}
+    )
+
+
+def _todo_params(td: Todo) -> Dict:
+    return {
+        "id": td.id,
+        "user_id": td.user_id,
+        "description": td.description,
+        "date_created": td.date_created,
+        "date_due": td.date_due,
+        "priority": td.priority,
+        "completed": td.completed,
+    }
+
+
+def _todo_list_params(tds: List[Todo]) -> Dict:
+    return {
+        "ids": [td.id for td in tds],
+        "user_ids": [td.user_id for td in tds],
+        "descriptions": [td.description for td in tds],
+        "dates_created": [td.date_created for td in tds],
+        "dates_due": [td.date_due for td in tds],
+        "priorities": [td.priority for td in tds],
+        "completed": [td.completed for td in tds],
+    }
+
+
+async def _bump_todo_version(user_id: int, conn: AsyncConnection) -> int:
+    res = (await _execute(conn, _BUMP_TODO_VERSION, {"user_id": user_id})).first()
+    if res is None:
+        raise NoData
+
+    return res.todo_version
+
+
+async def _save_tombstones(todo_ids: List[int], user_id: int, conn: AsyncConnection):
+    await _execute(conn, _SAVE_TOMBSTONES, {"user_id": user_id, "ids": todo_ids})
+
+
+async def get_todo_version(user_id: int, conn: AsyncConnection) -> int:
+    """
+    Async counterpart of src.data.todo_methods.get_todo_version.
+    """
+    try:
+        res = (await _execute(conn, _GET_TODO_VERSION, {"user_id": user_id})).first()
+        if res is None:
+            raise NoData
+
+        return res.todo_version
+    except Exception as e:
+        _logger.error("Error while fetching todo list version from user: %s", e)
+        raise e
+
+
+async def save_todo(td: Todo, conn: AsyncConnection) -> int:
+    """
+    Async counterpart of src.data.todo_methods.save_todo.
+    """
+    try:
+        await _bump_todo_version(td.user_id, conn)
+        params = _todo_params(td)
+        del params["id"]
+        res = (await _execute(conn, _SAVE_TODO, params)).first()
+        if res is None:
+            raise Exception("Todo insert returned no id")
+
+        return res.id
+    except Exception as e:
+        _logger.error("Error while saving TODO: %s", e)
+        raise e
+
+
+async def save_todos(tds: List[Todo], conn: AsyncConnection) -> List[int]:
+    """
+    Async counterpart of src.data.todo_methods.save_todos.
+    """
+    try:
+        if not tds:
+            return []
+
+        for user_id in sorted({td.user_id for td in tds}):
+            await _bump_todo_version(user_id, conn)
+
+        params = _todo_list_params(tds)
+        del params["ids"]
+        rows = (await _execute(conn, _SAVE_TODOS, params)).fetchall()
+        if len(rows) != len(tds):
+            raise Exception("Todo bulk insert returned the wrong amount of ids")
+
+        # identity values are drawn in insertion order, so sorting them maps them back to the input order
+        return sorted(res.id for res in rows)
+    except Exception as e:
+        _logger.error("Error while saving TODO list: %s", e)
+        raise e
+
+
+async def get_todo_id(todo_id: int, conn: AsyncConnection) -> TodoRecord:
+    """
+    Async counterpart of src.data.todo_methods.get_todo_id.
+    """
+    try:
+        td = (await _execute(conn, _GET_TODO_ID, {"id": todo_id})).first()
+        if td is None:
+            raise NoData
+
+        return _record_from_row(td)
+    except Exception as e:
+        _logger.error("Error while fetching todo from id: %s", e)
+        raise e
+
+
+async def get_todos_from_user(
+    user_id: int, conn: AsyncConnection
+) -> List[TodoRecord]:
+    """
+    Async counterpart of src.data.todo_methods.get_todos_from_user.
+    """
+    try:
+        rows = (
+            await _execute(conn, _GET_TODOS_FROM_USER, {"user_id": user_id})
+        ).fetchall()
+
+        return [_record_from_row(td) for td in rows]
+    except Exception as e:
+        _logger.error("Error while fetching todo list from user: %s", e)
+        raise e
+
+
+async def iter_todos_from_user(
+    user_id: int, query: TodoQuery, conn: AsyncConnection
+) -> AsyncIterator[TodoRecord]:
+    """
+    Async counterpart of src.data.todo_methods.iter_todos_from_user.
+    """
+    try:
+        params = _filtered_params(user_id, query)
+        result = await conn.stream(
+            _filtered_statement(query, None, paged=False).clause,
+            {key: _adapt(value) for key, value in params.items()},
+            execution_options={"yield_per": _STREAM_BATCH_SIZE},
+        )
+
+        async for td in result:
+            yield _record_from_row(td)
+    except Exception as e:
+        _logger.error("Error while streaming todo list from user: %s", e)
+        raise e
+
+
+async def get_todo_changes(
+    user_id: int, since: Optional[int], conn: AsyncConnection
+) -> Tuple[List[TodoRecord], List[int], int]:
+    """
+    Async counterpart of src.data.todo_methods.get_todo_changes.
+    """
+    try:
+        version = await get_todo_version(user_id, conn)
+        if since is not None and since >= version:
+            return [], [], since
+
+        params = {
+            "user_id": user_id,
+            "since": -1 if since is None else since,
+            "with_deleted": since is not None,
+        }
+        rows = (await _execute(conn, _GET_TODO_CHANGES, params)).fetchall()
+
+        return _changes_from_rows(rows, since, version)
+    except Exception as e:
+        _logger.error("Error while fetching todo changes from user: %s", e)
+        raise e
+
+
+async def get_todos_page_from_user(
+    user_id: int,
+    query: TodoQuery,
+    limit: int,
+    after: Optional[tuple],
+    conn: AsyncConnection,
+) -> Tuple[List[TodoRecord], Optional[tuple]]:
+    """
+    Async counterpart of src.data.todo_methods.get_todos_page_from_user.
+    """
+    try:
+        keyset, params = _page_params(user_id, query, limit, after)
+        rows = (
+            await _execute(conn, _filtered_statement(query, keyset, paged=True), params)
+        ).fetchall()
+
+        tdlist: List[TodoRecord] = [_record_from_row(td) for td in rows[:limit]]
+
+        return tdlist, _page_last_key(query, tdlist, len(rows), limit)
+    except Exception as e:
+        _logger.error("Error while fetching todo page from user: %s", e)
+        raise e
+
+
+async def search_todos(
+    user_id: int,
+    search: str,
+    limit: int,
+    after: Optional[tuple],
+    conn: AsyncConnection,
+) -> Tuple[List[Tuple[TodoRecord, str]], Optional[tuple]]:
+    """
+    Async counterpart of src.data.todo_methods.search_todos.
+    """
+    try:
+        params = _search_params(user_id, search, limit, after)
+        rows = (await _execute(conn, _SEARCH_TODOS, params)).fetchall()
+        return _search_results_from_rows(rows, search, limit)
+    except Exception as e:
+        _logger.error("Error while searching todos from user: %s", e)
+        raise e
+
+
+async def update_owned_todo(td: Todo, conn: AsyncConnection) -> int:
+    """
+    Async counterpart of src.data.todo_methods.update_owned_todo.
+    """
+    try:
+        await _bump_todo_version(td.user_id, conn)
+        res = (await _execute(conn, _UPDATE_OWNED_TODO, _todo_params(td))).first()
+        if res is None:
+            raise NoData
+
+        return res.id
+    except Exception as e:
+        _logger.error("Error while updating owned TODO: %s", e)
+        raise e
+
+
+async def update_todos(tds: List[Todo], conn: AsyncConnection) -> List[int]:
+    """
+    Async counterpart of src.data.todo_methods.update_todos.
+    """
+    try:
+        if not tds:
+            return []
+
+        for user_id in sorted({td.user_id for td in tds}):
+            await _bump_todo_version(user_id, conn)
+
+        rows = (await _execute(conn, _UPDATE_TODOS, _todo_list_params(tds))).fetchall()
+
+        return [res.id for res in rows]
+    except Exception as e:
+        _logger.error("Error while updating TODO list: %s", e)
+        raise e
+
+
+async def delete_owned_todo(todo_id: int, user_id: int, conn: AsyncConnection) -> int:
+    """
+    Async counterpart of src.data.todo_methods.delete_owned_todo.
+    """
+    try:
+        await _bump_todo_version(user_id, conn)
+        await _save_tombstones([todo_id], user_id, conn)
+        res = (
+            await _execute(conn, _DELETE_OWNED_TODO, {"id": todo_id, "user_id": user_id})
+        ).first()
+        if res is None:
+            raise NoData
+
+        return res.id
+    except Exception as e:
+        _logger.error("Error while deleting owned TODO: %s", e)
+        raise e
+
+
+async def delete_todos(
+    todo_ids: List[int], user_id: int, conn: AsyncConnection
+) -> List[int]:
+    """
+    Async counterpart of src.data.todo_methods.delete_todos.
+    """
+    try:
+        if not todo_ids:
+            return []
+
+        await _bump_todo_version(user_id, conn)
+        await _save_tombstones(todo_ids, user_id, conn)
+        rows = (
+            await _execute(conn, _DELETE_TODOS, {"user_id": user_id, "ids": todo_ids})
+        ).fetchall()
+
+        return [res.id for res in rows]
+    except Exception as e:
+        _logger.error("Error while deleting TODO list: %s", e)
+        raise e
@@ -1,14 +1,29 @@
 import os
 import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, List, Optional
 
 from dotenv import load_dotenv
-from sqlalchemy import Connection, URL, create_engine, text
+from sqlalchemy import Connection, Engine, URL, create_engine, event, text
+
+from src.common.request_stats import record_pool_wait, record_query
+from src.data.replicas import ReplicaSet
+from src.data.slow_queries import SlowQueryLog, slow_query_log_from_env
+from src.data.sqlite import configure_engine as configure_sqlite_engine
 
 _logger = logging.getLogger("DBSETUP")
 
-def _db_init():
+def get_db_url() -> URL:
+    """
+    Returns the url of the database selected through DB_BACKEND (postgresql by default, or sqlite).
+    """
     load_dotenv()
-    url = URL.create(
+    if get_db_backend() == "sqlite":
+        return URL.create("sqlite+pysqlite", database=os.getenv("DB_SQLITE_PATH", "pytodo.db"))
+
+    return URL.create(
         "postgresql+psycopg2",
         username=os.getenv("DB_USER"),
         password=os.getenv("DB_PASSWORD"),
@@ -17,14 +32,147 @@ def _db_init():
         database=os.getenv("DB_NAME"),
     )
 
-    return create_engine(
-        url,
-        connect_args={"options": f"-csearch_path={os.getenv('DB_SCHEMA')}"},
-        pool_pre_ping=True,
+
+def get_replica_urls() -> List[URL]:
+    """
+    Returns the urls of the read replicas listed in DB_REPLICA_HOSTS (ex. replica1:5432,replica2),
+    which are reached with the same database name and credentials as the primary.
+    """
+    load_dotenv()
+    urls: List[URL] = []
+    for host in os.getenv("DB_REPLICA_HOSTS", "").split(","):
+        if not host.strip():
+            continue
+        name, _, port = host.strip().partition(":")
+        urls.append(get_db_url().set(host=name, port=int(port or os.getenv("DB_PORT", 5432))))
+    return urls
+
+
+def get_db_backend() -> str:
+    """
+    Returns the database backend selected through DB_BACKEND, either postgresql or sqlite.
+    """
+    load_dotenv()
+    backend = os.getenv("DB_BACKEND", "postgresql")
+    if backend not in ("postgresql", "sqlite"):
+        raise ValueError(f"Unknown database backend {backend}")
+    return backend
+
+
+def _db_init(url: Optional[URL] = None):
+    # a gevent worker runs hundreds of requests at once, so they queue on a larger pool without overflow
+    # instead of opening and closing a connection for every burst
+    gevent_mode = os.getenv("SERVER_MODE", "sync") == "gevent"
+    pool_options = {
+        "pool_pre_ping": True,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 20 if gevent_mode else 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 0 if gevent_mode else 10)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", -1)),
+    }
+
+    url = url or get_db_url()
+    if get_db_backend() == "sqlite":
+        engine = create_engine(url, **pool_options)
+        configure_sqlite_engine(
+            engine, busy_timeout=int(os.getenv("DB_SQLITE_BUSY_TIMEOUT", 5000))
+        )
+    else:
+        engine = create_engine(
+            url,
+            connect_args={"options": f"-csearch_path={os.getenv('DB_SCHEMA')}"},
+            **pool_options,
+        )
+
+    install_query_hooks(engine, slow_query_log_from_env())
+    return engine
+
+
+def _replicas_init() -> Optional[ReplicaSet]:
+    urls = get_replica_urls()
+    if not urls:
+        return None
+    if get_db_backend() != "postgresql":
+        raise ValueError("Read replicas need the postgresql backend")
+
+    return ReplicaSet(
+        [_db_init(x) for x in urls],
+        max_lag=float(os.getenv("DB_REPLICA_MAX_LAG", 5)),
+        check_interval=float(os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", 1)),
     )
 
 
-_engine = _db_init()
+def install_query_hooks(engine: Engine, slow_query_log: Optional[SlowQueryLog] = None):
+    """
+    Adds the amount of queries and the time spent running them to the stats of the current request,
+    and hands them to the slow query log if one is given.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context._query_start
+        record_query(duration)
+        if slow_query_log is not None:
+            slow_query_log.record(conn, cursor, statement, parameters, context, duration)
+
+
+_engine: Optional[Engine] = None
+_engine_pid: Optional[int] = None
+_replicas: Optional[ReplicaSet] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """
+    Returns the engine of the process, creating it on first use so importing the DAL doesn't read the
+    config or open a pool (ex. in tooling, or in a gunicorn master preloading the app).
+    A process forked after the engine was created drops the pooled connections it inherited, see dispose_engine.
+    """
+    global _engine, _engine_pid, _replicas
+    engine = _engine
+    if engine is not None and _engine_pid == os.getpid():
+        return engine
+
+    with _engine_lock:
+        if _engine is None:
+            _engine = _db_init()
+            _replicas = _replicas_init()
+        elif _engine_pid != os.getpid():
+            _dispose_inherited()
+        _engine_pid = os.getpid()
+        return _engine
+
+
+def get_replicas() -> Optional[ReplicaSet]:
+    """
+    Returns the read replicas configured through DB_REPLICA_HOSTS, or None if there are none.
+    They are created along with the engine, see get_engine.
+    """
+    get_engine()
+    return _replicas
+
+
+def _dispose_inherited():
+    _engine.dispose(close=False)  # type: ignore
+    if _replicas is not None:
+        _replicas.dispose(close=False)
+
+
+def dispose_engine():
+    """
+    Drops the pooled connections inherited from the parent process without closing them, since they are
+    still used by the parent. Meant to be called right after a fork, see gunicorn.conf.py.
+    """
+    global _engine_pid
+    with _engine_lock:
+        if _engine is not None:
+            _dispose_inherited()
+            _engine_pid = os.getpid()
+
 
 def ping_db() -> bool:
     """
@@ -32,23 +180,117 @@ def ping_db() -> bool:
     Returns true if connection is successful and raises an exception if the connection fails
     """
     try:
-        with _engine.connect() as conn:
+        with get_engine().connect() as conn:
             _ = conn.execute(text("SELECT 1"))
     except Exception as e:
-        _logger.error(msg=f"Pinging database failed with error {e}")
+        _logger.error("Pinging database failed with error %s", e)
         return False
     else:
-        _logger.info(msg="Pinging database succeded")
+        _logger.info("Pinging database succeded")
         return True
 
 
+class _ConnectionScope:
+    """
+    Holds the connections shared by every transaction manager within a scope (ex. a request),
+    one to the primary and one to a replica for the read only managers.
+    The connections are only checked out from their pool once they are first needed.
+    """
+
+    def __init__(self, read_from_primary: bool = False):
+        self.__read_from_primary = read_from_primary
+        self.__connection: Optional[Connection] = None
+        self.__replica_connection: Optional[Connection] = None
+
+    def get_connection(self, read_only: bool = False) -> Connection:
+        # a read within a write transaction must see what the transaction wrote
+        in_write = self.__connection is not None and self.__connection.in_transaction()
+        if read_only and not self.__read_from_primary and not in_write:
+            replica_connection = self.__get_replica_connection()
+            if replica_connection is not None:
+                return replica_connection
+
+        if self.__connection is None:
+            self.__connection = self.__connect(get_engine())
+        return self.__connection
+
+    def __get_replica_connection(self) -> Optional[Connection]:
+        if self.__replica_connection is None:
+            replicas = get_replicas()
+            engine = replicas.choose() if replicas is not None else None
+            if engine is None:
+                return None
+            try:
+                self.__replica_connection = self.__connect(engine)
+            except Exception as e:
+                # the replica may have gone down since its last lag check
+                _logger.warning("Connecting to replica %s failed, reading from the primary: %s", engine.url.host, e)
+                replicas.report_failure(engine)  # type: ignore
+                return None
+        return self.__replica_connection
+
+    def __connect(self, engine: Engine) -> Connection:
+        start = time.perf_counter()
+        connection = engine.connect()
+        record_pool_wait(time.perf_counter() - start)
+        return connection
+
+    def close(self):
+        for connection in (self.__connection, self.__replica_connection):
+            if connection is not None:
+                connection.close()
+        self.__connection = None
+        self.__replica_connection = None
+
+
+_current_scope: ContextVar[Optional[_ConnectionScope]] = ContextVar(
+    "_current_scope", default=None
+)
+
+
+def begin_connection_scope(read_from_primary: bool = False):
+    """
+    Starts a scope in which every transaction manager shares a single pooled connection
+    (plus one to a replica for the read only ones, unless read_from_primary is set).
+    Meant to be called at the start of a request, see end_connection_scope.
+    """
+    if _current_scope.get() is None:
+        _current_scope.set(_ConnectionScope(read_from_primary))
+
+
+def end_connection_scope(exc: Optional[BaseException] = None):
+    """
+    Ends the current connection scope and returns its connection to the pool, if one was checked out.
+    Meant to be called at the teardown of a request, see begin_connection_scope.
+    """
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.close()
+        _current_scope.set(None)
+
+
+def call_after_commit(conn: Connection, callback: Callable[[], None]):
+    """
+    Runs the callback once the outermost transaction manager of the connection commits, ex. to drop a cached
+    copy of a row only when concurrent requests can no longer load the old one. Dropped if it rolls back instead.
+
+    Usage:
+        call_after_commit(conn, lambda: cache.invalidate(user_id))
+    """
+    conn.info.setdefault("after_commit", []).append(callback)
+
+
 class TransactionManager:
     """
     Class that is used to manage database transactions during orchestration of database operations.
     It automatically opens, closes, rollbacks and commits sessions for the user.
+    Within a connection scope (ex. a request) every manager shares the same connection,
+    and managers nested inside another one run as a savepoint of the outer transaction.
 
     Parameters:
         debug: A boolean value used to determine whether or not the transaction should rollback by default
+        read_only: Whether the transaction only reads, in which case it runs on a read replica when there is one
+                    that isn't lagging, unless the scope reads from the primary (see begin_connection_scope)
 
     Usage:
         In BL:
@@ -61,17 +303,48 @@ class TransactionManager:
             tm.execute(text("SOME SQL QUERY"))
     """
 
-    def __init__(self, debug: bool = False):
-        self.__connection = Connection(_engine)
-        self.__connection.execute(text("SET search_path TO :schema"), {"schema": os.getenv('DB_SCHEMA')})
+    def __init__(self, debug: bool = False, read_only: bool = False):
         self.__debug = debug
+        self.__read_only = read_only
+        self.__owned_scope: Optional[_ConnectionScope] = None
 
     def __enter__(self):
-        return self.__connection
+        scope = _current_scope.get()
+        if scope is None:  # outside of a scope the manager is responsible for its own connection
+            scope = self.__owned_scope = _ConnectionScope()
+            self.__scope_token = _current_scope.set(scope)
+
+        try:
+            connection = self.__connection = scope.get_connection(self.__read_only)
+            if connection.in_transaction():
+                self.__transaction = connection.begin_nested()
+            else:
+                self.__transaction = connection.begin()
+        except Exception:
+            self.__release_owned_scope()
+            raise
+
+        return connection
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if exc_type or self.__debug:
-            self.__connection.rollback()
-        else:
-            self.__connection.commit()
-        self.__connection.close()
+        try:
+            if exc_type or self.__debug:
+                self.__transaction.rollback()
+            else:
+                self.__transaction.commit()
+        finally:
+            # the info lives as long as the pooled connection, so the callbacks never outlive the transaction
+            callbacks = []
+            if not self.__connection.in_transaction():
+                callbacks = self.__connection.info.pop("after_commit", [])
+            self.__release_owned_scope()
+
+        if not exc_type and not self.__debug:
+            for callback in callbacks:
+                callback()
+
+    def __release_owned_scope(self):
+        if self.__owned_scope is not None:
+            self.__owned_scope.close()
+            _current_scope.reset(self.__scope_token)
+            self.__owned_scope = None
@@ -0,0 +1,41 @@
+import logging
+
+from psycopg2 import OperationalError, extensions
+
+_logger = logging.getLogger("GREENDB")
+
+
+def _gevent_wait_callback(conn, timeout=None):
+    # psycopg2 hands the connection over in non blocking mode and calls this until the query is done
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state}")
+
+
+def make_psycopg2_green():
+    """
+    Makes psycopg2 wait for the database through the gevent hub, so the other greenlets of the worker
+    keep running while a query is in flight instead of the whole worker blocking on the socket.
+    Must be called in a gevent monkey patched process (ex. a gunicorn -k gevent worker), before any query.
+
+    Usage:
+        make_psycopg2_green()
+        with TransactionManager() as conn:
+            ...
+    """
+    from gevent import monkey
+
+    if not monkey.is_module_patched("socket"):
+        raise RuntimeError("psycopg2 can only be made green in a gevent monkey patched process")
+
+    extensions.set_wait_callback(_gevent_wait_callback)
+    _logger.info("psycopg2 now waits through gevent")
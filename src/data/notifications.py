@@ -0,0 +1,192 @@
+import logging
+import os
+import select
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+
+from src.data.db import get_db_backend, get_engine
+
+_logger = logging.getLogger("NOTIFICATIONS")
+
+# notified by the todo version bump with the id of the user whose list changed, see todo_methods
+TODO_CHANGES_CHANNEL = "todo_changes"
+
+
+class Subscription:
+    """
+    The changes to the todo list of a user, as seen by one client. Changes that happen while the client
+    isn't waiting are coalesced, since it fetches every change since its cursor anyways.
+    """
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.__changed = threading.Event()
+
+    def notify(self):
+        self.__changed.set()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Returns True once the list changed since the last call, or False if it didn't within timeout seconds.
+        """
+        changed = self.__changed.wait(timeout)
+        if changed:
+            self.__changed.clear()
+        return changed
+
+
+class TodoChangeListener:
+    """
+    Listens for todo changes on a single dedicated connection and hands them to the subscriptions of the
+    user they belong to, so any amount of clients can wait for changes without holding a connection each.
+    The connection is watched by a background thread, which reconnects after reconnect_delay seconds when
+    it is lost. Every subscription is notified once it is back, since changes may have been missed meanwhile.
+
+    Parameters:
+        connect: Returns a new psycopg2 connection in autocommit mode
+        reconnect_delay: The amount of seconds to wait before reconnecting
+        check_interval: The amount of seconds without notifications after which the connection is checked
+
+    Usage:
+        listener = TodoChangeListener(connect)
+        listener.start()
+        subscription = listener.subscribe(user_id)
+        if subscription.wait(timeout=15):
+            ...
+        listener.unsubscribe(subscription)
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        reconnect_delay: float = 1,
+        check_interval: float = 30,
+    ):
+        self.reconnect_delay = reconnect_delay
+        self.check_interval = check_interval
+        self.__connect = connect
+        self.__subscriptions: Dict[int, Set[Subscription]] = {}
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id)
+        with self.__lock:
+            self.__subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.__lock:
+            subscriptions = self.__subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.__subscriptions.pop(subscription.user_id, None)
+
+    def dispatch(self, payload: str):
+        """
+        Notifies the subscriptions of the user whose id is the payload of a notification.
+        """
+        try:
+            user_id = int(payload)
+        except ValueError:
+            _logger.warning("Ignored malformed todo change notification %r", payload)
+            return
+
+        with self.__lock:
+            subscriptions = list(self.__subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.notify()
+
+    def __dispatch_all(self):
+        with self.__lock:
+            subscriptions = [x for subs in self.__subscriptions.values() for x in subs]
+        for subscription in subscriptions:
+            subscription.notify()
+
+    def __listen(self, conn, reconnected: bool):
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {TODO_CHANGES_CHANNEL}")
+        if reconnected:
+            self.__dispatch_all()
+
+        while not self.__stopped.is_set():
+            if select.select([conn], [], [], self.check_interval) == ([], [], []):
+                # a connection dropped without a reset is only noticed when writing to it
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                continue
+
+            conn.poll()
+            while conn.notifies:
+                self.dispatch(conn.notifies.pop(0).payload)
+
+    def __run(self):
+        connected_before = False
+        while not self.__stopped.is_set():
+            conn = None
+            try:
+                conn = self.__connect()
+                reconnected, connected_before = connected_before, True
+                self.__listen(conn, reconnected)
+            except Exception as e:
+                _logger.warning("Listening for todo changes failed, reconnecting: %s", e)
+                self.__stopped.wait(self.reconnect_delay)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def start(self):
+        self.__thread = threading.Thread(
+            target=self.__run, name="todo-change-listener", daemon=True
+        )
+        self.__thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stops listening, the background thread notices it within check_interval seconds.
+        """
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join(timeout)
+
+
+def _connect():
+    # detached from the pool, since it stays checked out for the whole life of the process
+    conn = get_engine().raw_connection()
+    conn.detach()
+    dbapi_conn = conn.dbapi_connection
+    dbapi_conn.autocommit = True
+    return dbapi_conn
+
+
+_listener: Optional[TodoChangeListener] = None
+_listener_pid: Optional[int] = None
+_listener_lock = threading.Lock()
+
+
+def get_todo_change_listener() -> TodoChangeListener:
+    """
+    Returns the todo change listener of the process, starting it on first use. A forked process starts its own,
+    since the thread of the parent didn't survive the fork. Only available with the postgresql backend.
+    """
+    global _listener, _listener_pid
+    listener = _listener
+    if listener is not None and _listener_pid == os.getpid():
+        return listener
+
+    if get_db_backend() != "postgresql":
+        raise ValueError("Todo change notifications need the postgresql backend")
+
+    with _listener_lock:
+        if _listener is None or _listener_pid != os.getpid():
+            _listener = TodoChangeListener(
+                _connect,
+                reconnect_delay=float(os.getenv("TODO_EVENTS_RECONNECT_DELAY", 1)),
+            )
+            _listener.start()
+            _listener_pid = os.getpid()
+        return _listener
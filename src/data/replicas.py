@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from sqlalchemy import Engine, text
+
+_logger = logging.getLogger("REPLICAS")
+
+# 0 when every received change has been replayed (ex. nothing was written lately), otherwise the age of the
+# last replayed transaction. Also 0 on a server that isn't a replica, since the functions return null there
+_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    + "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def replication_lag(engine: Engine) -> float:
+    """
+    Returns the amount of seconds the postgres replica behind the engine lags behind its primary.
+    """
+    with engine.connect() as conn:
+        return float(conn.execute(_LAG_QUERY).scalar() or 0)
+
+
+class _Replica:
+    __slots__ = ("engine", "lag", "checked_at")
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.lag = 0.0
+        self.checked_at: Optional[float] = None
+
+
+class ReplicaSet:
+    """
+    The read replicas of the primary database, handed out in turns. The replication lag of each replica is
+    checked at most every check_interval seconds, and a replica lagging more than max_lag (or failing the check)
+    is skipped until it catches up. When every replica is skipped reads go to the primary.
+
+    Parameters:
+        engines: The engines of the replicas
+        max_lag: The amount of seconds a replica can lag behind the primary before being skipped
+        check_interval: The minimum amount of seconds between two lag checks of a replica
+        measure_lag: Returns the lag of a replica in seconds, see replication_lag
+
+    Usage:
+        replicas = ReplicaSet([create_engine(url) for url in urls], max_lag=5, check_interval=1)
+        engine = replicas.choose() or primary_engine
+    """
+
+    def __init__(
+        self,
+        engines: List[Engine],
+        max_lag: float,
+        check_interval: float,
+        measure_lag: Callable[[Engine], float] = replication_lag,
+    ):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.__measure_lag = measure_lag
+        self.__replicas = [_Replica(x) for x in engines]
+        self.__next = 0
+        self.__lock = threading.Lock()
+
+    def __is_caught_up(self, replica: _Replica) -> bool:
+        now = time.monotonic()
+        with self.__lock:
+            # only one thread checks a replica, the others use the last known lag meanwhile
+            check = replica.checked_at is None or now - replica.checked_at >= self.check_interval
+            if check:
+                replica.checked_at = now
+
+        if check:
+            try:
+                replica.lag = self.__measure_lag(replica.engine)
+            except Exception as e:
+                _logger.warning("Checking the lag of replica %s failed: %s", replica.engine.url.host, e)
+                replica.lag = float("inf")
+            if replica.lag > self.max_lag:
+                _logger.warning("Replica %s lags %.1fs behind, reading from the primary", replica.engine.url.host, replica.lag)
+
+        return replica.lag <= self.max_lag
+
+    def choose(self) -> Optional[Engine]:
+        """
+        Returns the engine of the next replica that isn't lagging, or None if they all are.
+        """
+        with self.__lock:
+            start = self.__next
+            self.__next = (self.__next + 1) % len(self.__replicas)
+
+        for i in range(len(self.__replicas)):
+            replica = self.__replicas[(start + i) % len(self.__replicas)]
+            if self.__is_caught_up(replica):
+                return replica.engine
+        return None
+
+    def report_failure(self, engine: Engine):
+        """
+        Skips the replica of the engine until its next lag check, ex. after connecting to it failed.
+        """
+        for replica in self.__replicas:
+            if replica.engine is engine:
+                with self.__lock:
+                    replica.lag = float("inf")
+                    replica.checked_at = time.monotonic()
+
+    def dispose(self, close: bool = True):
+        """
+        Disposes the pools of every replica, see Engine.dispose.
+        """
+        for replica in self.__replicas:
+            replica.engine.dispose(close=close)
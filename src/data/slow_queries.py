@@ -0,0 +1,172 @@
+import logging
+import os
+import random
+import re
+import sys
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Optional
+
+from src.data.statements import get_prepared_statement
+
+_logger = logging.getLogger("SLOWQUERY")
+
+_REDACTED = "[REDACTED]"
+_SENSITIVE_PARAMS = ("password",)
+
+# the statements of the DAL run as EXECUTE <name>(...) when prepared statements are enabled, see statements
+_EXECUTE_PATTERN = re.compile(r"EXECUTE\s+(\w+)", re.IGNORECASE)
+
+
+def _redact(params) -> object:
+    if isinstance(params, dict):
+        return {
+            key: _REDACTED if any(x in key.lower() for x in _SENSITIVE_PARAMS) else value
+            for key, value in params.items()
+        }
+    return params
+
+
+def _explained_query(statement: str) -> Optional[str]:
+    # only reads are explained, since ANALYZE runs the query again
+    query = statement.lstrip()
+    if query.upper().startswith("SELECT"):
+        return query
+
+    match = _EXECUTE_PATTERN.match(query)
+    if match is not None:
+        prepared = get_prepared_statement(match.group(1))
+        if prepared is not None and prepared.sql.lstrip().upper().startswith("SELECT"):
+            return prepared.sql
+    return None
+
+
+def _calling_dal_function() -> str:
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("src.data") and module.endswith("_methods"):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class SlowQueryLog:
+    """
+    Logs the queries slower than the threshold with their parameters (passwords redacted), duration and
+    the DAL function that ran them. A sampled fraction of the slow SELECTs (including the prepared ones run
+    through EXECUTE) is run again under EXPLAIN (ANALYZE, BUFFERS) (EXPLAIN QUERY PLAN on sqlite) and the plans
+    are written to a rotating file, along with the query a prepared statement was made from.
+
+    Parameters:
+        threshold: The amount of seconds after which a query is considered slow
+        explain_rate: The fraction of slow SELECTs whose plan is captured, between 0 and 1
+        plan_file: The path of the file the plans are written to
+        plan_file_bytes: The size after which the plan file is rotated, 5 old files are kept
+
+    Usage:
+        slow_query_log = SlowQueryLog(threshold=0.2, explain_rate=0.1, plan_file="log/query_plans.log", plan_file_bytes=10_000_000)
+        install_query_hooks(engine, slow_query_log)
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        explain_rate: float,
+        plan_file: str,
+        plan_file_bytes: int,
+    ):
+        self.threshold = threshold
+        self.explain_rate = explain_rate
+        self.__plan_file = plan_file
+        self.__plan_file_bytes = plan_file_bytes
+        self.__plan_logger: Optional[logging.Logger] = None
+
+    def __get_plan_logger(self) -> logging.Logger:
+        # the file is only opened once there is a plan to write
+        if self.__plan_logger is None:
+            os.makedirs(os.path.dirname(self.__plan_file) or ".", exist_ok=True)
+            handler = RotatingFileHandler(
+                self.__plan_file, maxBytes=self.__plan_file_bytes, backupCount=5
+            )
+            handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s"))
+            plan_logger = logging.getLogger("SLOWQUERY.PLANS")
+            plan_logger.addHandler(handler)
+            plan_logger.setLevel(logging.INFO)
+            plan_logger.propagate = False
+            self.__plan_logger = plan_logger
+        return self.__plan_logger
+
+    def record(self, conn, cursor, statement: str, parameters, context, duration: float):
+        """
+        Logs the query if it is slow, meant to be called by the after_cursor_execute engine hook.
+        """
+        if duration < self.threshold:
+            return
+
+        compiled_params: Dict = {}
+        if context is not None and context.compiled_parameters:
+            compiled_params = context.compiled_parameters[0]
+        params = _redact(compiled_params or parameters)
+        function = _calling_dal_function()
+
+        _logger.warning(
+            "Slow query (%.1fms) from %s: %s with %s",
+            duration * 1000,
+            function,
+            statement,
+            params,
+        )
+
+        if self.explain_rate <= 0:
+            return
+        query = _explained_query(statement)
+        if query is not None and random.random() < self.explain_rate:
+            self.__explain(conn, cursor, statement, query, parameters, function, params)
+
+    def __explain(self, conn, cursor, statement: str, query: str, parameters, function: str, params):
+        dialect = conn.dialect
+        if dialect.driver not in ("psycopg2", "pysqlite"):
+            return
+
+        # the plan is read through the driver directly, so it doesn't go through these hooks again
+        explain_cursor = cursor.connection.cursor()
+        try:
+            if dialect.driver == "psycopg2":
+                # a failing EXPLAIN would otherwise abort the transaction of the request
+                explain_cursor.execute("SAVEPOINT slow_query_explain")
+                try:
+                    # EXPLAIN EXECUTE plans a prepared statement with the parameters it was given
+                    explain_cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+                    plan = "\n".join(row[0] for row in explain_cursor.fetchall())
+                    explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+                except Exception:
+                    explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                    raise
+            else:
+                explain_cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+                plan = "\n".join(str(row[-1]) for row in explain_cursor.fetchall())
+
+            self.__get_plan_logger().info(
+                "%s\n%s\nparameters: %s\n%s\n", function, query, params, plan
+            )
+        except Exception as e:
+            _logger.error("Error while capturing the plan of a slow query: %s", e)
+        finally:
+            explain_cursor.close()
+
+
+def slow_query_log_from_env() -> Optional[SlowQueryLog]:
+    """
+    Returns the slow query log configured through DB_SLOW_QUERY_MS and related variables,
+    or None if it isn't enabled.
+    """
+    threshold_ms = os.getenv("DB_SLOW_QUERY_MS")
+    if not threshold_ms:
+        return None
+
+    return SlowQueryLog(
+        threshold=float(threshold_ms) / 1000,
+        explain_rate=float(os.getenv("DB_SLOW_QUERY_EXPLAIN_RATE", 0)),
+        plan_file=os.getenv("DB_SLOW_QUERY_PLAN_FILE", "log/query_plans.log"),
+        plan_file_bytes=int(os.getenv("DB_SLOW_QUERY_PLAN_FILE_BYTES", 10_000_000)),
+    )
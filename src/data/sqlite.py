@@ -0,0 +1,70 @@
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import Engine, event
+
+
+def _format_datetime(value: datetime) -> str:
+    # fixed width so timestamps stored as text compare in chronological order
+    return value.isoformat(" ", "microseconds")
+
+
+# replaces the default adapter, which is deprecated and drops the microseconds when they are 0
+sqlite3.register_adapter(datetime, _format_datetime)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return _format_datetime(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def adapt_params(params: Optional[Dict]) -> Optional[Dict]:
+    """
+    Adapts statement parameters to sqlite, which has no array type.
+    Lists (ex. the columns of a bulk insert) are sent as json arrays and read back with json_each.
+    Parameters:
+        - params: The values for the bind parameters of a statement
+    Returns:
+        The parameters with every list encoded as a json array.
+
+    Usage:
+        conn.execute(stmt.clause_for("sqlite"), adapt_params(params))
+    """
+    if not params:
+        return params
+
+    return {
+        key: json.dumps(value, default=_json_default) if isinstance(value, list) else value
+        for key, value in params.items()
+    }
+
+
+def configure_engine(engine: Engine, busy_timeout: int):
+    """
+    Sets up every connection of a sqlite engine: WAL journaling so readers don't block the writer,
+    enforced foreign keys and explicit transactions so savepoints (nested transaction managers) work.
+    Parameters:
+        - engine: A sqlite engine
+        - busy_timeout: The amount of milliseconds to wait for another connection's write lock
+
+    Usage:
+        configure_engine(create_engine("sqlite+pysqlite:///pytodo.db"), busy_timeout=5000)
+    """
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # the driver's own transaction handling skips savepoints, so BEGIN is emitted by the engine instead
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout)}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import os
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import Connection, CursorResult, TextClause, text
+
+from src.data.sqlite import adapt_params as adapt_sqlite_params
+
+_logger = logging.getLogger("STATEMENTS")
+
+# matches :name binds while skipping postgres style ::casts
+_BIND_PATTERN = re.compile(r"(?<![:\w]):(\w+)")
+
+_registry: Dict[str, "Statement"] = {}
+_prepared_registry: Dict[str, "Statement"] = {}
+
+# bumping the generation makes every pooled connection drop its prepared statements before their next use.
+# It is a plain global, so it only reaches the connections of the process that bumped it
+_generation = 0
+
+
+def _prepared_statements_enabled() -> bool:
+    return os.getenv("DB_PREPARED_STATEMENTS", "false").lower() == "true"
+
+
+class Statement:
+    """
+    A query that is compiled once and kept in the statement registry under a unique name.
+    When prepared statements are enabled (DB_PREPARED_STATEMENTS=true) it is also prepared server side
+    the first time it runs on each pooled connection, so postgres only parses and plans it once per connection.
+
+    Parameters:
+        name: The unique name of the statement in the registry
+        sql: The query, using :name style bind parameters
+        prepare: Whether or not the statement may be run as a server side prepared statement
+        variants: The query for other database backends, by dialect name (ex. sqlite), when it differs
+
+    Usage:
+        Statements should be created through the statement function at module level.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        sql: str,
+        prepare: bool = True,
+        variants: Optional[Dict[str, str]] = None,
+    ):
+        self.name = name
+        self.sql = sql
+        self.prepare = prepare
+        self.variants: Dict[str, str] = dict(variants or {})
+        self.clause: TextClause = text(sql)
+        self.__variant_clauses = {
+            dialect: text(x) for dialect, x in self.variants.items()
+        }
+
+        params: List[str] = []
+        for param in _BIND_PATTERN.findall(sql):
+            if param not in params:
+                params.append(param)
+
+        # the hash keeps a changed query from reusing a stale definition on long lived connections,
+        # the name is cut short since postgres truncates identifiers past 63 characters
+        digest = hashlib.sha1(sql.encode()).hexdigest()[:8]
+        self.prepared_name = re.sub(r"\W", "_", name)[:48] + "_" + digest
+        self.prepare_sql = f"PREPARE {self.prepared_name} AS " + _BIND_PATTERN.sub(
+            lambda m: f"${params.index(m.group(1)) + 1}", sql
+        )
+        self.execute_clause: TextClause = text(
+            f"EXECUTE {self.prepared_name}"
+            + (f"({', '.join(':' + x for x in params)})" if params else "")
+        )
+
+    def clause_for(self, dialect: str) -> TextClause:
+        """
+        Returns the compiled query for the given dialect, the postgres one unless a variant was given.
+        """
+        return self.__variant_clauses.get(dialect, self.clause)
+
+
+def statement(
+    name: str,
+    sql: str,
+    prepare: bool = True,
+    variants: Optional[Dict[str, str]] = None,
+) -> Statement:
+    """
+    Returns the statement registered under the given name, compiling and registering it if needed.
+    Parameters:
+        - name: The unique name of the statement
+        - sql: The query, using :name style bind parameters
+        - prepare: Whether or not the statement may be run as a server side prepared statement
+        - variants: The query for other database backends, by dialect name (ex. sqlite), when it differs
+    Returns:
+        The registered statement.
+
+    Usage:
+        _GET_USER_ID = statement("user.get_id", "SELECT id, username FROM users WHERE id = :id")
+    """
+    registered = _registry.get(name)
+    if registered is not None:
+        if registered.sql != sql or registered.variants != (variants or {}):
+            raise ValueError(f"Statement {name} is already registered with another query")
+        return registered
+
+    registered = Statement(name, sql, prepare, variants)
+    _registry[name] = registered
+    _prepared_registry[registered.prepared_name] = registered
+    return registered
+
+
+def get_prepared_statement(prepared_name: str) -> Optional[Statement]:
+    """
+    Returns the registered statement prepared under the given name, or None if there is none.
+    Used to tell what an EXECUTE runs, ex. to decide whether the slow query log may explain it.
+    """
+    return _prepared_registry.get(prepared_name)
+
+
+def execute(
+    conn: Connection,
+    stmt: Statement,
+    params: Optional[Dict] = None,
+    execution_options: Optional[Dict] = None,
+) -> CursorResult:
+    """
+    Executes a registered statement, through its server side prepared version when enabled.
+    Parameters:
+        - conn: A connection to execute queries from
+        - stmt: The registered statement to run
+        - params: The values for the bind parameters of the statement
+        - execution_options: Extra execution options, statements using stream_results or yield_per are never prepared
+    Returns:
+        The result of the execution.
+
+    Usage:
+        res = execute(conn, _GET_USER_ID, {"id": user_id}).first()
+    """
+    if conn.dialect.name == "sqlite":
+        return conn.execute(
+            stmt.clause_for("sqlite"),
+            adapt_sqlite_params(params),
+            execution_options=execution_options,
+        )
+
+    if (
+        not stmt.prepare
+        or execution_options
+        or conn.dialect.name != "postgresql"
+        or not _prepared_statements_enabled()
+    ):
+        return conn.execute(stmt.clause, params, execution_options=execution_options)
+
+    info = conn.connection.info  # lives as long as the underlying dbapi connection
+    if info.get("prepared_generation") != _generation:
+        if info.get("prepared_statements"):
+            conn.exec_driver_sql("DEALLOCATE ALL")
+        info["prepared_generation"] = _generation
+        info["prepared_statements"] = set()
+
+    prepared = info["prepared_statements"]
+    if stmt.prepared_name not in prepared:
+        conn.exec_driver_sql(stmt.prepare_sql)
+        prepared.add(stmt.prepared_name)
+
+    return conn.execute(stmt.execute_clause, params)
+
+
+def invalidate_prepared_statements():
+    """
+    Makes every pooled connection of this process drop its prepared statements before they are used again.
+    Should be called after migrations that change the tables used by the registered statements. Every worker
+    process has its own pool and generation, so it has to be called in each of them, reloading the workers
+    (ex. kill -HUP on gunicorn) is the way to reach all of them at once.
+
+    Usage:
+        invalidate_prepared_statements()
+    """
+    global _generation
+    _generation += 1
+    _logger.info("Prepared statements invalidated")
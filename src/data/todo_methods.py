@@ -1,14 +1,293 @@
+import html
 import logging
-from typing import List
+import re
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from psycopg2.errors import NoData
-from sqlalchemy import Connection, text
+from sqlalchemy import Connection
 
 from src.common import PriorityType
-from src.core import Todo
+from src.core import Todo, TodoQuery, TodoRecord
+from src.data.statements import Statement, execute, statement
 
 _logger = logging.getLogger("TODODAL")
 
+_STREAM_BATCH_SIZE = 500
+
+_TODO_COLUMNS = "id, user_id, description, date_created, date_due, priority, completed"
+
+# every mutation bumps the todo_version of the user first, then stamps the rows it changes with it
+_USER_VERSION = "(SELECT todo_version FROM users WHERE users.id = {})"
+
+_SAVE_TODO = statement(
+    "todo.save",
+    "INSERT INTO todos (user_id, description, date_created, date_due, priority, completed, change_version) "
+    + "VALUES (:user_id, :description, :date_created, :date_due, :priority, :completed, "
+    + _USER_VERSION.format(":user_id")
+    + ") RETURNING id",
+)
+
+_SAVE_TODOS = statement(
+    "todo.save_many",
+    "INSERT INTO todos (user_id, description, date_created, date_due, priority, completed, change_version) "
+    + "SELECT user_id, description, date_created, date_due, priority, completed, "
+    + _USER_VERSION.format("t.user_id")
+    + " FROM UNNEST("
+    + "CAST(:user_ids AS integer[]), CAST(:descriptions AS varchar[]), "
+    + "CAST(:dates_created AS timestamp[]), CAST(:dates_due AS timestamp[]), "
+    + "CAST(:priorities AS prioritytype[]), CAST(:completed AS boolean[])"
+    + ") WITH ORDINALITY AS t(user_id, description, date_created, date_due, priority, completed, ord) "
+    + "ORDER BY ord RETURNING id",
+    prepare=False,
+    variants={
+        "sqlite": "INSERT INTO todos (user_id, description, date_created, date_due, priority, completed, change_version) "
+        + "SELECT u.value, d.value, dc.value, dd.value, p.value, c.value, "
+        + _USER_VERSION.format("u.value")
+        + " FROM json_each(:user_ids) AS u "
+        + "JOIN json_each(:descriptions) AS d ON d.key = u.key "
+        + "JOIN json_each(:dates_created) AS dc ON dc.key = u.key "
+        + "JOIN json_each(:dates_due) AS dd ON dd.key = u.key "
+        + "JOIN json_each(:priorities) AS p ON p.key = u.key "
+        + "JOIN json_each(:completed) AS c ON c.key = u.key "
+        + "ORDER BY u.key RETURNING id",
+    },
+)
+
+_GET_TODO_ID = statement(
+    "todo.get_id",
+    "SELECT " + _TODO_COLUMNS + " FROM todos WHERE id = :id",
+)
+
+_GET_TODOS_FROM_USER = statement(
+    "todo.get_from_user",
+    "SELECT " + _TODO_COLUMNS + " FROM todos WHERE user_id = :user_id",
+)
+
+# continues after the keyset (sort value, id) of the last todo of the previous page
+_KEYSET_CONDITIONS = {
+    "id": "id > :after_id",
+    "date_created": "(date_created, id) > (:after_value, :after_id)",
+    "priority": "(priority, id) > (CAST(:after_value AS prioritytype), :after_id)",
+    "date_due": "((date_due, id) > (:after_value, :after_id) OR date_due IS NULL)",
+    "date_due_null": "(date_due IS NULL AND id > :after_id)",
+}
+
+# sqlite stores priorities as their rank, so they compare without the enum cast
+_SQLITE_KEYSET_CONDITIONS = {
+    **_KEYSET_CONDITIONS,
+    "priority": "(priority, id) > (:after_value, :after_id)",
+}
+
+# ascending order puts null due dates last, the same as the (user_id, date_due, id) index
+_ORDER_BY = {
+    "id": "id",
+    "date_created": "date_created, id",
+    "priority": "priority, id",
+    "date_due": "date_due, id",
+}
+
+# sqlite puts nulls first by default
+_SQLITE_ORDER_BY = {
+    **_ORDER_BY,
+    "date_due": "date_due NULLS LAST, id",
+}
+
+# one statement per combination of filters, built the first time it's requested
+_filtered_statements: Dict[tuple, Statement] = {}
+
+
+_UPDATE_OWNED_TODO = statement(
+    "todo.update_owned",
+    "UPDATE todos SET description = :description, date_created = :date_created, "
+    + "date_due = :date_due, priority = :priority, completed = :completed, change_version = "
+    + _USER_VERSION.format(":user_id")
+    + " WHERE id = :id AND user_id = :user_id RETURNING id",
+)
+
+_UPDATE_TODOS = statement(
+    "todo.update_many",
+    "UPDATE todos SET description = t.description, date_created = t.date_created, "
+    + "date_due = t.date_due, priority = t.priority, completed = t.completed, "
+    + "change_version = "
+    + _USER_VERSION.format("t.user_id")
+    + " FROM UNNEST("
+    + "CAST(:ids AS integer[]), CAST(:user_ids AS integer[]), CAST(:descriptions AS varchar[]), "
+    + "CAST(:dates_created AS timestamp[]), CAST(:dates_due AS timestamp[]), "
+    + "CAST(:priorities AS prioritytype[]), CAST(:completed AS boolean[])"
+    + ") AS t(id, user_id, description, date_created, date_due, priority, completed) "
+    + "WHERE todos.id = t.id AND todos.user_id = t.user_id RETURNING todos.id",
+    prepare=False,
+    variants={
+        "sqlite": "UPDATE todos SET description = t.description, date_created = t.date_created, "
+        + "date_due = t.date_due, priority = t.priority, completed = t.completed, "
+        + "change_version = "
+        + _USER_VERSION.format("t.user_id")
+        + " FROM (SELECT i.value AS id, u.value AS user_id, d.value AS description, "
+        + "dc.value AS date_created, dd.value AS date_due, p.value AS priority, c.value AS completed "
+        + "FROM json_each(:ids) AS i "
+        + "JOIN json_each(:user_ids) AS u ON u.key = i.key "
+        + "JOIN json_each(:descriptions) AS d ON d.key = i.key "
+        + "JOIN json_each(:dates_created) AS dc ON dc.key = i.key "
+        + "JOIN json_each(:dates_due) AS dd ON dd.key = i.key "
+        + "JOIN json_each(:priorities) AS p ON p.key = i.key "
+        + "JOIN json_each(:completed) AS c ON c.key = i.key"
+        + ") AS t WHERE todos.id = t.id AND todos.user_id = t.user_id RETURNING id",
+    },
+)
+
+_DELETE_OWNED_TODO = statement(
+    "todo.delete_owned",
+    "DELETE FROM todos WHERE id = :id AND user_id = :user_id RETURNING id",
+)
+
+_GET_TODO_VERSION = statement(
+    "todo.get_version",
+    "SELECT todo_version FROM users WHERE id = :user_id",
+)
+
+# postgres also notifies the listeners of the change once the transaction commits, see notifications
+_BUMP_TODO_VERSION = statement(
+    "todo.bump_version",
+    "WITH bumped AS (UPDATE users SET todo_version = todo_version + 1 WHERE id = :user_id "
+    + "RETURNING id, todo_version) "
+    + "SELECT todo_version, pg_notify('todo_changes', CAST(id AS text)) FROM bumped",
+    variants={
+        "sqlite": "UPDATE users SET todo_version = todo_version + 1 WHERE id = :user_id "
+        + "RETURNING todo_version",
+    },
+)
+
+# written before the todos are deleted, only for the ones that exist and belong to the user.
+# An id can already have a tombstone if sqlite reused it for a new todo, see the todo changes migration
+_TOMBSTONE_UPSERT = (
+    " ON CONFLICT (todo_id) DO UPDATE SET user_id = excluded.user_id, "
+    + "change_version = excluded.change_version"
+)
+_SAVE_TOMBSTONES = statement(
+    "todo.save_tombstones",
+    "INSERT INTO todo_tombstones (todo_id, user_id, change_version) "
+    + "SELECT id, user_id, "
+    + _USER_VERSION.format("todos.user_id")
+    + " FROM todos WHERE user_id = :user_id AND id = ANY(CAST(:ids AS integer[]))"
+    + _TOMBSTONE_UPSERT,
+    prepare=False,
+    variants={
+        "sqlite": "INSERT INTO todo_tombstones (todo_id, user_id, change_version) "
+        + "SELECT id, user_id, "
+        + _USER_VERSION.format("todos.user_id")
+        + " FROM todos WHERE user_id = :user_id AND id IN (SELECT value FROM json_each(:ids))"
+        + _TOMBSTONE_UPSERT,
+    },
+)
+
+_GET_TODO_CHANGES = statement(
+    "todo.get_changes",
+    "SELECT " + _TODO_COLUMNS + ", change_version, FALSE AS deleted FROM todos "
+    + "WHERE user_id = :user_id AND change_version > :since "
+    + "UNION ALL "
+    + "SELECT todo_id, user_id, NULL, NULL, NULL, NULL, NULL, change_version, TRUE FROM todo_tombstones "
+    + "WHERE user_id = :user_id AND change_version > :since AND :with_deleted "
+    + "ORDER BY change_version",
+)
+
+# ranked by relevance then newest first, headlines are only built for the rows of the page.
+# The description is html escaped first so only the <mark> tags of the highlight are markup
+_SEARCH_TODOS = statement(
+    "todo.search",
+    "SELECT " + _TODO_COLUMNS + ", rank, ts_headline('english', "
+    + "replace(replace(replace(description, '&', '&amp;'), '<', '&lt;'), '>', '&gt;'), "
+    + "query, 'StartSel=<mark>, StopSel=</mark>') AS highlight FROM ("
+    + "SELECT " + _TODO_COLUMNS + ", query, ts_rank(description_tsv, query) AS rank "
+    + "FROM todos, websearch_to_tsquery('english', :search) AS query "
+    + "WHERE user_id = :user_id AND description_tsv @@ query "
+    + "AND (CAST(:after_id AS integer) IS NULL OR ts_rank(description_tsv, query) < CAST(:after_rank AS real) "
+    + "OR (ts_rank(description_tsv, query) = CAST(:after_rank AS real) AND id < :after_id)) "
+    + "ORDER BY rank DESC, id DESC LIMIT :limit) AS page "
+    + "ORDER BY rank DESC, id DESC",
+    variants={
+        # no full text search on sqlite, the descriptions containing the whole search text match equally
+        # and are highlighted afterwards, see _highlight_matches
+        "sqlite": "SELECT " + _TODO_COLUMNS + ", 0.0 AS rank, NULL AS highlight "
+        + "FROM todos WHERE user_id = :user_id AND instr(lower(description), lower(:search)) > 0 "
+        + "AND (:after_id IS NULL OR id < :after_id) ORDER BY id DESC LIMIT :limit",
+    },
+)
+
+_DELETE_TODOS = statement(
+    "todo.delete_many",
+    "DELETE FROM todos WHERE user_id = :user_id AND id = ANY(CAST(:ids AS integer[])) "
+    + "RETURNING id",
+    prepare=False,
+    variants={
+        "sqlite": "DELETE FROM todos WHERE user_id = :user_id "
+        + "AND id IN (SELECT value FROM json_each(:ids)) RETURNING id",
+    },
+)
+
+
+# postgres returns the enum label, sqlite the rank
+_PRIORITIES: Dict = {
+    **{x.name: x for x in PriorityType},
+    **{x.value: x for x in PriorityType},
+}
+
+
+def _as_datetime(value) -> Optional[datetime]:
+    # sqlite has no timestamp type, they come back as the text they were stored as
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _record_from_row(td) -> TodoRecord:
+    # rows are trusted, so they skip the validation done when building a Todo
+    return TodoRecord(
+        td.id,
+        td.user_id,
+        td.description,
+        _as_datetime(td.date_created),
+        _as_datetime(td.date_due),
+        _PRIORITIES[td.priority],
+        bool(td.completed),
+    )
+
+
+def _bump_todo_version(user_id: int, conn: Connection) -> int:
+    # called first by every mutation, the row lock it takes also orders concurrent changes to the same user's list
+    res = execute(conn, _BUMP_TODO_VERSION, {"user_id": user_id}).first()
+    if res is None:
+        raise NoData
+
+    return res.todo_version
+
+
+def _save_tombstones(todo_ids: List[int], user_id: int, conn: Connection):
+    execute(conn, _SAVE_TOMBSTONES, {"user_id": user_id, "ids": todo_ids})
+
+
+def get_todo_version(user_id: int, conn: Connection) -> int:
+    """
+    Returns the version of the todo list of the given user, which changes every time one of their todos is saved, updated or deleted.
+    Parameters:
+        - user_id: An integer corresponding to the id value of a user object in the database.
+        - conn: A connection to execute queries from
+    Returns:
+        An integer representing the current version of the user's todo list.
+
+    Usage:
+        version = get_todo_version(user_id, conn)
+    """
+    try:
+        res = execute(conn, _GET_TODO_VERSION, {"user_id": user_id}).first()
+        if res is None:
+            raise NoData
+
+        return res.todo_version
+    except Exception as e:
+        _logger.error("Error while fetching todo list version from user: %s", e)
+        raise e
+
 
 def save_todo(td: Todo, conn: Connection) -> int:
     """
@@ -23,13 +302,10 @@ def save_todo(td: Todo, conn: Connection) -> int:
         new_id = save_todo(td, conn)
     """
     try:
-        query = text(
-            "INSERT INTO todos (user_id, description, date_created, date_due, priority, completed)"
-            + "VALUES (:user_id, :description, :date_created, :date_due, :priority, :completed) RETURNING id"
-        )
-
-        res = conn.execute(
-            query,
+        _bump_todo_version(td.user_id, conn)
+        res = execute(
+            conn,
+            _SAVE_TODO,
             {
                 "user_id": td.user_id,
                 "description": td.description,
@@ -44,103 +320,411 @@ def save_todo(td: Todo, conn: Connection) -> int:
 
         return res.id
     except Exception as e:
-        _logger.error(msg=f"Error while saving TODO: {e}")
+        _logger.error("Error while saving TODO: %s", e)
+        raise e
+
+
+def save_todos(tds: List[Todo], conn: Connection) -> List[int]:
+    """
+    Saves several new todo objects in database with a single statement.
+    Parameters:
+        - tds: A list of objects of type Todo to be saved
+        - conn: A connection to execute queries from
+    Returns:
+        The primary keys (id) of the inserted todo objects in the database, in the same order as the given list.
+
+    Usage:
+        new_ids = save_todos(tds, conn)
+    """
+    try:
+        if not tds:
+            return []
+
+        for user_id in sorted({td.user_id for td in tds}):
+            _bump_todo_version(user_id, conn)
+        rows = execute(
+            conn,
+            _SAVE_TODOS,
+            {
+                "user_ids": [td.user_id for td in tds],
+                "descriptions": [td.description for td in tds],
+                "dates_created": [td.date_created for td in tds],
+                "dates_due": [td.date_due for td in tds],
+                "priorities": [td.priority for td in tds],
+                "completed": [td.completed for td in tds],
+            },
+        ).fetchall()
+        if len(rows) != len(tds):
+            raise Exception("Todo bulk insert returned the wrong amount of ids")
+
+        # identity values are drawn in insertion order, so sorting them maps them back to the input order
+        return sorted(res.id for res in rows)
+    except Exception as e:
+        _logger.error("Error while saving TODO list: %s", e)
         raise e
 
 
-def get_todo_id(todo_id: int, conn: Connection) -> Todo:
+def get_todo_id(todo_id: int, conn: Connection) -> TodoRecord:
     """
     Returns a todo object with the requested id from the database.
     Parameters:
         - todo_id: An integer corresponding to the id value of a todo object in the database
         - conn: A connection to execute queries from
     Returns:
-        A todo object with the data corresponding to that of the todo item in the database.
+        A todo record with the data corresponding to that of the todo item in the database,
+        use its to_todo method to get a Todo that can be changed.
 
     Usage:
         todo = get_todo_id(todo_id, conn)
     """
     try:
-        query = text("SELECT * FROM todos WHERE id = :id")
-        td = conn.execute(query, {"id": todo_id}).first()
+        td = execute(conn, _GET_TODO_ID, {"id": todo_id}).first()
 
         if td is None:
             raise NoData
 
-        return Todo(
-            id=td.id,
-            user_id=td.user_id,
-            description=td.description,
-            date_created=td.date_created,
-            date_due=td.date_due,
-            priority=PriorityType[td.priority],
-            completed=td.completed,
-        )
+        return _record_from_row(td)
     except Exception as e:
-        _logger.error(msg=f"Error while fetching todo from id: {e}")
+        _logger.error("Error while fetching todo from id: %s", e)
         raise e
 
 
-def get_todos_from_user(user_id: int, conn: Connection) -> List[Todo]:
+def get_todos_from_user(user_id: int, conn: Connection) -> List[TodoRecord]:
     """
-    Returns a list of todo objects related to the given user id from the database.
+    Returns a list of todo records related to the given user id from the database.
     Parameters:
         - user_id: An integer corresponding to the id value of a user object in the database.
         - conn: A connection to execute queries from
     Returns:
-        A list of todo objects with the data corresponding to that of the todo items in the database related to the given user.
+        A list of todo records with the data corresponding to that of the todo items in the database related to the given user.
 
     Usage:
         todo = get_todos_from_user(user_id, conn)
     """
     try:
-        query = text("SELECT * FROM todos WHERE user_id = :user_id")
-        rows = conn.execute(query, {"user_id": user_id}).fetchall()
+        rows = execute(conn, _GET_TODOS_FROM_USER, {"user_id": user_id}).fetchall()
         if rows is None:
             raise NoData
 
-        tdlist: List[Todo] = []
+        tdlist: List[TodoRecord] = []
         for td in rows:
-            tdlist.append(
-                Todo(
-                    id=td.id,
-                    user_id=td.user_id,
-                    description=td.description,
-                    date_created=td.date_created,
-                    date_due=td.date_due,
-                    priority=PriorityType[td.priority],
-                    completed=td.completed,
-                )
-            )
+            tdlist.append(_record_from_row(td))
 
         return tdlist
     except Exception as e:
-        _logger.error(msg=f"Error while fetching todo list from user: {e}")
+        _logger.error("Error while fetching todo list from user: %s", e)
         raise e
 
 
-def update_todo(td: Todo, conn: Connection) -> int:
+def _filtered_statement(query: TodoQuery, keyset: Optional[str], paged: bool) -> Statement:
+    key = (
+        query.sort,
+        query.completed is not None,
+        len(query.priority or ()),
+        query.due_before is not None,
+        query.due_after is not None,
+        keyset,
+        paged,
+    )
+    stmt = _filtered_statements.get(key)
+    if stmt is not None:
+        return stmt
+
+    conditions = ["user_id = :user_id"]
+    if query.completed is not None:
+        conditions.append("completed = :completed")
+    if query.priority:
+        placeholders = ", ".join(f":priority_{i}" for i in range(len(query.priority)))
+        conditions.append(f"priority IN ({placeholders})")
+    if query.due_before is not None:
+        conditions.append("date_due < :due_before")
+    if query.due_after is not None:
+        conditions.append("date_due >= :due_after")
+
+    def build(keyset_conditions: Dict[str, str], order_by: Dict[str, str]) -> str:
+        sql = (
+            "SELECT " + _TODO_COLUMNS + " FROM todos WHERE "
+            + " AND ".join(conditions + ([keyset_conditions[keyset]] if keyset else []))
+            + " ORDER BY " + order_by[query.sort]
+        )
+        if paged:
+            sql += " LIMIT :limit"
+        return sql
+
+    # streamed statements run through server side cursors, which can't be prepared
+    stmt = statement(
+        "todo.filtered." + ".".join(str(x) for x in key),
+        build(_KEYSET_CONDITIONS, _ORDER_BY),
+        prepare=paged,
+        variants={"sqlite": build(_SQLITE_KEYSET_CONDITIONS, _SQLITE_ORDER_BY)},
+    )
+    _filtered_statements[key] = stmt
+    return stmt
+
+
+def _filtered_params(user_id: int, query: TodoQuery) -> Dict:
+    params: Dict = {"user_id": user_id}
+    if query.completed is not None:
+        params["completed"] = query.completed
+    for i, priority in enumerate(sorted(query.priority or ())):
+        params[f"priority_{i}"] = priority
+    if query.due_before is not None:
+        params["due_before"] = query.due_before
+    if query.due_after is not None:
+        params["due_after"] = query.due_after
+
+    return params
+
+
+def _page_params(
+    user_id: int, query: TodoQuery, limit: int, after: Optional[tuple]
+) -> Tuple[Optional[str], Dict]:
+    params = _filtered_params(user_id, query)
+    # one extra row is fetched to know whether or not there is a next page
+    params["limit"] = limit + 1
+
+    keyset = None
+    if after is not None:
+        if query.sort == "id":
+            keyset = "id"
+            (params["after_id"],) = after
+        elif query.sort == "date_due" and after[0] is None:
+            keyset = "date_due_null"
+            params["after_id"] = after[1]
+        else:
+            keyset = query.sort
+            params["after_value"], params["after_id"] = after
+
+    return keyset, params
+
+
+def _page_last_key(
+    query: TodoQuery, tdlist: List[TodoRecord], row_count: int, limit: int
+) -> Optional[tuple]:
+    if row_count <= limit:
+        return None
+
+    last = tdlist[-1]
+    if query.sort == "id":
+        return (last.id,)
+    return (getattr(last, query.sort), last.id)
+
+
+def iter_todos_from_user(
+    user_id: int, query: TodoQuery, conn: Connection
+) -> Iterator[TodoRecord]:
     """
-    Updates an already existing todo object's values in the database.
+    Lazily yields the todo objects related to the given user id from the database, filtered and sorted as requested.
+    Rows are read through a server side cursor in batches, so memory usage stays constant regardless of the amount of todos.
     Parameters:
-        - td: An object of type Todo to be updated
+        - user_id: An integer corresponding to the id value of a user object in the database.
+        - query: The filters and sort order to apply.
+        - conn: A connection to execute queries from, it must stay open until the iterator is exhausted.
+    Returns:
+        An iterator of todo records with the data corresponding to that of the todo items in the database related to the given user.
+
+    Usage:
+        for todo in iter_todos_from_user(user_id, TodoQuery(), conn):
+            ...
+    """
+    try:
+        result = execute(
+            conn,
+            _filtered_statement(query, None, paged=False),
+            _filtered_params(user_id, query),
+            execution_options={"yield_per": _STREAM_BATCH_SIZE},
+        )
+
+        for td in result:
+            yield _record_from_row(td)
+    except Exception as e:
+        _logger.error("Error while streaming todo list from user: %s", e)
+        raise e
+
+
+def get_todos_page_from_user(
+    user_id: int,
+    query: TodoQuery,
+    limit: int,
+    after: Optional[tuple],
+    conn: Connection,
+) -> Tuple[List[TodoRecord], Optional[tuple]]:
+    """
+    Returns a page of todo objects related to the given user id from the database, filtered and sorted as requested.
+    Uses keyset pagination so fetching a page costs the same regardless of its position in the list.
+    Parameters:
+        - user_id: An integer corresponding to the id value of a user object in the database.
+        - query: The filters and sort order to apply.
+        - limit: The maximum amount of todo objects in the page.
+        - after: The keyset of the last todo object of the previous page as returned by this function, None for the first page.
+        - conn: A connection to execute queries from
+    Returns:
+        A tuple with the list of todo records in the page and the keyset to continue from,
+        the latter being None if there are no more pages.
+        The keyset is (id,) when sorting by id and (sort value, id) otherwise.
+
+    Usage:
+        todos, last_key = get_todos_page_from_user(user_id, query, limit, after, conn)
+    """
+    try:
+        keyset, params = _page_params(user_id, query, limit, after)
+        rows = execute(
+            conn, _filtered_statement(query, keyset, paged=True), params
+        ).fetchall()
+
+        tdlist: List[TodoRecord] = []
+        for td in rows[:limit]:
+            tdlist.append(_record_from_row(td))
+
+        return tdlist, _page_last_key(query, tdlist, len(rows), limit)
+    except Exception as e:
+        _logger.error("Error while fetching todo page from user: %s", e)
+        raise e
+
+
+def search_todos(
+    user_id: int,
+    search: str,
+    limit: int,
+    after: Optional[tuple],
+    conn: Connection,
+) -> Tuple[List[Tuple[TodoRecord, str]], Optional[tuple]]:
+    """
+    Returns a page of the todos of the given user whose description matches the search, most relevant first.
+    The search uses the web search syntax of postgres (ex. "buy milk" -bread), with english stemming.
+    Parameters:
+        - user_id: An integer corresponding to the id value of a user object in the database.
+        - search: The text to search for in the descriptions.
+        - limit: The maximum amount of todo objects in the page.
+        - after: The keyset of the last todo object of the previous page as returned by this function, None for the first page.
         - conn: A connection to execute queries from
     Returns:
-        A todo object with the data corresponding to that of the todo item in the database.
+        A tuple with the list of matching todo records in the page, each with its html escaped description
+        highlighted with <mark> tags, and the (rank, id) keyset to continue from, None if there are no more pages.
 
     Usage:
-        todo = update_todo(td, conn)
+        results, last_key = search_todos(user_id, "milk", limit, after, conn)
     """
     try:
-        query = text(
-            "UPDATE todos SET user_id = :user_id, description = :description,"
-            + "date_created = :date_created, date_due =  :date_due,"
-            + "priority = :priority, completed = :completed "
-            + "WHERE id = :id RETURNING id"
+        rows = execute(conn, _SEARCH_TODOS, _search_params(user_id, search, limit, after)).fetchall()
+        return _search_results_from_rows(rows, search, limit)
+    except Exception as e:
+        _logger.error("Error while searching todos from user: %s", e)
+        raise e
+
+
+def _search_params(user_id: int, search: str, limit: int, after: Optional[tuple]) -> Dict:
+    after_rank, after_id = after if after is not None else (None, None)
+    # one extra row is fetched to know whether or not there is a next page
+    return {
+        "user_id": user_id,
+        "search": search,
+        "limit": limit + 1,
+        "after_rank": after_rank,
+        "after_id": after_id,
+    }
+
+
+def _highlight_matches(description: str, search: str) -> str:
+    # the same html escaped description with <mark> tags as ts_headline, for the sqlite substring matches
+    parts = re.split(f"({re.escape(search)})", description, flags=re.IGNORECASE)
+    return "".join(
+        f"<mark>{html.escape(x, quote=False)}</mark>" if i % 2 else html.escape(x, quote=False)
+        for i, x in enumerate(parts)
+    )
+
+
+def _search_results_from_rows(
+    rows, search: str, limit: int
+) -> Tuple[List[Tuple[TodoRecord, str]], Optional[tuple]]:
+    results = [
+        (
+            _record_from_row(td),
+            td.highlight if td.highlight is not None else _highlight_matches(td.description, search),
         )
+        for td in rows[:limit]
+    ]
+
+    last_key = None
+    if len(rows) > limit:
+        last_key = (float(rows[limit - 1].rank), rows[limit - 1].id)
+    return results, last_key
+
+
+def _changes_from_rows(
+    rows, since: Optional[int], version: int
+) -> Tuple[List[TodoRecord], List[int], int]:
+    changed: List[TodoRecord] = []
+    deleted: List[int] = []
+    for td in rows:
+        if td.deleted:
+            deleted.append(td.id)
+        else:
+            changed.append(_record_from_row(td))
+        # a change committed after the version was read, it is already included so the cursor can move past it
+        version = max(version, td.change_version)
+
+    return changed, deleted, max(version, since or 0)
+
+
+def get_todo_changes(
+    user_id: int, since: Optional[int], conn: Connection
+) -> Tuple[List[TodoRecord], List[int], int]:
+    """
+    Returns the todos of the given user that were saved, updated or deleted after the given version of their list.
+    Parameters:
+        - user_id: An integer corresponding to the id value of a user object in the database.
+        - since: The version of the list the client last synced, None to get every todo
+        - conn: A connection to execute queries from
+    Returns:
+        A tuple with the saved or updated todo records, the ids of the deleted todos and the version
+        to sync from next time.
+
+    Usage:
+        changed, deleted, version = get_todo_changes(user_id, since, conn)
+    """
+    try:
+        # read first, so every change up to it is visible to the statement below
+        version = get_todo_version(user_id, conn)
+        if since is not None and since >= version:
+            return [], [], since
+
+        rows = execute(
+            conn,
+            _GET_TODO_CHANGES,
+            {
+                "user_id": user_id,
+                "since": -1 if since is None else since,
+                "with_deleted": since is not None,
+            },
+        ).fetchall()
+
+        return _changes_from_rows(rows, since, version)
+    except Exception as e:
+        _logger.error("Error while fetching todo changes from user: %s", e)
+        raise e
 
-        res = conn.execute(
-            query,
+
+def update_owned_todo(td: Todo, conn: Connection) -> int:
+    """
+    Updates an already existing todo object's values in the database, only if it belongs to the user given in the todo object.
+    Parameters:
+        - td: An object of type Todo to be updated
+        - conn: A connection to execute queries from
+    Returns:
+        The id of the updated todo object.
+
+    Raises:
+        NoData if there is no todo with the given id belonging to the given user.
+
+    Usage:
+        todo_id = update_owned_todo(td, conn)
+    """
+    try:
+        _bump_todo_version(td.user_id, conn)
+        res = execute(
+            conn,
+            _UPDATE_OWNED_TODO,
             {
                 "id": td.id,
                 "user_id": td.user_id,
@@ -152,31 +736,110 @@ def update_todo(td: Todo, conn: Connection) -> int:
             },
         ).first()
         if res is None:
-            raise Exception("Todo update returned no ID")
+            raise NoData
+
+        return res.id
+
+    except Exception as e:
+        _logger.error("Error while updating owned TODO: %s", e)
+        raise e
+
+
+def update_todos(tds: List[Todo], conn: Connection) -> List[int]:
+    """
+    Updates several already existing todo objects' values in the database with a single statement.
+    Only the todos that belong to the user given in each todo object are updated.
+    Parameters:
+        - tds: A list of objects of type Todo to be updated
+        - conn: A connection to execute queries from
+    Returns:
+        The ids of the todo objects that were found and updated.
+
+    Usage:
+        updated_ids = update_todos(tds, conn)
+    """
+    try:
+        if not tds:
+            return []
+
+        for user_id in sorted({td.user_id for td in tds}):
+            _bump_todo_version(user_id, conn)
+        rows = execute(
+            conn,
+            _UPDATE_TODOS,
+            {
+                "ids": [td.id for td in tds],
+                "user_ids": [td.user_id for td in tds],
+                "descriptions": [td.description for td in tds],
+                "dates_created": [td.date_created for td in tds],
+                "dates_due": [td.date_due for td in tds],
+                "priorities": [td.priority for td in tds],
+                "completed": [td.completed for td in tds],
+            },
+        ).fetchall()
+
+        return [res.id for res in rows]
+    except Exception as e:
+        _logger.error("Error while updating TODO list: %s", e)
+        raise e
+
+
+def delete_owned_todo(todo_id: int, user_id: int, conn: Connection) -> int:
+    """
+    Deletes a todo item from the database, only if it belongs to the given user.
+    Parameters:
+        - todo_id: An integer corresponding to the id value of the todo item to be deleted
+        - user_id: An integer corresponding to the id value of the user the todo item belongs to
+        - conn: A connection to execute queries from
+    Returns:
+        The id of the deleted todo item.
+
+    Raises:
+        NoData if there is no todo with the given id belonging to the given user.
+
+    Usage:
+        todo_id = delete_owned_todo(todo_id, user_id, conn)
+    """
+    try:
+        _bump_todo_version(user_id, conn)
+        _save_tombstones([todo_id], user_id, conn)
+        res = execute(
+            conn, _DELETE_OWNED_TODO, {"id": todo_id, "user_id": user_id}
+        ).first()
+        if res is None:
+            raise NoData
 
         return res.id
 
     except Exception as e:
-        _logger.error(msg=f"Error while updating TODO: {e}")
+        _logger.error("Error while deleting owned TODO: %s", e)
         raise e
 
 
-def delete_todo(td: Todo, conn: Connection):
+def delete_todos(todo_ids: List[int], user_id: int, conn: Connection) -> List[int]:
     """
-    Deletes a todo item from the database.
+    Deletes several todo items belonging to the given user from the database with a single statement.
     Parameters:
-        - td: An object of type Todo to be deleted
+        - todo_ids: A list of integers corresponding to the id values of the todo items to be deleted
+        - user_id: An integer corresponding to the id value of the user the todo items belong to
         - conn: A connection to execute queries from
     Returns:
-        A boolean value to represent the success of the operation.
+        The ids of the todo items that were found and deleted.
 
     Usage:
-        todo = delete_todo(td, conn)
+        deleted_ids = delete_todos(todo_ids, user_id, conn)
     """
     try:
-        query = text("DELETE FROM todos WHERE id = :id")
-        conn.execute(query, {"id": td.id})
+        if not todo_ids:
+            return []
+
+        _bump_todo_version(user_id, conn)
+        _save_tombstones(todo_ids, user_id, conn)
+        rows = execute(
+            conn, _DELETE_TODOS, {"user_id": user_id, "ids": todo_ids}
+        ).fetchall()
 
+        return [res.id for res in rows]
     except Exception as e:
-        _logger.error(msg=f"Error while deleting TODO: {e}")
+        _logger.error("Error while deleting TODO list: %s", e)
         raise e
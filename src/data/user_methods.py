@@ -1,12 +1,84 @@
 import logging
+import os
+import threading
+from typing import Optional
 
+from dotenv import load_dotenv
 from psycopg2.errors import NoData
-from sqlalchemy import Connection, text
+from sqlalchemy import Connection
 
+from src.common import TTLCache
 from src.core import User
+from src.data.db import call_after_commit
+from src.data.statements import execute, statement
 
 _logger = logging.getLogger("USERDAL")
 
+_SAVE_USER = statement(
+    "user.save",
+    "INSERT INTO users (username, password)"
+    + "VALUES (:username, :password) RETURNING id",
+)
+
+_GET_USER_ID = statement(
+    "user.get_id",
+    "SELECT id, username FROM users WHERE id = :id",
+)
+
+_GET_USER_FROM_NAME = statement(
+    "user.get_from_name",
+    "SELECT id, username FROM users WHERE username = :username",
+)
+
+_GET_USER_PASSWORD = statement(
+    "user.get_password",
+    "SELECT users.id, users.password FROM users WHERE username = :username",
+)
+
+_UPDATE_USER = statement(
+    "user.update",
+    "UPDATE users SET username = :username " + "WHERE id = :id RETURNING id",
+)
+
+_UPDATE_USER_PASSWORD = statement(
+    "user.update_password",
+    "UPDATE users SET password = :password " + "WHERE id = :id RETURNING id",
+)
+
+_DELETE_USER = statement(
+    "user.delete",
+    "DELETE FROM users WHERE id = :id",
+)
+
+_user_cache: Optional[TTLCache] = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache() -> TTLCache:
+    """
+    Returns the cache of the users loaded on every authenticated request, creating it from USER_CACHE_SIZE and
+    USER_CACHE_TTL on first use. The ttl bounds how stale the copies of the other workers can get.
+    """
+    global _user_cache
+    cache = _user_cache
+    if cache is not None:
+        return cache
+
+    with _user_cache_lock:
+        if _user_cache is None:
+            load_dotenv()
+            _user_cache = TTLCache(
+                max_size=int(os.getenv("USER_CACHE_SIZE", 1024)),
+                ttl=float(os.getenv("USER_CACHE_TTL", 30)),
+            )
+        return _user_cache
+
+
+def _invalidate_cached_user(user_id: int, conn: Connection):
+    # dropped again once committed, since a concurrent request may have cached the old row meanwhile
+    get_user_cache().invalidate(user_id)
+    call_after_commit(conn, lambda: get_user_cache().invalidate(user_id))
+
 
 def save_user(user: User, conn: Connection) -> int:
     """
@@ -21,13 +93,10 @@ def save_user(user: User, conn: Connection) -> int:
         new_id = save_user(user, conn)
     """
     try:
-        query = text(
-            "INSERT INTO users (username, password)"
-            + "VALUES (:username, :password) RETURNING id"
-        )
         # it's probably fine to take the password here since we are creating the user
-        res = conn.execute(
-            query,
+        res = execute(
+            conn,
+            _SAVE_USER,
             {
                 "username": user.username,
                 "password": user.password,
@@ -40,7 +109,7 @@ def save_user(user: User, conn: Connection) -> int:
         return res.id
 
     except Exception as e:
-        _logger.error(msg=f"Error while saving user: {e}")
+        _logger.error("Error while saving user: %s", e)
         raise e
 
 
@@ -58,8 +127,7 @@ def get_user_id(user_id: int, conn: Connection) -> User:
         user = get_user_id(user_id, conn)
     """
     try:
-        query = text("SELECT * FROM users WHERE id = :id")
-        usr = conn.execute(query, {"id": user_id}).first()
+        usr = execute(conn, _GET_USER_ID, {"id": user_id}).first()
 
         if usr is None:
             raise NoData
@@ -67,7 +135,7 @@ def get_user_id(user_id: int, conn: Connection) -> User:
         return User(id=usr.id, username=usr.username, password=None)
 
     except Exception as e:
-        _logger.error(msg=f"Error while fetching user from id: {e}")
+        _logger.error("Error while fetching user from id: %s", e)
         raise e
     pass
 
@@ -75,8 +143,7 @@ def get_user_id(user_id: int, conn: Connection) -> User:
 # currently useless lmao
 def get_user_from_name(username: str, conn: Connection) -> User:
     try:
-        query = text("SELECT * FROM users WHERE username = :username")
-        res = conn.execute(query, {"username": username}).first()
+        res = execute(conn, _GET_USER_FROM_NAME, {"username": username}).first()
 
         # HACK: this really can't be the best way to deal with this lmao
         if res is None:
@@ -85,7 +152,7 @@ def get_user_from_name(username: str, conn: Connection) -> User:
         return User(id=res.id, username=res.username, password=None)
 
     except Exception as e:
-        _logger.error(msg=f"Error while fetching user from id: {e}")
+        _logger.error("Error while fetching user from id: %s", e)
         raise e
 
 
@@ -106,10 +173,7 @@ def get_user_password(username: str, conn: Connection) -> tuple[int, str]:
         check_password_hash(password_hash, raw_password_text)
     """
     try:
-        query = text(
-            "SELECT users.id, users.password FROM users WHERE username = :username"
-        )
-        res = conn.execute(query, {"username": username}).first()
+        res = execute(conn, _GET_USER_PASSWORD, {"username": username}).first()
 
         if res is None:
             raise NoData
@@ -117,7 +181,7 @@ def get_user_password(username: str, conn: Connection) -> tuple[int, str]:
         return (res.id, res.password)
 
     except Exception as e:
-        _logger.error(msg=f"Error while fetching user from id: {e}")
+        _logger.error("Error while fetching user from id: %s", e)
         raise e
 
 
@@ -134,12 +198,10 @@ def update_user(user: User, conn: Connection) -> int:
         user = update_user(user, conn)
     """
     try:
-        query = text(
-            "UPDATE users SET username = :username " + "WHERE id = :id RETURNING id"
-        )
-
-        res = conn.execute(
-            query,
+        _invalidate_cached_user(user.id, conn)
+        res = execute(
+            conn,
+            _UPDATE_USER,
             {
                 "id": user.id,
                 "username": user.username,
@@ -152,7 +214,7 @@ def update_user(user: User, conn: Connection) -> int:
         id = res.id
         return id
     except Exception as e:
-        _logger.error(msg=f"Error while updating user: {e}")
+        _logger.error("Error while updating user: %s", e)
         raise e
 
 
@@ -170,12 +232,10 @@ def update_user_password(user: User, conn: Connection) -> int:
         user = update_user_password(user, conn)
     """
     try:
-        query = text(
-            "UPDATE users SET password = :password " + "WHERE id = :id RETURNING id"
-        )
-
-        res = conn.execute(
-            query,
+        _invalidate_cached_user(user.id, conn)
+        res = execute(
+            conn,
+            _UPDATE_USER_PASSWORD,
             {
                 "id": user.id,
                 "password": user.password,
@@ -188,7 +248,7 @@ def update_user_password(user: User, conn: Connection) -> int:
         id = res.id
         return id
     except Exception as e:
-        _logger.error(msg=f"Error while updating user: {e}")
+        _logger.error("Error while updating user: %s", e)
         raise e
 
 
@@ -204,9 +264,9 @@ def delete_user(user: User, conn: Connection):
         user = delete_user(user, conn)
     """
     try:
-        query = text("DELETE FROM users WHERE id = :id")
-        conn.execute(query, {"id": user.id})
+        _invalidate_cached_user(user.id, conn)
+        execute(conn, _DELETE_USER, {"id": user.id})
 
     except Exception as e:
-        _logger.error(msg=f"Error while deleting user: {e}")
+        _logger.error("Error while deleting user: %s", e)
         raise e
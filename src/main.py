@@ -1,16 +1,22 @@
 # mypy: check-untyped-defs
 import logging
 import os
+import time
 
-from flask import Flask, abort, jsonify, make_response, request
+from flask import Flask, abort, jsonify, make_response, request, session
 from flask_wtf import ( # type: ignore # for some reason mypy struggles with these
     CSRFProtect,
 )
 from flask_wtf.csrf import generate_csrf  # type: ignore
 from werkzeug.exceptions import HTTPException
 
-from src.data import ping_db
+from src.common.log_config import init_logging
+from src.data import begin_connection_scope, end_connection_scope, ping_db
+from src.data.db import get_db_backend
+from src.routes.compression import init_compression
+from src.routes.metrics import init_metrics
 from src.routes import (
+    FastJSONProvider,
     handle_generic_exception,
     handle_http_exception,
     login_manager,
@@ -22,26 +28,40 @@ csrf = CSRFProtect()
 
 
 def create_app():
-    logging.basicConfig(
-        filename="log/test.log",
-        level=logging.INFO,
-        format="[%(asctime)s] [%(levelname)s @ %(name)s] %(message)s",
-        datefmt="%m/%d/%Y %I:%M:%S %p",
-    )
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    init_logging()  # records are written by a background thread, see LOG_FILE
     logger = logging.getLogger(__name__)
 
-    logger.info(msg="Starting Server...")
+    logger.info("Starting Server...")
 
-    if not ping_db():
-        raise Exception("Database must be started for app to run")
+    server_mode = os.getenv("SERVER_MODE", "sync")
+    if server_mode == "gevent":
+        from gevent import monkey
 
-    from dotenv import load_dotenv
+        # a preloaded app is created in the master, before the worker patches anything
+        if not monkey.is_module_patched("socket"):
+            raise Exception("The gevent server mode must be run in gunicorn gevent workers, without --preload")
+        # before the ping, so no pooled connection is ever used without waiting through gevent
+        if get_db_backend() == "postgresql":
+            from src.data.green import make_psycopg2_green
 
-    load_dotenv()
+            make_psycopg2_green()
+
+    if not ping_db():
+        raise Exception("Database must be started for app to run")
 
     app = Flask(__name__)
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
 
+    json_provider = FastJSONProvider(app)
+    json_provider.compact = os.getenv("JSON_PRETTY", "false").lower() != "true"
+    app.json = json_provider
+
+    init_metrics(app)  # first, so the other request hooks are timed too
+
     if os.getenv("Protocol") == "http":
         app.config["WTF_CSRF_SSL_STRICT"] = False
     elif os.getenv("Protocol") == "https":
@@ -51,11 +71,53 @@ def create_app():
     login_manager.init_app(app)  # sets up the session management
 
     app.register_blueprint(user_blueprint)
-    app.register_blueprint(todo_blueprint)
+    if server_mode == "async":
+        if get_db_backend() != "postgresql":
+            raise Exception("The async server mode needs the postgresql backend")
+
+        # imported here so asyncpg is only needed when the async mode is used
+        from src.data.aio import async_to_sync
+        from src.routes.async_todo_bp import async_todo_blueprint
+
+        app.async_to_sync = async_to_sync  # type: ignore
+        app.register_blueprint(async_todo_blueprint)
+    else:
+        app.register_blueprint(todo_blueprint)
+
+    # an event stream holds its worker for as long as the client stays connected, which only gevent workers afford
+    todo_events = os.getenv(
+        "TODO_EVENTS_ENABLED", str(server_mode == "gevent" and get_db_backend() == "postgresql")
+    )
+    app.config["TODO_EVENTS_ENABLED"] = todo_events.lower() == "true"
+    if app.config["TODO_EVENTS_ENABLED"] and get_db_backend() != "postgresql":
+        raise Exception("Todo events need the postgresql backend")
+    app.config["TODO_EVENTS_KEEPALIVE"] = float(os.getenv("TODO_EVENTS_KEEPALIVE", 15))
+    app.config["TODO_EVENTS_MAX_DURATION"] = float(os.getenv("TODO_EVENTS_MAX_DURATION", 300))
 
     app.register_error_handler(500, handle_generic_exception)
     app.register_error_handler(HTTPException, handle_http_exception)
 
+    # every transaction manager within a request shares a single lazily checked out connection
+    read_replicas = bool(os.getenv("DB_REPLICA_HOSTS"))
+    sticky_seconds = float(os.getenv("DB_REPLICA_STICKY_SECONDS", 10))
+
+    @app.before_request
+    def _begin_connection_scope():
+        # reads stay on the primary for a while after the user changed something, so they see their own writes
+        begin_connection_scope(
+            read_from_primary=read_replicas and session.get("read_primary_until", 0) > time.time()
+        )
+
+    app.teardown_request(end_connection_scope)
+
+    if read_replicas:
+
+        @app.after_request
+        def _read_own_writes(response):
+            if request.method in ("POST", "PUT", "DELETE") and response.status_code < 400:
+                session["read_primary_until"] = time.time() + sticky_seconds
+            return response
+
     frontend_url: str = (
         f"{os.getenv('PROTOCOL')}://{os.getenv('FRONT_HOST')}:{os.getenv('FRONT_PORT')}"
     )
@@ -91,7 +153,9 @@ def create_app():
             if request.get_data():
                 request.get_json(force=True)  # check that it is valid json
         except Exception as e:
-            logger.info(f"json enforcement method caught {e}")
+            logger.info("json enforcement method caught %s", e)
+
+    init_compression(app)  # after the headers below are set, since hooks run in reverse order
 
     @app.after_request
     def security_headers(response):
@@ -133,7 +197,7 @@ def create_app():
     def _hello_world():
         return "Server up"
 
-    logger.info(msg="Server Setup Complete...")
+    logger.info("Server Setup Complete...")
     return app
 
 
@@ -1,5 +1,6 @@
 from .user_bp import user_blueprint, login_manager
 from .todo_bp import todo_blueprint
 from .responses import handle_http_exception, handle_generic_exception
+from .json_provider import FastJSONProvider
 
-__all__ = ['user_blueprint', 'login_manager', 'todo_blueprint', 'handle_http_exception', 'handle_generic_exception']
+__all__ = ['user_blueprint', 'login_manager', 'todo_blueprint', 'handle_http_exception', 'handle_generic_exception', 'FastJSONProvider']
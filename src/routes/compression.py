@@ -0,0 +1,117 @@
+import logging
+import os
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # the encodings whose library isn't installed are simply not offered
+    brotli = None  # type: ignore
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore
+
+_logger = logging.getLogger("COMPRESSION")
+
+_COMPRESSIBLE_MIMETYPES = ("application/json", "text/")
+
+
+class _BrotliCompressor:
+    # same interface as the zlib and zstandard compressors
+
+    def __init__(self, level: int):
+        self.__compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.__compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self.__compressor.finish()
+
+
+def _compressors(levels: Dict[str, int]) -> Dict[str, Callable]:
+    # by order of preference when the client accepts several of them equally
+    compressors: Dict[str, Callable] = {}
+    if zstandard is not None:
+        compressors["zstd"] = lambda: zstandard.ZstdCompressor(level=levels["zstd"]).compressobj()
+    if brotli is not None:
+        compressors["br"] = lambda: _BrotliCompressor(levels["br"])
+    compressors["gzip"] = lambda: zlib.compressobj(levels["gzip"], zlib.DEFLATED, 31)
+    return compressors
+
+
+def _compress_stream(chunks: Iterable[bytes], compressor) -> Iterator[bytes]:
+    # the compressor buffers small chunks (ex. a single todo) until it has enough to write a block
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def init_compression(app: Flask):
+    """
+    Compresses json and text responses with the best encoding accepted by the client out of zstd, br
+    (when their library is installed) and gzip. Responses smaller than COMPRESSION_MIN_SIZE bytes are sent as is,
+    streamed responses are compressed as they are written, since their size isn't known beforehand.
+    Set COMPRESSION_ENABLED=false when a reverse proxy already compresses the responses.
+
+    Usage:
+        app = Flask(__name__)
+        init_compression(app)
+    """
+    if os.getenv("COMPRESSION_ENABLED", "true").lower() != "true":
+        return
+
+    min_size = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+    compressors = _compressors(
+        {
+            "gzip": int(os.getenv("COMPRESSION_GZIP_LEVEL", 6)),
+            "br": int(os.getenv("COMPRESSION_BROTLI_LEVEL", 4)),
+            "zstd": int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3)),
+        }
+    )
+    encodings: List[str] = list(compressors)
+
+    @app.after_request
+    def _compress_response(response: Response) -> Response:
+        response.vary.add("Accept-Encoding")
+        if (
+            request.method == "HEAD"
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or not response.mimetype.startswith(_COMPRESSIBLE_MIMETYPES)
+            or response.mimetype == "text/event-stream"  # the compressor would hold the events back
+        ):
+            return response
+
+        encoding = request.accept_encodings.best_match(encodings)
+        if encoding is None:
+            return response
+
+        try:
+            compressor = compressors[encoding]()
+            if response.is_streamed:
+                response.response = _compress_stream(response.iter_encoded(), compressor)
+                response.headers.pop("Content-Length", None)
+            else:
+                data = response.get_data()
+                if len(data) < min_size:
+                    return response
+                response.set_data(compressor.compress(data) + compressor.flush())
+        except Exception as e:  # the response can still be sent uncompressed
+            _logger.error("Error while compressing a response: %s", e)
+            return response
+
+        response.headers["Content-Encoding"] = encoding
+        # the compressed body isn't byte for byte the one the strong etag was made for
+        etag, weak = response.get_etag()
+        if etag is not None and not weak:
+            response.set_etag(etag, weak=True)
+        return response
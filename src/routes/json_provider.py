@@ -0,0 +1,73 @@
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # the stdlib fallback writes the same json, only slower
+    orjson = None  # type: ignore
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, Enum):
+        return o.value
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    JSON provider that encodes responses straight to bytes with orjson, which handles datetimes and enums
+    natively instead of calling a default function for each of them. Falls back to the stdlib json module
+    when orjson isn't installed.
+    Datetimes are written in ISO 8601, the same format the routes take them in, and enums as their value.
+
+    Parameters:
+        compact: Whether to write compact json (the default) or indented json
+
+    Usage:
+        app.json = FastJSONProvider(app)
+        app.json.compact = False
+    """
+
+    compact: bool = True
+    mimetype = "application/json"
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """
+        Returns the obj encoded as utf-8 json.
+        """
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS
+            if not self.compact:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=_default, option=option)
+
+        return self.dumps(obj).encode()
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is not None and not kwargs:
+            return self.dumps_bytes(obj).decode()
+
+        kwargs.setdefault("default", _default)
+        kwargs.setdefault("ensure_ascii", False)
+        if self.compact:
+            kwargs.setdefault("separators", (",", ":"))
+        else:
+            kwargs.setdefault("indent", 2)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,105 @@
+import logging
+import os
+
+from flask import Flask, Response, request
+
+from src.common.request_stats import begin_request_stats, current_request_stats
+
+_logger = logging.getLogger("METRICS")
+
+# seconds, from a cached 304 up to a streamed list of every todo
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _PrometheusMetrics:
+    """
+    The prometheus metrics of the app. When PROMETHEUS_MULTIPROC_DIR is set every gunicorn worker writes
+    its values there and /metrics adds up the ones of all the workers, see gunicorn.conf.py.
+    """
+
+    def __init__(self):
+        # only needed when metrics are enabled
+        import prometheus_client
+
+        self.__client = prometheus_client
+        labels = ["method", "route", "status"]
+        self.latency = prometheus_client.Histogram(
+            "pytodo_request_duration_seconds",
+            "Time spent handling requests",
+            labels,
+            buckets=_LATENCY_BUCKETS,
+        )
+        self.queries = prometheus_client.Counter(
+            "pytodo_db_queries_total", "Database queries run by requests", labels
+        )
+        self.db_time = prometheus_client.Counter(
+            "pytodo_db_query_seconds_total", "Time requests spent running database queries", labels
+        )
+        self.pool_wait = prometheus_client.Histogram(
+            "pytodo_db_pool_wait_seconds",
+            "Time requests spent waiting for a pooled database connection",
+            ["route"],
+            buckets=_LATENCY_BUCKETS,
+        )
+
+    def export(self) -> Response:
+        client = self.__client
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+
+            registry = client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = client.REGISTRY
+
+        return Response(client.generate_latest(registry), mimetype=client.CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app: Flask):
+    """
+    Times every request and counts its database queries. Should be called before any other request hook
+    is registered, so the time spent in them is included.
+    With SERVER_TIMING=true the times are sent to the client in a Server-Timing header,
+    with METRICS_ENABLED=true they are exported in the prometheus text format on GET /metrics.
+
+    Usage:
+        app = Flask(__name__)
+        init_metrics(app)
+    """
+    server_timing = os.getenv("SERVER_TIMING", "false").lower() == "true"
+    prometheus = None
+    if os.getenv("METRICS_ENABLED", "false").lower() == "true":
+        prometheus = _PrometheusMetrics()
+        app.add_url_rule("/metrics", "metrics", prometheus.export, methods=["GET"])
+
+    @app.before_request
+    def _begin_request_stats():
+        begin_request_stats()
+
+    @app.after_request
+    def _record_request_stats(response: Response) -> Response:
+        # streamed bodies are written after this, so their queries aren't included
+        stats = current_request_stats()
+        if stats is None:
+            return response
+
+        elapsed = stats.elapsed()
+        if server_timing:
+            response.headers["Server-Timing"] = (
+                f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+                + f"pool;dur={stats.pool_wait * 1000:.2f}, "
+                + f"total;dur={elapsed * 1000:.2f}"
+            )
+
+        if prometheus is not None:
+            try:
+                route = request.url_rule.rule if request.url_rule else "unmatched"
+                labels = (request.method, route, str(response.status_code))
+                prometheus.latency.labels(*labels).observe(elapsed)
+                prometheus.queries.labels(*labels).inc(stats.queries)
+                prometheus.db_time.labels(*labels).inc(stats.db_time)
+                prometheus.pool_wait.labels(route).observe(stats.pool_wait)
+            except Exception as e:  # metrics are never worth failing a request over
+                _logger.error("Error while recording request metrics: %s", e)
+
+        return response
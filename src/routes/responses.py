@@ -1,4 +1,6 @@
-from flask import Response, jsonify
+from typing import Dict, Iterable
+
+from flask import Response, current_app, jsonify, stream_with_context
 from werkzeug.exceptions import HTTPException
 
 
@@ -31,11 +33,64 @@ def handle_generic_exception(e: HTTPException) -> Response:
     return response
 
 
-def success_response(code, data) -> Response:
+def success_response(code, data, **extra) -> Response:
     """
     Returns a successful response with the given data.
+    Any extra keyword arguments are added to the top level of the response (ex. next_cursor).
     """
-    response: Response = jsonify({"status": "success", "code": code, "data": data})
+    response: Response = jsonify(
+        {"status": "success", "code": code, "data": data, **extra}
+    )
 
     response.status_code = code
     return response
+
+
+def stream_success_response(code, data: Iterable[Dict]) -> Response:
+    """
+    Returns a successful response that writes the given data as it is produced instead of building it in memory.
+    The data iterable is consumed while the response is being sent, so it may hold open resources (ex. a transaction).
+    """
+
+    def generate():
+        yield f'{{"status": "success", "code": {code}, "data": ['
+        separator = ""
+        for item in data:
+            yield separator + current_app.json.dumps(item)
+            separator = ", "
+        yield "]}"
+
+    return Response(
+        stream_with_context(generate()), status=code, mimetype="application/json"
+    )
+
+
+def event_stream_response(events: Iterable[str]) -> Response:
+    """
+    Returns a server-sent events response that writes the given events as they are produced.
+    The events iterable is consumed while the response is being sent, for as long as the client stays connected.
+    """
+    response = Response(
+        stream_with_context(events), status=200, mimetype="text/event-stream"
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # keeps nginx from holding the events back
+    return response
+
+
+def set_etag(response: Response, etag: str):
+    """
+    Sets a weak etag on the response, clients are told to always revalidate it before reusing their copy.
+    It is weak since the body may be sent compressed (see init_compression), the 304 has to carry the same one.
+    """
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+def not_modified_response(etag: str) -> Response:
+    """
+    Returns an empty 304 response for clients whose copy (as given by If-None-Match) is still up to date.
+    """
+    response = Response(status=304)
+    set_etag(response, etag)
+    return response
@@ -11,13 +11,41 @@ from pydantic import ValidationError
 from src.core import Todo
 from src.data import (
     TransactionManager,
-    delete_todo,
-    get_todo_id,
-    get_todos_from_user,
+    delete_owned_todo,
+    delete_todos,
+    get_todo_changes,
+    get_todo_version,
+    get_todos_page_from_user,
     save_todo,
-    update_todo,
+    save_todos,
+    search_todos,
+    update_owned_todo,
+    update_todos,
+)
+from src.routes.responses import (
+    not_modified_response,
+    set_etag,
+    stream_success_response,
+    success_response,
+)
+from src.routes.todo_common import (
+    changes_since_arg,
+    existing_bulk_todos,
+    existing_todo,
+    fill_bulk_results,
+    get_bulk_ids,
+    get_bulk_items,
+    new_bulk_todos,
+    new_todo,
+    stream_todos_from_user,
+    todo_changes_response,
+    todo_events_response,
+    todo_list_etag,
+    todo_page_args,
+    todo_page_response,
+    todo_search_args,
+    todo_search_response,
 )
-from src.routes.responses import success_response
 
 _logger = logging.getLogger("TODOROUTE")
 todo_blueprint: Blueprint = Blueprint("todo_bp", __name__, url_prefix="/todos")
@@ -26,23 +54,76 @@ todo_blueprint: Blueprint = Blueprint("todo_bp", __name__, url_prefix="/todos")
 @todo_blueprint.route("/", methods=["GET"])
 @login_required
 def _get_todos_from_user_route():
+    stream = request.args.get("stream") == "true"
+
     try:
-        with TransactionManager() as conn:
-            tdlist: List[Todo] = get_todos_from_user(current_user.id, conn)
-            tdlist_dict: List[Dict] = []
-            for x in tdlist:
-                tdlist_dict.append(x.model_dump())
+        query, limit, after = todo_page_args()
 
-            response: Response = success_response(200, tdlist_dict)
-            response.status_code = 200
+        with TransactionManager(read_only=True) as conn:
+            # read before the todos, so a concurrent change can only make the tag older than the data
+            version = get_todo_version(current_user.id, conn)
+            etag = todo_list_etag(current_user.id, version)
+            if request.if_none_match.contains_weak(etag):
+                return not_modified_response(etag)
 
-            return response
+            if not stream:
+                tdlist, last_key = get_todos_page_from_user(
+                    current_user.id, query, limit, after, conn
+                )
+                return todo_page_response(query, tdlist, last_key, etag)
+    except (ValueError, TypeError) as e:
+        _logger.warning("Validation error in todo GET list from user route: %s", e)
+        abort(400, description="Invalid query parameters")
     except (NoData, NoDataFound):
         abort(404, description="No todos found for given user")
     except Exception as e:
-        _logger.error(msg=f"Unkwown error in todo GET list from user route: {e}")
+        _logger.error("Unkwown error in todo GET list from user route: %s", e)
         abort(500)
 
+    response = stream_success_response(
+        200, stream_todos_from_user(current_user.id, query)
+    )
+    set_etag(response, etag)
+    return response
+
+
+@todo_blueprint.route("/changes", methods=["GET"])
+@login_required
+def _get_todo_changes_route():
+    try:
+        since = changes_since_arg()
+        with TransactionManager(read_only=True) as conn:
+            changed, deleted, version = get_todo_changes(current_user.id, since, conn)
+        return todo_changes_response(changed, deleted, version)
+    except (ValueError, TypeError) as e:
+        _logger.warning("Validation error in todo GET changes route: %s", e)
+        abort(400, description="Invalid changes cursor")
+    except Exception as e:
+        _logger.error("Unkwown error in todo GET changes route: %s", e)
+        abort(500)
+
+
+@todo_blueprint.route("/search", methods=["GET"])
+@login_required
+def _search_todos_route():
+    try:
+        search, limit, after = todo_search_args()
+        with TransactionManager(read_only=True) as conn:
+            results, last_key = search_todos(current_user.id, search, limit, after, conn)
+        return todo_search_response(results, last_key)
+    except (ValueError, TypeError) as e:
+        _logger.warning("Validation error in todo GET search route: %s", e)
+        abort(400, description="Invalid query parameters")
+    except Exception as e:
+        _logger.error("Unkwown error in todo GET search route: %s", e)
+        abort(500)
+
+
+@todo_blueprint.route("/events", methods=["GET"])
+@login_required
+def _get_todo_events_route():
+    return todo_events_response(current_user.id)
+
 
 @todo_blueprint.route("/", methods=["POST"])
 @login_required
@@ -51,16 +132,7 @@ def _post_todo_route():
         if not request.is_json:
             raise TypeError("Request content must be json")
 
-        content = request.get_json()
-        todo: Todo = Todo(
-            id=None,
-            user_id=current_user.id,
-            description=content["description"],
-            date_created=datetime.now(),  # HACK: PROBABLY SHOULD DO THIS IN SOME SORT OF CONSTRUCTOR
-            date_due=content["date_due"],
-            priority=content["priority"],
-            completed=content["completed"],
-        )
+        todo: Todo = new_todo(request.get_json(), datetime.now())
 
         with TransactionManager() as conn:
             todo_id: int = save_todo(todo, conn)
@@ -72,14 +144,14 @@ def _post_todo_route():
             return response
 
     except (ValidationError, TypeError, KeyError) as e:
-        _logger.warn(msg=f"Validation error in POST todo route: {e}")
+        _logger.warning("Validation error in POST todo route: %s", e)
         abort(
             400,
             description="Invalid request data (make sure all fields are full and properly formatted)",
         )
 
     except Exception as e:
-        _logger.error(msg=f"Unkwown error in POST todo route: {e}")
+        _logger.error("Unkwown error in POST todo route: %s", e)
         abort(500)
 
 
@@ -90,19 +162,10 @@ def _put_todo_route():
         if not request.is_json:
             raise TypeError("Request content must be json")
 
-        content = request.get_json()
-        todo: Todo = Todo(
-            id=content["id"],
-            user_id=current_user.id,
-            description=content["description"],
-            date_created=content["date_created"], # just easier this way honestly
-            date_due=content["date_due"],
-            priority=content["priority"],
-            completed=content["completed"],
-        )
+        todo: Todo = existing_todo(request.get_json())
 
         with TransactionManager() as conn:
-            todo_id: Todo = update_todo(todo, conn)
+            todo_id: int = update_owned_todo(todo, conn)
 
             response: Response = success_response(
                 201, {"msg": "Object has been updated successfully", "id": todo_id}
@@ -111,24 +174,26 @@ def _put_todo_route():
             return response
 
     except (ValidationError, TypeError, KeyError) as e:
-        _logger.warn(msg=f"Validation error in PUT todo route: {e}")
+        _logger.warning("Validation error in PUT todo route: %s", e)
         abort(
             400,
             description="Invalid request data (make sure all fields are full and properly formatted)",
         )
 
+    except NoData:
+        abort(404, description="Todo not found")
+
     except Exception as e:
-        _logger.error(msg=f"Unkwown error in PUT todo route: {e}")
+        _logger.error("Unkwown error in PUT todo route: %s", e)
         abort(500)
 
 
-@todo_blueprint.route("/<todo_id>", methods=["DELETE"])
+@todo_blueprint.route("/<int:todo_id>", methods=["DELETE"])
 @login_required
-def _delete_todo_route(todo_id):
+def _delete_todo_route(todo_id: int):
     try:
         with TransactionManager() as conn:
-            todo = get_todo_id(todo_id, conn)
-            delete_todo(todo, conn)
+            delete_owned_todo(todo_id, current_user.id, conn)
 
             response: Response = success_response(
                 200, {"msg": "Object has been deleted successfully"}
@@ -139,5 +204,103 @@ def _delete_todo_route(todo_id):
     except NoData:
         abort(404, description="Todo not found")
     except Exception as e:
-        _logger.error(msg=f"Unkwown error in PUT todo route: {e}")
+        _logger.error("Unkwown error in PUT todo route: %s", e)
+        abort(500)
+
+
+@todo_blueprint.route("/bulk", methods=["POST"])
+@login_required
+def _post_todos_bulk_route():
+    try:
+        if not request.is_json:
+            raise TypeError("Request content must be json")
+
+        items = get_bulk_items(request.get_json(), "todos")
+        results: List[Dict] = [{} for _ in items]
+
+        todos, indexes = new_bulk_todos(items, results)
+
+        with TransactionManager() as conn:
+            todo_ids: List[int] = save_todos(todos, conn)
+
+        for i, todo_id in zip(indexes, todo_ids):
+            results[i] = {"id": todo_id}
+
+        return success_response(
+            201, {"msg": "Objects have been processed successfully", "results": results}
+        )
+
+    except (ValidationError, TypeError, KeyError) as e:
+        _logger.warning("Validation error in bulk POST todo route: %s", e)
+        abort(
+            400,
+            description="Invalid request data (make sure all fields are full and properly formatted)",
+        )
+
+    except Exception as e:
+        _logger.error("Unkwown error in bulk POST todo route: %s", e)
+        abort(500)
+
+
+@todo_blueprint.route("/bulk", methods=["PUT"])
+@login_required
+def _put_todos_bulk_route():
+    try:
+        if not request.is_json:
+            raise TypeError("Request content must be json")
+
+        items = get_bulk_items(request.get_json(), "todos")
+        results: List[Dict] = [{} for _ in items]
+
+        todos, indexes = existing_bulk_todos(items, results)
+
+        with TransactionManager() as conn:
+            updated_ids = set(update_todos(todos, conn))
+
+        fill_bulk_results(results, indexes, [x.id for x in todos], updated_ids)
+
+        return success_response(
+            201, {"msg": "Objects have been processed successfully", "results": results}
+        )
+
+    except (ValidationError, TypeError, KeyError) as e:
+        _logger.warning("Validation error in bulk PUT todo route: %s", e)
+        abort(
+            400,
+            description="Invalid request data (make sure all fields are full and properly formatted)",
+        )
+
+    except Exception as e:
+        _logger.error("Unkwown error in bulk PUT todo route: %s", e)
+        abort(500)
+
+
+@todo_blueprint.route("/bulk", methods=["DELETE"])
+@login_required
+def _delete_todos_bulk_route():
+    try:
+        if not request.is_json:
+            raise TypeError("Request content must be json")
+
+        todo_ids = get_bulk_ids(request.get_json())
+
+        with TransactionManager() as conn:
+            deleted_ids = set(delete_todos(todo_ids, current_user.id, conn))
+
+        results: List[Dict] = [{} for _ in todo_ids]
+        fill_bulk_results(results, range(len(todo_ids)), todo_ids, deleted_ids)
+
+        return success_response(
+            200, {"msg": "Objects have been processed successfully", "results": results}
+        )
+
+    except (TypeError, KeyError) as e:
+        _logger.warning("Validation error in bulk DELETE todo route: %s", e)
+        abort(
+            400,
+            description="Invalid request data (make sure all fields are full and properly formatted)",
+        )
+
+    except Exception as e:
+        _logger.error("Unkwown error in bulk DELETE todo route: %s", e)
         abort(500)
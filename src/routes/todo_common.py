@@ -0,0 +1,293 @@
+# mypy: check-untyped-defs
+import hashlib
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from flask import Response, abort, current_app, request
+from flask_login import current_user  # type: ignore
+from pydantic import ValidationError
+
+from src.common import PriorityType, decode_cursor, encode_cursor
+from src.core import Todo, TodoQuery, TodoRecord
+from src.data import TransactionManager, end_connection_scope, iter_todos_from_user
+from src.data.notifications import Subscription, get_todo_change_listener
+from src.routes.responses import event_stream_response, set_etag, success_response
+
+# the request parsing and responses shared by todo_bp and async_todo_bp, which only differ in how they query
+_logger = logging.getLogger("TODOROUTE")
+
+_DEFAULT_PAGE_LIMIT = 100
+
+_MAX_PAGE_LIMIT = 500
+
+MAX_BULK_SIZE = 1000
+
+_MAX_SEARCH_LENGTH = 256
+
+_INVALID_TODO_ERROR = "Invalid todo data (make sure all fields are full and properly formatted)"
+
+
+def _todo_query_from_args() -> TodoQuery:
+    # priorities can be given either as a comma separated list or as repeated parameters
+    priorities = [
+        x for value in request.args.getlist("priority") for x in value.split(",") if x
+    ]
+    return TodoQuery(
+        completed=request.args.get("completed"),
+        priority=priorities or None,
+        due_before=request.args.get("due_before"),
+        due_after=request.args.get("due_after"),
+        sort=request.args.get("sort", "id"),
+    )
+
+
+def _encode_page_cursor(query: TodoQuery, last_key: tuple) -> str:
+    values = [x.isoformat() if isinstance(x, datetime) else x for x in last_key]
+    return encode_cursor(query.sort, *values)
+
+
+def _decode_page_cursor(query: TodoQuery, cursor: str) -> tuple:
+    sort, *key = decode_cursor(cursor)
+    if sort != query.sort:
+        raise ValueError("Cursor belongs to another sort order")
+
+    if len(key) != (1 if sort == "id" else 2) or not isinstance(key[-1], int):
+        raise ValueError("Malformed cursor")
+
+    todo_id = key[-1]
+    if sort == "id":
+        return (todo_id,)
+
+    value = key[0]
+    if sort == "priority":
+        value = PriorityType(value)
+    elif value is not None or sort != "date_due":
+        value = datetime.fromisoformat(value)
+
+    return (value, todo_id)
+
+
+def todo_list_etag(user_id: int, version: int) -> str:
+    # pages and filters are different representations of the same list, so the query is part of the tag
+    query_hash = hashlib.blake2s(request.query_string, digest_size=6).hexdigest()
+    return f"{user_id}-{version}-{query_hash}"
+
+
+def new_todo(content, date_created: datetime) -> Todo:
+    return Todo(
+        id=None,
+        user_id=current_user.id,
+        description=content["description"],
+        date_created=date_created,  # HACK: PROBABLY SHOULD DO THIS IN SOME SORT OF CONSTRUCTOR
+        date_due=content["date_due"],
+        priority=content["priority"],
+        completed=content["completed"],
+    )
+
+
+def existing_todo(content) -> Todo:
+    return Todo(
+        id=content["id"],
+        user_id=current_user.id,
+        description=content["description"],
+        date_created=content["date_created"],  # just easier this way honestly
+        date_due=content["date_due"],
+        priority=content["priority"],
+        completed=content["completed"],
+    )
+
+
+def todo_page_args() -> Tuple[TodoQuery, int, Optional[tuple]]:
+    query = _todo_query_from_args()
+
+    limit = int(request.args.get("limit", _DEFAULT_PAGE_LIMIT))
+    if limit < 1:
+        raise ValueError("Page limit must be positive")
+    limit = min(limit, _MAX_PAGE_LIMIT)
+
+    after = None
+    if "after" in request.args:
+        after = _decode_page_cursor(query, request.args["after"])
+
+    return query, limit, after
+
+
+def todo_search_args() -> Tuple[str, int, Optional[tuple]]:
+    search = request.args.get("q", "").strip()
+    if not search or len(search) > _MAX_SEARCH_LENGTH:
+        raise ValueError("Search text must be between 1 and 256 characters")
+
+    limit = int(request.args.get("limit", _DEFAULT_PAGE_LIMIT))
+    if limit < 1:
+        raise ValueError("Page limit must be positive")
+    limit = min(limit, _MAX_PAGE_LIMIT)
+
+    after = None
+    if "after" in request.args:
+        after = decode_cursor(request.args["after"])
+        if (
+            len(after) != 2
+            or not isinstance(after[0], (int, float))
+            or not isinstance(after[1], int)
+        ):
+            raise ValueError("Malformed cursor")
+
+    return search, limit, after
+
+
+def todo_search_response(
+    results: List[Tuple[TodoRecord, str]], last_key: Optional[tuple]
+) -> Response:
+    data = [{**x.to_dict(), "highlight": highlight} for x, highlight in results]
+    next_cursor = encode_cursor(*last_key) if last_key is not None else None
+    return success_response(200, data, next_cursor=next_cursor)
+
+
+def todo_page_response(
+    query: TodoQuery, tdlist: List[TodoRecord], last_key: Optional[tuple], etag: str
+) -> Response:
+    tdlist_dict: List[Dict] = []
+    for x in tdlist:
+        tdlist_dict.append(x.to_dict())
+
+    next_cursor = None
+    if last_key is not None:
+        next_cursor = _encode_page_cursor(query, last_key)
+    response: Response = success_response(200, tdlist_dict, next_cursor=next_cursor)
+    response.status_code = 200
+    set_etag(response, etag)
+
+    return response
+
+
+def changes_since_arg() -> Optional[int]:
+    if "since" not in request.args:
+        return None
+
+    key = decode_cursor(request.args["since"])
+    if len(key) != 1 or not isinstance(key[0], int) or isinstance(key[0], bool):
+        raise ValueError("Malformed cursor")
+    return key[0]
+
+
+def todo_changes_response(
+    changed: List[TodoRecord], deleted: List[int], version: int
+) -> Response:
+    data = {"todos": [x.to_dict() for x in changed], "deleted": deleted}
+    return success_response(200, data, next_cursor=encode_cursor(version))
+
+
+def _todo_events(subscription: Subscription, keepalive: float, max_duration: float) -> Iterator[str]:
+    # sent right away, so the client knows it is subscribed and can sync the changes it missed so far
+    yield "retry: 1000\n\n"
+
+    deadline = time.monotonic() + max_duration
+    while time.monotonic() < deadline:
+        if subscription.wait(min(keepalive, deadline - time.monotonic())):
+            yield "event: changed\ndata: {}\n\n"
+        else:  # keeps proxies from closing an idle stream, and notices clients that left
+            yield ": keepalive\n\n"
+
+
+def todo_events_response(user_id: int) -> Response:
+    if not current_app.config.get("TODO_EVENTS_ENABLED"):
+        abort(404, description="Todo events are not enabled on this server")
+
+    listener = get_todo_change_listener()
+    subscription = listener.subscribe(user_id)
+    # the stream doesn't need the database, so the connection of the request goes back to the pool now
+    end_connection_scope()
+
+    response = event_stream_response(
+        _todo_events(
+            subscription,
+            current_app.config["TODO_EVENTS_KEEPALIVE"],
+            current_app.config["TODO_EVENTS_MAX_DURATION"],
+        )
+    )
+    response.call_on_close(lambda: listener.unsubscribe(subscription))
+    return response
+
+
+def stream_todos_from_user(user_id: int, query: TodoQuery) -> Iterator[Dict]:
+    # runs while the response is being sent, so the transaction stays open until the last todo is written
+    try:
+        with TransactionManager(read_only=True) as conn:
+            for x in iter_todos_from_user(user_id, query, conn):
+                yield x.to_dict()
+    except Exception as e:
+        # the status has already been sent at this point, so the best we can do is cut the response short
+        _logger.error("Unkwown error while streaming todo list from user: %s", e)
+        raise e
+
+
+def get_bulk_items(content, key: str) -> List:
+    items = content[key]
+    if not isinstance(items, list):
+        raise TypeError(f"{key} must be a list")
+    if len(items) > MAX_BULK_SIZE:
+        raise TypeError(f"At most {MAX_BULK_SIZE} items can be sent at once")
+
+    return items
+
+
+def get_bulk_ids(content) -> List[int]:
+    todo_ids = get_bulk_items(content, "ids")
+    if not all(isinstance(x, int) and not isinstance(x, bool) for x in todo_ids):
+        raise TypeError("Todo ids must be integers")
+
+    return todo_ids
+
+
+def new_bulk_todos(items: List, results: List[Dict]) -> Tuple[List[Todo], List[int]]:
+    # invalid items get their error in the results right away, the rest are saved together
+    todos: List[Todo] = []
+    indexes: List[int] = []
+    date_created = datetime.now()
+    for i, content in enumerate(items):
+        try:
+            todos.append(new_todo(content, date_created))
+            indexes.append(i)
+        except (ValidationError, TypeError, KeyError) as e:
+            _logger.warning("Validation error in bulk POST todo route: %s", e)
+            results[i] = {"error": _INVALID_TODO_ERROR}
+
+    return todos, indexes
+
+
+def existing_bulk_todos(
+    items: List, results: List[Dict]
+) -> Tuple[List[Todo], List[int]]:
+    todos: List[Todo] = []
+    indexes: List[int] = []
+    seen_ids: Set[int] = set()
+    for i, content in enumerate(items):
+        try:
+            todo = existing_todo(content)
+        except (ValidationError, TypeError, KeyError) as e:
+            _logger.warning("Validation error in bulk PUT todo route: %s", e)
+            results[i] = {"error": _INVALID_TODO_ERROR}
+            continue
+
+        # the update would apply only one of the items with the same id, and postgres picks which
+        if todo.id in seen_ids:
+            results[i] = {"error": "Duplicate todo id"}
+            continue
+        seen_ids.add(todo.id)
+        todos.append(todo)
+        indexes.append(i)
+
+    return todos, indexes
+
+
+def fill_bulk_results(
+    results: List[Dict], indexes: Iterable[int], todo_ids: List, found_ids: Set[int]
+):
+    for i, todo_id in zip(indexes, todo_ids):
+        if todo_id in found_ids:
+            results[i] = {"id": todo_id}
+        else:
+            results[i] = {"error": "Todo not found"}
+
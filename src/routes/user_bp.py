@@ -15,14 +15,22 @@ from psycopg2.errors import (
 )  # probably should change this to use custom errors like "User Error" to decide what to send back
 from pydantic import ValidationError  # same as above here...
 
-from src.core import User, check_password, set_password
+from src.core import (
+    HashingUnavailable,
+    User,
+    check_password,
+    password_needs_rehash,
+    set_password,
+)
 from src.data import (
     TransactionManager,
     delete_user,
+    get_user_cache,
     get_user_id,
     get_user_password,
     save_user,
     update_user,
+    update_user_password,
 )
 from src.routes.responses import success_response
 
@@ -34,8 +42,16 @@ login_manager = LoginManager()
 
 @login_manager.user_loader
 def load_user(user_id):
-    with TransactionManager() as conn:
-        return get_user_id(user_id, conn)
+    user_id = int(user_id)
+    user = get_user_cache().get(user_id)
+    if user is not None:
+        return user
+
+    with TransactionManager(read_only=True) as conn:
+        user = get_user_id(user_id, conn)
+
+    get_user_cache().put(user_id, user)
+    return user
 
 
 @user_blueprint.route("/login", methods=["POST"])
@@ -59,19 +75,31 @@ def _login_user_route():
                 user = load_user(user_id)
                 login_user(user)
 
+            if password_needs_rehash(password_hash):  # the hashing parameters changed since the password was set
+                try:
+                    rehashed_user = User(id=user_id, username=username, password=None)
+                    set_password(rehashed_user, raw_text_password)
+                    update_user_password(rehashed_user, conn)
+                except HashingUnavailable as e:  # not worth failing the login over, it'll be retried next time
+                    _logger.warning("Skipped password rehash in POST user login route: %s", e)
+
             return success_response(
                 201, {"msg": "User has been verified successfully", "id": user.id}
             )
 
+    except HashingUnavailable as e:
+        _logger.warning("Hashing unavailable in POST user login route: %s", e)
+        abort(503, description="Server is busy, try again later")
+
     except (ValidationError, TypeError, KeyError) as e:
-        _logger.warn(msg=f"Validation error in POST user route: {e}")
+        _logger.warning("Validation error in POST user route: %s", e)
         abort(
             400,
             description="Invalid request data (make sure all fields are full and properly formatted)",
         )
 
     except Exception as e:
-        _logger.error(msg=f"Unkwown error in POST user route: {e}")
+        _logger.error("Unkwown error in POST user route: %s", e)
         abort(500)
 
 
@@ -104,21 +132,25 @@ def _post_user_route():
             )
 
     except UniqueViolation as e:
-        _logger.warn(msg=f"Unique Violation in POST user route: {e}")
+        _logger.warning("Unique Violation in POST user route: %s", e)
         abort(
             400,
             description="Username must be unique",
         )
 
+    except HashingUnavailable as e:
+        _logger.warning("Hashing unavailable in POST user route: %s", e)
+        abort(503, description="Server is busy, try again later")
+
     except (ValidationError, TypeError, KeyError) as e:
-        _logger.warn(msg=f"Validation error in POST user route: {e}")
+        _logger.warning("Validation error in POST user route: %s", e)
         abort(
             400,
             description="Invalid request data (make sure all fields are full and properly formatted)",
         )
 
     except Exception as e:
-        _logger.error(msg=f"Unkwown error in POST user route: {e}")
+        _logger.error("Unkwown error in POST user route: %s", e)
         abort(500)
 
 
@@ -131,7 +163,7 @@ def _put_user_route():
 
         content = request.get_json()
         user: User = User(
-            current_user.id,
+            id=current_user.id,
             username=content["username"],
             password=None,  # maybe i should remove the password altogether, no need to have it here i don't think
         )
@@ -144,21 +176,21 @@ def _put_user_route():
             )
 
     except UniqueViolation as e:
-        _logger.warn(msg=f"Unique Violation in POST user route: {e}")
+        _logger.warning("Unique Violation in POST user route: %s", e)
         abort(
             400,
             description="Username must be unique",
         )
 
     except (ValidationError, TypeError, KeyError) as e:
-        _logger.warn(msg=f"Validation error in PUT user route: {e}")
+        _logger.warning("Validation error in PUT user route: %s", e)
         abort(
             400,
             description="Invalid request data (make sure all fields are full and properly formatted)",
         )
 
     except Exception as e:
-        _logger.error(msg=f"Unkwown error in PUT user route: {e}")
+        _logger.error("Unkwown error in PUT user route: %s", e)
         abort(500)
 
 
@@ -178,5 +210,5 @@ def _delete_user_route():
     except NoData:
         abort(404, description="User not found")
     except Exception as e:
-        _logger.error(msg=f"Unkwown error in DELETE user route: {e}")
+        _logger.error("Unkwown error in DELETE user route: %s", e)
         abort(500)
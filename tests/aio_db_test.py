@@ -0,0 +1,127 @@
+from datetime import datetime
+from typing import List
+
+import pytest
+from psycopg2.errors import NoData
+
+from src.common import PriorityType
+from src.core import Todo, TodoQuery, User
+from src.data import TransactionManager, delete_user, save_user
+from src.data.aio import AsyncTransactionManager, delete_owned_todo, delete_todos, get_todo_id, get_todos_from_user, iter_todos_from_user, run_coroutine, save_todo, save_todos, update_todos
+from src.data.aio import todo_methods
+
+# asyncpg only talks to postgres
+pytestmark = pytest.mark.usefixtures("postgres_db")
+
+
+@pytest.fixture
+def user_id():
+    # committed through the sync DAL, since the users have no async methods
+    user = User(id=None, username="test_async_username", password="test_password")
+    with TransactionManager() as conn:
+        user.id = save_user(user, conn)
+
+    yield user.id
+
+    with TransactionManager() as conn:
+        delete_user(user, conn)
+
+
+@pytest.fixture
+def std_todo_list(user_id) -> List[Todo]:
+    return [
+        Todo(
+            id=None,
+            user_id=user_id,
+            description=description,
+            date_created=datetime.now(),
+            date_due=datetime.now(),
+            priority=priority,
+            completed=False,
+        )
+        for description, priority in [
+            ("This is a todo", PriorityType.IMPORTANT),
+            ("This is another todo", PriorityType.URGENT),
+            ("This is yet another todo", PriorityType.OPTIONAL),
+        ]
+    ]
+
+
+def test_async_todo_save(std_todo_list):
+    async def run():
+        async with AsyncTransactionManager(debug=True) as conn:
+            for x in std_todo_list:
+                x.id = await save_todo(x, conn)
+
+            # the priorities went to postgres by label and came back as the enum
+            assert [await get_todo_id(x.id, conn) for x in std_todo_list] == std_todo_list
+
+            assert await delete_owned_todo(std_todo_list[0].id, std_todo_list[0].user_id, conn) == std_todo_list[0].id
+            with pytest.raises(NoData):
+                await get_todo_id(std_todo_list[0].id, conn)
+
+    run_coroutine(run())
+
+
+def test_async_todo_bulk(user_id, std_todo_list):
+    async def run():
+        async with AsyncTransactionManager(debug=True) as conn:
+            todo_ids = await save_todos(std_todo_list, conn)
+            assert len(todo_ids) == len(std_todo_list)
+
+            for x, td_id in zip(std_todo_list, todo_ids):
+                x.id = td_id
+                assert await get_todo_id(td_id, conn) == x
+
+            for x in std_todo_list:
+                x.completed = True
+                x.priority = PriorityType.NORMAL
+
+            assert sorted(await update_todos(std_todo_list, conn)) == todo_ids
+            for x in std_todo_list:
+                assert await get_todo_id(x.id, conn) == x
+
+            assert sorted(await delete_todos(todo_ids, user_id, conn)) == todo_ids
+            assert await get_todos_from_user(user_id, conn) == []
+
+    run_coroutine(run())
+
+
+def test_async_todo_list_stream(monkeypatch, user_id, std_todo_list):
+    # smaller batches than todos, so the stream has to fetch more than once
+    monkeypatch.setattr(todo_methods, "_STREAM_BATCH_SIZE", 2)
+
+    async def run():
+        async with AsyncTransactionManager(debug=True) as conn:
+            for x in std_todo_list:
+                x.id = await save_todo(x, conn)
+
+            streamed_todo_list = [x async for x in iter_todos_from_user(user_id, TodoQuery(), conn)]
+            assert streamed_todo_list == std_todo_list
+
+            query = TodoQuery(priority={PriorityType.URGENT, PriorityType.OPTIONAL})
+            streamed_todo_list = [x async for x in iter_todos_from_user(user_id, query, conn)]
+            assert {x.id for x in streamed_todo_list} == {std_todo_list[1].id, std_todo_list[2].id}
+
+    run_coroutine(run())
+
+
+def test_async_nested_transactions(user_id, std_todo_list):
+    async def run():
+        async with AsyncTransactionManager(debug=True) as conn:
+            with pytest.raises(ValueError):
+                async with AsyncTransactionManager() as nested_conn:
+                    assert nested_conn is conn
+                    await save_todo(std_todo_list[0], nested_conn)
+                    raise ValueError("rolls back the savepoint only")
+
+            async with AsyncTransactionManager() as nested_conn:
+                std_todo_list[1].id = await save_todo(std_todo_list[1], nested_conn)
+
+            assert await get_todos_from_user(user_id, conn) == [std_todo_list[1]]
+
+        # the outer transaction was rolled back along with the savepoint it released
+        async with AsyncTransactionManager() as conn:
+            assert await get_todos_from_user(user_id, conn) == []
+
+    run_coroutine(run())
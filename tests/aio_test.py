@@ -0,0 +1,52 @@
+import asyncio
+import threading
+from contextvars import ContextVar
+
+import pytest
+
+from src.common import PriorityType
+from src.data.aio import async_to_sync, run_coroutine
+from src.data.aio.todo_methods import _adapt
+
+_request_id: ContextVar[int] = ContextVar("_request_id", default=0)
+
+
+async def _current_request_id() -> int:
+    await asyncio.sleep(0)
+    return _request_id.get()
+
+
+def test_run_coroutine_keeps_caller_context():
+    results = {}
+
+    def handle(request_id: int):
+        _request_id.set(request_id)
+        results[request_id] = run_coroutine(_current_request_id())
+
+    threads = [threading.Thread(target=handle, args=(x,)) for x in range(1, 9)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {x: x for x in range(1, 9)}
+
+
+def test_async_to_sync_raises_view_errors():
+    async def view(value: int) -> int:
+        if value < 0:
+            raise ValueError("negative")
+        return value * 2
+
+    sync_view = async_to_sync(view)
+
+    assert sync_view(2) == 4
+    with pytest.raises(ValueError):
+        sync_view(-1)
+
+
+def test_adapt_sends_enums_by_label():
+    assert _adapt(PriorityType.URGENT) == "URGENT"
+    assert _adapt([PriorityType.OPTIONAL, PriorityType.NORMAL]) == ["OPTIONAL", "NORMAL"]
+    assert _adapt([1, 2]) == [1, 2]
+    assert _adapt(None) is None
@@ -0,0 +1,26 @@
+from benchmarks.harness import find_regressions, measure
+
+
+def test_measure():
+    calls = []
+    result = measure(lambda: calls.append(1), number=3, repeat=2)
+
+    assert len(calls) == 1 + 3 * 2  # warm up included
+    assert 0 <= result["min_ms"] <= result["median_ms"]
+
+
+def test_find_regressions():
+    baseline = {
+        "fast": {"min_ms": 1.0, "median_ms": 1.0},
+        "slow": {"min_ms": 1.0, "median_ms": 1.0},
+    }
+    results = {
+        "fast": {"min_ms": 1.1, "median_ms": 1.2},
+        "slow": {"min_ms": 2.0, "median_ms": 2.0},
+        "new": {"min_ms": 5.0, "median_ms": 5.0},
+    }
+
+    regressions = find_regressions(results, baseline, tolerance=0.25)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("slow:")
@@ -0,0 +1,53 @@
+import time
+
+from src.common import TTLCache
+
+
+def test_cache_hit_and_miss():
+    cache = TTLCache(max_size=2, ttl=60)
+
+    assert cache.get(1) is None
+    cache.put(1, "one")
+    assert cache.get(1) == "one"
+
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+
+    cache.put(1, "one")
+    cache.put(2, "two")
+    cache.get(1)
+    cache.put(3, "three")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "one"
+    assert cache.get(3) == "three"
+
+
+def test_cache_expires_entries():
+    cache = TTLCache(max_size=2, ttl=0.01)
+
+    cache.put(1, "one")
+    time.sleep(0.02)
+
+    assert cache.get(1) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_invalidate():
+    cache = TTLCache(max_size=2, ttl=60)
+
+    cache.put(1, "one")
+    cache.invalidate(1)
+
+    assert cache.get(1) is None
+
+
+def test_cache_disabled():
+    cache = TTLCache(max_size=0, ttl=60)
+
+    cache.put(1, "one")
+
+    assert cache.get(1) is None
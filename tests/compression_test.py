@@ -0,0 +1,80 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response, request, stream_with_context
+
+from src.routes.compression import init_compression
+from src.routes.responses import not_modified_response, set_etag
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("COMPRESSION_MIN_SIZE", "1024")
+    app = Flask(__name__)
+    init_compression(app)
+
+    todos = [{"id": i, "description": f"Todo {i}", "completed": False} for i in range(500)]
+
+    @app.route("/todos")
+    def _todos():
+        if request.if_none_match.contains_weak("version-1"):
+            return not_modified_response("version-1")
+        response = app.json.response(todos)
+        set_etag(response, "version-1")
+        return response
+
+    @app.route("/small")
+    def _small():
+        return app.json.response({"status": "success"})
+
+    @app.route("/stream")
+    def _stream():
+        def generate():
+            yield "["
+            yield ", ".join(json.dumps(x) for x in todos)
+            yield "]"
+
+        return Response(stream_with_context(generate()), mimetype="application/json")
+
+    return app.test_client()
+
+
+def test_compresses_large_responses(client):
+    response = client.get("/todos", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["ETag"] == 'W/"version-1"'
+    assert len(json.loads(gzip.decompress(response.data))) == 500
+
+
+def test_not_modified_keeps_the_compressed_etag(client):
+    etag = client.get("/todos", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    response = client.get("/todos", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert client.get("/todos").headers["ETag"] == etag
+
+
+def test_skips_small_and_unaccepted_responses(client):
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/todos").headers
+    assert "Content-Encoding" not in client.get("/todos", headers={"Accept-Encoding": "gzip;q=0"}).headers
+
+
+def test_compresses_streamed_responses(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert len(json.loads(gzip.decompress(response.data))) == 500
+
+
+def test_prefers_the_best_available_encoding(client):
+    zstandard = pytest.importorskip("zstandard")
+    response = client.get("/todos", headers={"Accept-Encoding": "gzip, br, zstd"})
+
+    assert response.headers["Content-Encoding"] == "zstd"
+    assert len(json.loads(zstandard.ZstdDecompressor().decompressobj().decompress(response.data))) == 500
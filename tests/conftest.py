@@ -0,0 +1,124 @@
+import os
+import uuid
+
+import pytest
+from alembic.config import Config
+from alembic.runtime.environment import EnvironmentContext
+from alembic.script import ScriptDirectory
+
+from src.core import User, hashing
+from src.data import TransactionManager, db, delete_todos, delete_user, get_todos_from_user
+
+_MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+
+def _test_backend() -> str:
+    return os.getenv("DB_TEST_BACKEND", "sqlite")
+
+
+def _migrate_to_head(engine):
+    # the revisions are run without migrations/env.py, which also needs the models for autogenerate
+    config = Config()
+    config.set_main_option("script_location", _MIGRATIONS)
+    script = ScriptDirectory.from_config(config)
+
+    with EnvironmentContext(
+        config,
+        script,
+        fn=lambda rev, context: script._upgrade_revs("head", rev),
+        destination_rev="head",
+    ) as env, engine.connect() as conn:
+        env.configure(connection=conn, render_as_batch=True)
+        with env.begin_transaction():
+            env.run_migrations()
+
+
+@pytest.fixture(scope="session")
+def test_db(tmp_path_factory):
+    """
+    Points the DAL at a throwaway sqlite database migrated to head. Set DB_TEST_BACKEND=postgresql to run
+    against the postgres database configured in the env instead, which must already be migrated.
+    """
+    if _test_backend() == "postgresql":
+        yield
+        return
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("DB_BACKEND", "sqlite")
+        monkeypatch.setenv("DB_SQLITE_PATH", str(tmp_path_factory.mktemp("db") / "test.db"))
+        monkeypatch.setattr(db, "_engine", None)
+        monkeypatch.setattr(db, "_engine_pid", None)
+        monkeypatch.setattr(db, "_replicas", None)
+
+        engine = db.get_engine()
+        _migrate_to_head(engine)
+        yield
+        engine.dispose()
+
+
+@pytest.fixture
+def postgres_db(test_db):
+    """
+    Skips the test unless it runs against postgres, for the features sqlite doesn't have (ex. asyncpg).
+    """
+    if _test_backend() != "postgresql":
+        pytest.skip("needs DB_TEST_BACKEND=postgresql")
+
+
+@pytest.fixture
+def app(test_db, tmp_path, monkeypatch):
+    """
+    The app as created by create_app on the test database, with csrf disabled and a cheap password hash.
+    """
+    from src.common.log_config import stop_logging
+    from src.main import create_app
+
+    monkeypatch.setenv("LOG_FILE", str(tmp_path / "test.log"))
+    monkeypatch.setenv("SECRET_KEY", "test")
+    monkeypatch.setattr(
+        hashing,
+        "_password_hasher",
+        hashing.PasswordHasher(workers=0, queue_depth=8, method="pbkdf2:sha256:1000", salt_length=16, timeout=10),
+    )
+
+    try:
+        app = create_app()
+        app.config["TESTING"] = True
+        app.config["WTF_CSRF_ENABLED"] = False
+        yield app
+    finally:
+        stop_logging()
+
+
+@pytest.fixture
+def login(app):
+    """
+    Returns a function that signs up a new user and returns a test client logged in as them.
+    The users are deleted along with their todos once the test is done.
+    """
+    user_ids = []
+
+    def _login():
+        client = app.test_client()
+        credentials = {"username": f"test_{uuid.uuid4().hex[:12]}", "password": "test_password"}
+        assert client.post("/users/", json=credentials).status_code == 201
+        response = client.post("/users/login", json=credentials)
+        assert response.status_code == 201
+        user_ids.append(response.get_json()["data"]["id"])
+        return client
+
+    yield _login
+
+    for user_id in user_ids:
+        with TransactionManager() as conn:
+            todo_ids = [x.id for x in get_todos_from_user(user_id, conn)]
+            delete_todos(todo_ids, user_id, conn)
+            delete_user(User(id=user_id, username="deleted", password=None), conn)
+
+
+@pytest.fixture
+def client(login):
+    """
+    A test client logged in as a new user, see login.
+    """
+    return login()
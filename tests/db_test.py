@@ -2,17 +2,38 @@ from datetime import datetime
 from typing import List
 
 import pytest
+from psycopg2.errors import NoData
+from sqlalchemy import event
 
 from src.common import PriorityType
 
-from src.data import TransactionManager, ping_db, save_todo, get_todo_id, get_todos_from_user, delete_todo, save_user, get_user_id, delete_user, update_user
-from src.core import Todo, User
+from src.data import TransactionManager, begin_connection_scope, end_connection_scope, get_user_from_name, ping_db, save_todo, save_todos, update_todos, delete_todos, update_owned_todo, delete_owned_todo, get_todo_id, get_todo_changes, get_todo_version, get_todos_from_user, get_todos_page_from_user, iter_todos_from_user, search_todos, save_user, get_user_id, get_user_cache, delete_user, update_user
+from src.core import Todo, TodoQuery, User
+from src.data.db import get_db_backend, get_engine
+
+pytestmark = pytest.mark.usefixtures("test_db")
 
 
 def test_db_ping():
     assert ping_db()
 
 
+@pytest.fixture
+def checkouts():
+    """
+    Counts the connections checked out from the pool of the engine while the test runs.
+    """
+    counter = {"count": 0}
+
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counter["count"] += 1
+
+    engine = get_engine()
+    event.listen(engine, "checkout", _on_checkout)
+    yield counter
+    event.remove(engine, "checkout", _on_checkout)
+
+
 @pytest.fixture
 def std_user() -> User:
     return User(id=None, username="test_username", password="test_password")
@@ -78,17 +99,15 @@ def test_user_save(std_user):
 
             assert get_usr.id is not None
             assert get_usr.username == std_user.username
-            assert get_usr.password == std_user.password
+            assert get_usr.password is None  # users are loaded without their password
 
             update_username = "test_username_update"
             std_user.username = update_username
 
             std_user.id = usr_id
-            upd_usr = update_user(std_user, conn)
+            assert update_user(std_user, conn) == usr_id
 
-            assert upd_usr.username == update_username
-
-            get_usr = get_user_id(upd_usr.id, conn)
+            get_usr = get_user_id(usr_id, conn)
 
             assert get_usr.username == std_user.username
 
@@ -113,6 +132,80 @@ def test_user_delete(std_user):
             assert get_usr.id is None
 
 
+def test_user_cache_invalidated_after_commit(std_user):
+    with TransactionManager() as conn:
+        std_user.id = save_user(std_user, conn)
+
+    try:
+        with TransactionManager() as conn:
+            std_user.username = "renamed_username"
+            update_user(std_user, conn)
+            # as loaded by a concurrent request before the rename was committed
+            get_user_cache().put(std_user.id, "stale user")
+
+        assert get_user_cache().get(std_user.id) is None
+    finally:
+        with TransactionManager() as conn:
+            delete_user(std_user, conn)
+
+
+def test_connection_scope_shares_one_connection(checkouts):
+    begin_connection_scope()
+    try:
+        with TransactionManager(debug=True) as conn:
+            with TransactionManager(debug=True) as nested_conn:
+                assert nested_conn is conn
+                assert conn.in_nested_transaction()
+            assert not conn.in_nested_transaction()
+
+        with TransactionManager(debug=True, read_only=True) as conn_after:
+            assert conn_after is conn
+    finally:
+        end_connection_scope()
+
+    assert checkouts["count"] == 1
+    assert conn.closed
+
+
+def test_connection_scope_rolls_back_failed_savepoints(std_user):
+    other_user = User(id=None, username="other_username", password="test_password")
+    begin_connection_scope()
+    try:
+        with TransactionManager() as conn:
+            std_user.id = save_user(std_user, conn)
+            with pytest.raises(ValueError):
+                with TransactionManager():
+                    save_user(other_user, conn)
+                    raise ValueError("rolls back the savepoint only")
+    finally:
+        end_connection_scope()
+
+    try:
+        with TransactionManager() as conn:
+            assert get_user_from_name(std_user.username, conn).id == std_user.id
+            with pytest.raises(NoData):
+                get_user_from_name(other_user.username, conn)
+    finally:
+        with TransactionManager() as conn:
+            delete_user(std_user, conn)
+
+
+def test_transaction_manager_owns_its_connection_outside_a_scope(std_user, checkouts):
+    with TransactionManager() as conn:
+        std_user.id = save_user(std_user, conn)
+    assert conn.closed
+
+    try:
+        with TransactionManager() as other_conn:
+            assert other_conn is not conn
+            assert get_user_id(std_user.id, other_conn).username == std_user.username
+        assert other_conn.closed
+        assert checkouts["count"] == 2
+    finally:
+        with TransactionManager() as conn:
+            delete_user(std_user, conn)
+
+
 def test_todo_save(std_user, std_todo):
     try:
         with TransactionManager(debug=True) as conn:
@@ -144,6 +237,45 @@ def test_todo_list_fetch(std_user, std_todo_list):
     except Exception as e:
         raise e
 
+def test_todo_page_fetch(std_user, std_todo_list):
+    try:
+        with TransactionManager(debug=True) as conn:
+            user_id = save_user(std_user, conn)
+
+            for x in std_todo_list:
+                x.user_id = user_id
+                td_id = save_todo(x, conn)
+                x.id = td_id
+
+            first_page, last_id = get_todos_page_from_user(user_id, TodoQuery(), 2, None, conn)
+            assert len(first_page) == 2
+            assert last_id == (first_page[-1].id,)
+
+            second_page, last_id = get_todos_page_from_user(user_id, TodoQuery(), 2, last_id, conn)
+            assert len(second_page) == 1
+            assert last_id is None
+
+            assert all(x == y for x, y in zip(std_todo_list, first_page + second_page))
+    except Exception as e:
+        raise e
+
+def test_todo_list_stream(std_user, std_todo_list):
+    try:
+        with TransactionManager(debug=True) as conn:
+            user_id = save_user(std_user, conn)
+
+            for x in std_todo_list:
+                x.user_id = user_id
+                td_id = save_todo(x, conn)
+                x.id = td_id
+
+            streamed_todo_list = list(iter_todos_from_user(user_id, TodoQuery(), conn))
+
+            assert len(streamed_todo_list) == len(std_todo_list)
+            assert all(x == y for x, y in zip(std_todo_list, streamed_todo_list))
+    except Exception as e:
+        raise e
+
 def test_delete_todo(std_user, std_todo):
     try:
         with TransactionManager(debug=True) as conn:
@@ -153,7 +285,194 @@ def test_delete_todo(std_user, std_todo):
             todo_id = save_todo(std_todo, conn)
             std_todo.id = todo_id
 
-            delete_todo(std_todo, conn)
+            assert delete_owned_todo(todo_id, usr_id, conn) == todo_id
+            with pytest.raises(NoData):
+                get_todo_id(todo_id, conn)
+
+    except Exception as e:
+        raise e
+
+
+def test_todo_bulk(std_user, std_todo_list):
+    try:
+        with TransactionManager(debug=True) as conn:
+            user_id = save_user(std_user, conn)
+
+            for x in std_todo_list:
+                x.user_id = user_id
+
+            todo_ids = save_todos(std_todo_list, conn)
+            assert len(todo_ids) == len(std_todo_list)
+
+            for x, td_id in zip(std_todo_list, todo_ids):
+                x.id = td_id
+                assert get_todo_id(td_id, conn) == x
+
+            for x in std_todo_list:
+                x.completed = True
+
+            assert sorted(update_todos(std_todo_list, conn)) == todo_ids
+            assert all(get_todo_id(td_id, conn).completed for td_id in todo_ids)
+
+            assert sorted(delete_todos(todo_ids, user_id, conn)) == todo_ids
+            assert get_todos_from_user(user_id, conn) == []
+    except Exception as e:
+        raise e
+
+
+def test_owned_todo_mutations(std_user, std_todo):
+    try:
+        with TransactionManager(debug=True) as conn:
+            usr_id = save_user(std_user, conn)
+            other_usr_id = save_user(User(id=None, username="other_username", password="test_password"), conn)
+            std_todo.user_id = usr_id
+
+            todo_id = save_todo(std_todo, conn)
+            std_todo.id = todo_id
+
+            std_todo.user_id = other_usr_id
+            with pytest.raises(NoData):
+                update_owned_todo(std_todo, conn)
+            with pytest.raises(NoData):
+                delete_owned_todo(todo_id, other_usr_id, conn)
+
+            std_todo.user_id = usr_id
+            std_todo.completed = True
+            assert update_owned_todo(std_todo, conn) == todo_id
+            assert get_todo_id(todo_id, conn) == std_todo
+
+            assert delete_owned_todo(todo_id, usr_id, conn) == todo_id
+            with pytest.raises(NoData):
+                get_todo_id(todo_id, conn)
+    except Exception as e:
+        raise e
+
+
+def test_todo_version(std_user, std_todo):
+    try:
+        with TransactionManager(debug=True) as conn:
+            usr_id = save_user(std_user, conn)
+            std_todo.user_id = usr_id
+            version = get_todo_version(usr_id, conn)
+
+            std_todo.id = save_todo(std_todo, conn)
+            assert get_todo_version(usr_id, conn) == version + 1
+
+            std_todo.completed = True
+            update_owned_todo(std_todo, conn)
+            assert get_todo_version(usr_id, conn) == version + 2
+
+            delete_owned_todo(std_todo.id, usr_id, conn)
+            assert get_todo_version(usr_id, conn) == version + 3
+    except Exception as e:
+        raise e
+
+
+def test_todo_changes(std_user, std_todo_list):
+    try:
+        with TransactionManager(debug=True) as conn:
+            user_id = save_user(std_user, conn)
+            for x in std_todo_list:
+                x.user_id = user_id
+                x.id = save_todo(x, conn)
+
+            changed, deleted, version = get_todo_changes(user_id, None, conn)
+            assert [x.id for x in changed] == [x.id for x in std_todo_list]
+            assert deleted == []
+            assert version == get_todo_version(user_id, conn)
+            assert get_todo_changes(user_id, version, conn) == ([], [], version)
+
+            std_todo_list[0].completed = True
+            update_owned_todo(std_todo_list[0], conn)
+            delete_owned_todo(std_todo_list[1].id, user_id, conn)
+
+            changed, deleted, next_version = get_todo_changes(user_id, version, conn)
+            assert [x.id for x in changed] == [std_todo_list[0].id]
+            assert changed[0].completed
+            assert deleted == [std_todo_list[1].id]
+            assert next_version == version + 2
+
+            # a full sync doesn't need the todos deleted before it
+            changed, deleted, _ = get_todo_changes(user_id, None, conn)
+            assert {x.id for x in changed} == {std_todo_list[0].id, std_todo_list[2].id}
+            assert deleted == []
+    except Exception as e:
+        raise e
+
+
+def test_todo_changes_after_id_reuse(std_user, std_todo):
+    try:
+        with TransactionManager(debug=True) as conn:
+            usr_id = save_user(std_user, conn)
+            std_todo.user_id = usr_id
+            _, _, version = get_todo_changes(usr_id, None, conn)
+
+            # sqlite hands the id of the deleted todo to the next one
+            todo_id = save_todo(std_todo, conn)
+            delete_owned_todo(todo_id, usr_id, conn)
+            std_todo.id = save_todo(std_todo, conn)
+
+            changed, deleted, _ = get_todo_changes(usr_id, version, conn)
+            assert [x.id for x in changed] == [std_todo.id]
+            assert std_todo.id not in deleted
+
+            delete_owned_todo(std_todo.id, usr_id, conn)
+            changed, deleted, _ = get_todo_changes(usr_id, version, conn)
+            assert changed == []
+            assert std_todo.id in deleted
+    except Exception as e:
+        raise e
+
+
+def test_todo_search(std_user, std_todo_list):
+    try:
+        with TransactionManager(debug=True) as conn:
+            user_id = save_user(std_user, conn)
+            descriptions = ["Buy milk", "Buy <b>bread</b> and milk, then more milk", "Walk the dog"]
+            for x, description in zip(std_todo_list, descriptions):
+                x.user_id = user_id
+                x.description = description
+                x.id = save_todo(x, conn)
+
+            results, last_key = search_todos(user_id, "milk", 1, None, conn)
+            assert [x.id for x, _ in results] == [std_todo_list[1].id]
+            assert results[0][1] == "Buy &lt;b&gt;bread&lt;/b&gt; and <mark>milk</mark>, then more <mark>milk</mark>"
+            assert last_key is not None
+
+            results, last_key = search_todos(user_id, "milk", 1, last_key, conn)
+            assert [x.id for x, _ in results] == [std_todo_list[0].id]
+            assert last_key is None
+
+            if get_db_backend() == "postgresql":  # sqlite only matches the search text as is
+                results, _ = search_todos(user_id, "walking dogs", 10, None, conn)
+                assert [x.id for x, _ in results] == [std_todo_list[2].id]
+                assert search_todos(user_id, "milk -bread", 10, None, conn)[0][0][0].id == std_todo_list[0].id
+    except Exception as e:
+        raise e
+
+
+def test_todo_page_filter_and_sort(std_user, std_todo_list):
+    try:
+        with TransactionManager(debug=True) as conn:
+            user_id = save_user(std_user, conn)
+
+            priorities = [PriorityType.OPTIONAL, PriorityType.URGENT, PriorityType.NORMAL]
+            for x, priority in zip(std_todo_list, priorities):
+                x.user_id = user_id
+                x.priority = priority
+                x.id = save_todo(x, conn)
+
+            query = TodoQuery(sort="priority")
+            first_page, last_key = get_todos_page_from_user(user_id, query, 2, None, conn)
+            assert [x.priority for x in first_page] == [PriorityType.URGENT, PriorityType.NORMAL]
+            assert last_key == (PriorityType.NORMAL, first_page[-1].id)
+
+            second_page, last_key = get_todos_page_from_user(user_id, query, 2, last_key, conn)
+            assert [x.priority for x in second_page] == [PriorityType.OPTIONAL]
+            assert last_key is None
 
+            query = TodoQuery(priority={PriorityType.URGENT, PriorityType.OPTIONAL}, completed=False)
+            todos, _ = get_todos_page_from_user(user_id, query, 10, None, conn)
+            assert {x.id for x in todos} == {std_todo_list[0].id, std_todo_list[1].id}
     except Exception as e:
         raise e
@@ -0,0 +1,30 @@
+import os
+
+from sqlalchemy import create_engine
+
+from src.data import db
+
+
+def test_get_engine_is_lazy_and_fork_aware(monkeypatch):
+    created = []
+
+    def _db_init():
+        created.append(create_engine("sqlite+pysqlite://"))
+        return created[-1]
+
+    monkeypatch.setattr(db, "_db_init", _db_init)
+    monkeypatch.setattr(db, "_engine", None)
+    monkeypatch.setattr(db, "_engine_pid", None)
+
+    engine = db.get_engine()
+    assert created == [engine]
+    assert db.get_engine() is engine
+
+    disposed = []
+    monkeypatch.setattr(engine, "dispose", lambda close=True: disposed.append(close))
+    parent_pid = os.getpid()
+    monkeypatch.setattr(os, "getpid", lambda: parent_pid + 1)  # as seen from a forked worker
+
+    assert db.get_engine() is engine
+    assert disposed == [False]  # the parent's connections are left open for it
+    assert db.get_engine() is engine and disposed == [False]
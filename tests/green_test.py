@@ -0,0 +1,50 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+
+from src.data import db
+
+gevent = pytest.importorskip("gevent")
+
+
+def test_transaction_manager_scope_per_greenlet(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "_engine", create_engine(f"sqlite+pysqlite:///{tmp_path / 'green.db'}"))
+    monkeypatch.setattr(db, "_engine_pid", os.getpid())
+    connections = {}
+
+    def handle(request_id: int):
+        db.begin_connection_scope()
+        try:
+            with db.TransactionManager() as conn:
+                gevent.sleep(0)  # lets the other request run in between
+                with db.TransactionManager() as nested:
+                    assert nested is conn
+                connections[request_id] = conn
+        finally:
+            db.end_connection_scope()
+
+    gevent.joinall([gevent.spawn(handle, x) for x in range(2)], raise_error=True)
+
+    assert connections[0] is not connections[1]
+
+
+def test_create_app_makes_psycopg2_green_before_connecting(monkeypatch):
+    from gevent import monkey
+
+    import src.main
+    from src.data import green
+
+    calls = []
+    monkeypatch.setenv("SERVER_MODE", "gevent")
+    monkeypatch.setenv("DB_BACKEND", "postgresql")
+    monkeypatch.setattr(monkey, "is_module_patched", lambda module: True)
+    monkeypatch.setattr(green, "make_psycopg2_green", lambda: calls.append("green"))
+    monkeypatch.setattr(src.main, "init_logging", lambda: None)
+    # stops create_app right after the ping
+    monkeypatch.setattr(src.main, "ping_db", lambda: calls.append("ping") and False)
+
+    with pytest.raises(Exception, match="Database must be started"):
+        src.main.create_app()
+
+    assert calls == ["green", "ping"]
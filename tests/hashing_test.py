@@ -0,0 +1,73 @@
+import subprocess
+import sys
+
+import pytest
+
+from src.core.hashing import HashingUnavailable, PasswordHasher
+
+
+def make_hasher(method: str) -> PasswordHasher:
+    return PasswordHasher(workers=0, queue_depth=1, method=method, salt_length=16, timeout=10)
+
+
+def test_hash_and_verify():
+    hasher = make_hasher("pbkdf2:sha256:1000")
+    password_hash = hasher.hash("test_password")
+
+    assert hasher.verify(password_hash, "test_password")
+    assert not hasher.verify(password_hash, "wrong_password")
+
+
+def test_needs_rehash():
+    old_hasher = make_hasher("pbkdf2:sha256:1000")
+    new_hasher = make_hasher("pbkdf2:sha256:2000")
+    password_hash = old_hasher.hash("test_password")
+
+    assert not old_hasher.needs_rehash(password_hash)
+    assert new_hasher.needs_rehash(password_hash)
+    assert new_hasher.verify(password_hash, "test_password")
+
+
+def test_needs_rehash_expands_the_method_defaults():
+    hasher = make_hasher("scrypt")
+    password_hash = hasher.hash("test_password")
+
+    assert password_hash.startswith("scrypt:32768:8:1$")
+    assert not hasher.needs_rehash(password_hash)
+
+
+def test_hashing_pool():
+    hasher = PasswordHasher(workers=1, queue_depth=1, method="pbkdf2:sha256:1000", salt_length=16, timeout=30)
+    try:
+        password_hash = hasher.hash("test_password")
+
+        assert hasher.verify(password_hash, "test_password")
+        assert not hasher.verify(password_hash, "wrong_password")
+    finally:
+        hasher.shutdown()
+
+
+def test_hashing_pool_rejects_jobs_past_its_queue_depth():
+    # slow enough to still be running once the caller stopped waiting for it
+    hasher = PasswordHasher(workers=1, queue_depth=1, method="pbkdf2:sha256:2000000", salt_length=16, timeout=0.1)
+    try:
+        with pytest.raises(HashingUnavailable, match="timed out"):
+            hasher.hash("test_password")
+
+        # the job that timed out still holds the only slot until it is done
+        with pytest.raises(HashingUnavailable, match="queue is full"):
+            hasher.hash("test_password")
+    finally:
+        hasher.shutdown()
+
+
+def test_importing_doesnt_read_the_config():
+    # in a fresh interpreter, since the modules are already imported here
+    code = (
+        "import dotenv\n"
+        "def load_dotenv(*args, **kwargs): raise AssertionError('load_dotenv called at import')\n"
+        "dotenv.load_dotenv = load_dotenv\n"
+        "import src.data, src.core.hashing\n"
+        "assert src.core.hashing._password_hasher is None\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,39 @@
+import json
+from datetime import datetime
+
+from flask import Flask
+
+from src.common import PriorityType
+from src.routes import FastJSONProvider
+from src.routes.responses import success_response
+
+
+def _app(compact: bool) -> Flask:
+    app = Flask(__name__)
+    json_provider = FastJSONProvider(app)
+    json_provider.compact = compact
+    app.json = json_provider
+    return app
+
+
+def test_json_provider_encodes_todo_fields():
+    with _app(compact=True).app_context():
+        response = success_response(
+            200,
+            {"date_due": datetime(2025, 1, 2, 3, 4, 5, 6), "priority": PriorityType.URGENT},
+        )
+
+    assert response.mimetype == "application/json"
+    assert json.loads(response.get_data()) == {
+        "status": "success",
+        "code": 200,
+        "data": {"date_due": "2025-01-02T03:04:05.000006", "priority": 1},
+    }
+    assert b"\n" not in response.get_data()
+
+
+def test_json_provider_pretty():
+    app = _app(compact=False)
+
+    assert app.json.dumps({"a": [1, 2]}).count("\n") > 1
+    assert app.json.loads(b'{"a": 1}') == {"a": 1}
@@ -0,0 +1,54 @@
+import json
+import logging
+
+from src.common.log_config import RateLimitFilter, init_logging, stop_logging
+
+
+def _record(name: str = "TODOROUTE", level: int = logging.WARNING) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, "Validation error: %s", ("bad",), None)
+
+
+def test_rate_limit_filter():
+    rate_filter = RateLimitFilter(limit=2, window=60, sample_every=3)
+
+    kept = [rate_filter.filter(_record()) for _ in range(8)]
+
+    assert kept == [True, True, False, False, True, False, False, True]
+    assert rate_filter.filter(_record(level=logging.INFO))  # below the limited levels
+    assert rate_filter.filter(_record(name="USERROUTE"))  # counted per logger
+
+
+def test_rate_limit_filter_reports_suppressed():
+    rate_filter = RateLimitFilter(limit=1, window=0, sample_every=0)
+    rate_filter.filter(_record())
+
+    # every record opens a new window since it is 0 seconds long
+    record = _record()
+    assert rate_filter.filter(record)
+    assert record.suppressed == 0
+
+
+def test_init_logging_writes_json_lines(tmp_path, monkeypatch):
+    log_file = tmp_path / "app.log"
+    monkeypatch.setenv("LOG_FILE", str(log_file))
+    monkeypatch.setenv("LOG_FORMAT", "json")
+    monkeypatch.setenv("LOG_LEVELS", "TODODAL=ERROR")
+
+    try:
+        init_logging()
+        logging.getLogger("TODOROUTE").warning("Validation error in POST todo route: %s", "bad date")
+        logging.getLogger("TODODAL").warning("filtered out by its level")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("TODOROUTE").exception("Unkwown error in POST todo route")
+    finally:
+        stop_logging()  # flushes the queue
+
+    lines = [json.loads(x) for x in log_file.read_text().splitlines()]
+    assert [x["message"] for x in lines] == [
+        "Validation error in POST todo route: bad date",
+        "Unkwown error in POST todo route",
+    ]
+    assert lines[0]["level"] == "WARNING" and lines[0]["logger"] == "TODOROUTE"
+    assert "ValueError: boom" in lines[1]["exception"]
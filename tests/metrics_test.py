@@ -0,0 +1,35 @@
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from src.data.db import install_query_hooks
+from src.routes.metrics import init_metrics
+
+
+def test_server_timing_counts_queries(monkeypatch):
+    monkeypatch.setenv("SERVER_TIMING", "true")
+    engine = create_engine("sqlite+pysqlite://")
+    install_query_hooks(engine)
+
+    app = Flask(__name__)
+    init_metrics(app)
+
+    @app.route("/")
+    def _two_queries():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return "ok"
+
+    response = app.test_client().get("/")
+
+    assert 'desc="2 queries"' in response.headers["Server-Timing"]
+    assert "total;dur=" in response.headers["Server-Timing"]
+
+
+def test_server_timing_disabled(monkeypatch):
+    monkeypatch.delenv("SERVER_TIMING", raising=False)
+    app = Flask(__name__)
+    init_metrics(app)
+    app.add_url_rule("/", "index", lambda: "ok")
+
+    assert "Server-Timing" not in app.test_client().get("/").headers
@@ -0,0 +1,81 @@
+import socket
+import threading
+from types import SimpleNamespace
+
+from src.data.notifications import TodoChangeListener
+
+
+class _FakeConnection:
+    # a psycopg2 connection as seen by the listener, the notifications go through a socket pair
+    def __init__(self):
+        self.reader, self.writer = socket.socketpair()
+        self.notifies = []
+        self.listening = threading.Event()
+
+    def fileno(self):
+        return self.reader.fileno()
+
+    def cursor(self):
+        conn = self
+
+        class _Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def execute(self, sql):
+                if sql.startswith("LISTEN"):
+                    conn.listening.set()
+
+        return _Cursor()
+
+    def poll(self):
+        for payload in self.reader.recv(1024).decode().split():
+            if payload == "drop":
+                raise ConnectionError("Connection lost")
+            self.notifies.append(SimpleNamespace(payload=payload))
+
+    def send(self, payload: str):
+        self.writer.send(f"{payload} ".encode())
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+
+
+def test_listener_dispatches_to_user_subscriptions():
+    listener = TodoChangeListener(lambda: None)
+    first, second, other = listener.subscribe(1), listener.subscribe(1), listener.subscribe(2)
+
+    listener.dispatch("1")
+    assert first.wait(0) and second.wait(0)
+    assert not first.wait(0)
+    assert not other.wait(0)
+
+    listener.unsubscribe(first)
+    listener.dispatch("1")
+    listener.dispatch("malformed")
+    assert not first.wait(0)
+    assert second.wait(0)
+
+
+def test_listener_resyncs_after_reconnecting():
+    connections = [_FakeConnection(), _FakeConnection()]
+    pending = list(connections)
+    listener = TodoChangeListener(lambda: pending.pop(0), reconnect_delay=0, check_interval=0.1)
+    subscription = listener.subscribe(1)
+    listener.start()
+    try:
+        assert connections[0].listening.wait(2)
+        connections[0].send("2")
+        connections[0].send("1")
+        assert subscription.wait(2)
+
+        # the changes made while reconnecting weren't notified, so every subscription is
+        connections[0].send("drop")
+        assert connections[1].listening.wait(2)
+        assert subscription.wait(2)
+    finally:
+        listener.stop(timeout=2)
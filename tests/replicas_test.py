@@ -0,0 +1,86 @@
+import os
+
+import sqlite3
+
+from sqlalchemy import create_engine, text
+
+from src.data import db
+from src.data.replicas import ReplicaSet
+
+
+def _engine(path, name: str):
+    engine = create_engine(f"sqlite+pysqlite:///{path / name}.db")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE server (name VARCHAR)"))
+        conn.execute(text("INSERT INTO server VALUES (:name)"), {"name": name})
+    return engine
+
+
+def _server(conn) -> str:
+    return conn.execute(text("SELECT name FROM server")).scalar()
+
+
+def test_replica_set_skips_lagging_replicas(tmp_path):
+    first, second = _engine(tmp_path, "first"), _engine(tmp_path, "second")
+    lags = {first: 0.0, second: 0.0}
+    replicas = ReplicaSet([first, second], max_lag=5, check_interval=0, measure_lag=lambda x: lags[x])
+
+    assert [replicas.choose() for _ in range(4)] == [first, second, first, second]
+
+    lags[first] = 10
+    assert [replicas.choose() for _ in range(2)] == [second, second]
+
+    lags[second] = float("inf")
+    assert replicas.choose() is None
+
+
+def test_transaction_manager_routes_reads(tmp_path, monkeypatch):
+    replica = _engine(tmp_path, "replica")
+    monkeypatch.setattr(db, "_engine", _engine(tmp_path, "primary"))
+    monkeypatch.setattr(db, "_engine_pid", os.getpid())
+    monkeypatch.setattr(db, "_replicas", ReplicaSet([replica], 5, 0, measure_lag=lambda x: 0))
+
+    db.begin_connection_scope()
+    try:
+        with db.TransactionManager(read_only=True) as conn:
+            assert _server(conn) == "replica"
+        with db.TransactionManager() as conn:
+            assert _server(conn) == "primary"
+            with db.TransactionManager(read_only=True) as nested:  # sees the writes of the outer transaction
+                assert _server(nested) == "primary"
+    finally:
+        db.end_connection_scope()
+
+    db.begin_connection_scope(read_from_primary=True)  # ex. right after a change by the same user
+    try:
+        with db.TransactionManager(read_only=True) as conn:
+            assert _server(conn) == "primary"
+    finally:
+        db.end_connection_scope()
+
+
+def test_transaction_manager_falls_back_to_primary(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "_engine", _engine(tmp_path, "primary"))
+    monkeypatch.setattr(db, "_engine_pid", os.getpid())
+    lagging = ReplicaSet([_engine(tmp_path, "replica")], 5, 0, measure_lag=lambda x: 60)
+    monkeypatch.setattr(db, "_replicas", lagging)
+
+    with db.TransactionManager(read_only=True) as conn:
+        assert _server(conn) == "primary"
+
+
+def test_transaction_manager_falls_back_to_primary_when_a_replica_is_down(tmp_path, monkeypatch):
+    def _connect():
+        raise sqlite3.OperationalError("unable to open database file")
+
+    down = create_engine("sqlite+pysqlite://", creator=_connect)
+    monkeypatch.setattr(db, "_engine", _engine(tmp_path, "primary"))
+    monkeypatch.setattr(db, "_engine_pid", os.getpid())
+    replicas = ReplicaSet([down], 5, 60, measure_lag=lambda x: 0)
+    monkeypatch.setattr(db, "_replicas", replicas)
+
+    with db.TransactionManager(read_only=True) as conn:
+        assert _server(conn) == "primary"
+
+    # skipped until its next lag check instead of failing every read meanwhile
+    assert replicas.choose() is None
@@ -0,0 +1,179 @@
+from datetime import datetime
+
+from src.common import encode_cursor
+from src.data import TransactionManager, get_user_id
+from src.routes.todo_common import MAX_BULK_SIZE
+
+
+def _todo(description: str = "This is a todo", **fields) -> dict:
+    return {
+        "description": description,
+        "date_due": datetime.now().isoformat(),
+        "priority": 2,
+        "completed": False,
+        **fields,
+    }
+
+
+def _post_todos(client, todos) -> list:
+    response = client.post("/todos/bulk", json={"todos": todos})
+    assert response.status_code == 201
+    return [x["id"] for x in response.get_json()["data"]["results"]]
+
+
+def _get_todos(client) -> list:
+    response = client.get("/todos/")
+    assert response.status_code == 200
+    return response.get_json()["data"]
+
+
+def test_post_todos_bulk(client):
+    response = client.post(
+        "/todos/bulk", json={"todos": [_todo("first"), {"description": "no other fields"}, _todo("third")]}
+    )
+
+    assert response.status_code == 201
+    results = response.get_json()["data"]["results"]
+    assert set(results[1]) == {"error"}
+    assert [x["description"] for x in _get_todos(client)] == ["first", "third"]
+    assert [x["id"] for x in _get_todos(client)] == [results[0]["id"], results[2]["id"]]
+
+
+def test_todos_bulk_size_limit(client):
+    too_many = [_todo() for _ in range(MAX_BULK_SIZE + 1)]
+
+    assert client.post("/todos/bulk", json={"todos": too_many}).status_code == 400
+    assert client.put("/todos/bulk", json={"todos": too_many}).status_code == 400
+    assert client.delete("/todos/bulk", json={"ids": list(range(MAX_BULK_SIZE + 1))}).status_code == 400
+    assert _get_todos(client) == []
+
+
+def test_put_todos_bulk(login):
+    client, other_client = login(), login()
+    own_id = _post_todos(client, [_todo("own")])[0]
+    _post_todos(other_client, [_todo("other")])
+    own, other = _get_todos(client)[0], _get_todos(other_client)[0]
+
+    response = client.put(
+        "/todos/bulk",
+        json={"todos": [{**own, "completed": True}, {**other, "completed": True}, {"id": own_id}]},
+    )
+
+    assert response.status_code == 201
+    results = response.get_json()["data"]["results"]
+    assert results[0] == {"id": own_id}
+    assert results[1] == {"error": "Todo not found"}
+    assert set(results[2]) == {"error"}
+    assert _get_todos(client)[0]["completed"]
+    assert _get_todos(other_client)[0] == other
+
+
+def test_put_todos_bulk_duplicate_ids(client):
+    _post_todos(client, [_todo("first")])
+    todo = _get_todos(client)[0]
+
+    response = client.put(
+        "/todos/bulk",
+        json={"todos": [{**todo, "description": "kept"}, {**todo, "description": "dropped"}]},
+    )
+
+    assert response.status_code == 201
+    assert response.get_json()["data"]["results"] == [{"id": todo["id"]}, {"error": "Duplicate todo id"}]
+    assert _get_todos(client)[0]["description"] == "kept"
+
+
+def test_delete_todos_bulk(login):
+    client, other_client = login(), login()
+    own_ids = _post_todos(client, [_todo("first"), _todo("second")])
+    other_id = _post_todos(other_client, [_todo("other")])[0]
+
+    response = client.delete("/todos/bulk", json={"ids": [own_ids[0], other_id, own_ids[1]]})
+
+    assert response.status_code == 200
+    assert response.get_json()["data"]["results"] == [
+        {"id": own_ids[0]},
+        {"error": "Todo not found"},
+        {"id": own_ids[1]},
+    ]
+    assert _get_todos(client) == []
+    assert [x["id"] for x in _get_todos(other_client)] == [other_id]
+
+
+def test_todo_list_not_modified(client):
+    _post_todos(client, [_todo("first")])
+    etag = client.get("/todos/").headers["ETag"]
+
+    response = client.get("/todos/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+    # another representation of the same list
+    assert client.get("/todos/?completed=false").headers["ETag"] != etag
+    assert client.get("/todos/?completed=false", headers={"If-None-Match": etag}).status_code == 200
+
+    _post_todos(client, [_todo("second")])
+    response = client.get("/todos/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.get_json()["data"]) == 2
+
+
+def test_todo_changes(client):
+    first_id, second_id = _post_todos(client, [_todo("first"), _todo("second")])
+
+    response = client.get("/todos/changes")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [x["id"] for x in body["data"]["todos"]] == [first_id, second_id]
+    cursor = body["next_cursor"]
+
+    client.delete("/todos/bulk", json={"ids": [first_id]})
+    body = client.get("/todos/changes", query_string={"since": cursor}).get_json()
+    assert body["data"] == {"todos": [], "deleted": [first_id]}
+    assert body["next_cursor"] != cursor
+
+    unchanged = client.get("/todos/changes", query_string={"since": body["next_cursor"]}).get_json()
+    assert unchanged["data"] == {"todos": [], "deleted": []}
+
+
+def test_todo_changes_bad_cursor(client):
+    for cursor in ["not a cursor", encode_cursor("a"), encode_cursor(1, 2), encode_cursor(True)]:
+        response = client.get("/todos/changes", query_string={"since": cursor})
+        assert response.status_code == 400
+        assert response.get_json()["message"] == "Invalid changes cursor"
+
+
+def test_todo_search(client):
+    _post_todos(
+        client,
+        [_todo("Buy milk"), _todo("Buy <b>bread</b> and milk, then more milk"), _todo("Walk the dog")],
+    )
+
+    response = client.get("/todos/search", query_string={"q": "milk", "limit": 1})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [x["description"] for x in body["data"]] == ["Buy <b>bread</b> and milk, then more milk"]
+    assert body["data"][0]["highlight"] == (
+        "Buy &lt;b&gt;bread&lt;/b&gt; and <mark>milk</mark>, then more <mark>milk</mark>"
+    )
+
+    body = client.get("/todos/search", query_string={"q": "milk", "limit": 1, "after": body["next_cursor"]}).get_json()
+    assert [x["highlight"] for x in body["data"]] == ["Buy <mark>milk</mark>"]
+    assert body["next_cursor"] is None
+
+
+def test_todo_search_bad_args(client):
+    assert client.get("/todos/search").status_code == 400
+    assert client.get("/todos/search", query_string={"q": "x" * 257}).status_code == 400
+    assert client.get("/todos/search", query_string={"q": "milk", "limit": 0}).status_code == 400
+    assert client.get("/todos/search", query_string={"q": "milk", "after": encode_cursor("a", 1)}).status_code == 400
+
+
+def test_put_user(client):
+    response = client.put("/users/", json={"username": "renamed_username"})
+
+    assert response.status_code == 201
+    user_id = response.get_json()["data"]["id"]
+    with TransactionManager() as conn:
+        assert get_user_id(user_id, conn).username == "renamed_username"
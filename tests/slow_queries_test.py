@@ -0,0 +1,60 @@
+import logging
+
+from sqlalchemy import create_engine, text
+
+from src.data.db import get_db_url, install_query_hooks
+from src.data.slow_queries import SlowQueryLog, _explained_query
+from src.data.statements import execute, statement
+
+
+def test_slow_query_log(tmp_path, caplog):
+    plan_file = tmp_path / "plans.log"
+    engine = create_engine("sqlite+pysqlite://")
+    install_query_hooks(
+        engine,
+        SlowQueryLog(threshold=0, explain_rate=1, plan_file=str(plan_file), plan_file_bytes=10_000),
+    )
+
+    with caplog.at_level(logging.WARNING, logger="SLOWQUERY"):
+        with engine.connect() as conn:
+            conn.execute(text("CREATE TABLE users (username VARCHAR, password VARCHAR)"))
+            conn.execute(
+                text("SELECT username FROM users WHERE username = :username AND password = :password"),
+                {"username": "test_username", "password": "test_password"},
+            )
+
+    assert "test_username" in caplog.text
+    assert "test_password" not in caplog.text
+    assert "[REDACTED]" in caplog.text
+    assert "SCAN users" in plan_file.read_text()
+
+
+def test_slow_query_log_explains_prepared_reads():
+    read = statement("test.slow_prepared_read", "SELECT id FROM todos WHERE id = :id")
+    write = statement("test.slow_prepared_write", "DELETE FROM todos WHERE id = :id")
+
+    assert _explained_query(f"EXECUTE {read.prepared_name}(%(id)s)") == read.sql
+    assert _explained_query(f"EXECUTE {write.prepared_name}(%(id)s)") is None
+    assert _explained_query("EXECUTE unknown_statement") is None
+    assert _explained_query(" SELECT 1") == "SELECT 1"
+
+
+def test_slow_query_log_prepared_plan(tmp_path, monkeypatch, postgres_db):
+    monkeypatch.setenv("DB_PREPARED_STATEMENTS", "true")
+    plan_file = tmp_path / "plans.log"
+    engine = create_engine(get_db_url())
+    install_query_hooks(
+        engine,
+        SlowQueryLog(threshold=0, explain_rate=1, plan_file=str(plan_file), plan_file_bytes=10_000),
+    )
+    stmt = statement("test.slow_prepared_plan", "SELECT CAST(:value AS integer) + 1 AS value")
+
+    try:
+        with engine.connect() as conn:
+            assert execute(conn, stmt, {"value": 1}).scalar() == 2
+    finally:
+        engine.dispose()
+
+    plans = plan_file.read_text()
+    assert stmt.sql in plans
+    assert "Execution Time" in plans
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+
+from src.data.db import get_engine
+from src.data.statements import execute, invalidate_prepared_statements, statement
+
+
+def test_statement_prepared_version():
+    stmt = statement(
+        "test.prepared_version",
+        "SELECT CAST(:value AS integer[]) FROM todos WHERE id = :id AND user_id = :user_id "
+        + "AND :id > 0",
+    )
+
+    assert stmt.prepare_sql.startswith(f"PREPARE {stmt.prepared_name} AS ")
+    assert stmt.prepare_sql.endswith(
+        "SELECT CAST($1 AS integer[]) FROM todos WHERE id = $2 AND user_id = $3 AND $2 > 0"
+    )
+    assert str(stmt.execute_clause) == f"EXECUTE {stmt.prepared_name}(:value, :id, :user_id)"
+
+
+def test_statement_skips_casts():
+    stmt = statement("test.skips_casts", "SELECT :value::text")
+
+    assert stmt.prepare_sql.endswith("SELECT $1::text")
+
+
+def test_statement_registry():
+    stmt = statement("test.registry", "SELECT 1")
+
+    assert statement("test.registry", "SELECT 1") is stmt
+    with pytest.raises(ValueError):
+        statement("test.registry", "SELECT 2")
+
+
+def test_statement_sqlite_variant():
+    stmt = statement(
+        "test.sqlite_variant",
+        "SELECT value FROM UNNEST(CAST(:values AS timestamp[])) AS value",
+        variants={"sqlite": "SELECT value FROM json_each(:values) ORDER BY key"},
+    )
+    engine = create_engine("sqlite+pysqlite://")
+
+    with engine.connect() as conn:
+        rows = execute(conn, stmt, {"values": [datetime(2025, 1, 1), None]}).fetchall()
+
+    assert [x.value for x in rows] == ["2025-01-01 00:00:00.000000", None]
+
+
+def test_statement_prepared_execution(monkeypatch, postgres_db):
+    monkeypatch.setenv("DB_PREPARED_STATEMENTS", "true")
+    stmt = statement("test.prepared_execution", "SELECT CAST(:value AS integer) + 1 AS value")
+
+    with get_engine().connect() as conn:
+        assert execute(conn, stmt, {"value": 1}).scalar() == 2
+        assert execute(conn, stmt, {"value": 2}).scalar() == 3
+
+        info = conn.connection.info  # may come from the pool with other statements already prepared
+        assert stmt.prepared_name in info["prepared_statements"]
+        generation = info["prepared_generation"]
+
+        # preparing it again would fail if the connection hadn't dropped the previous one
+        invalidate_prepared_statements()
+        assert execute(conn, stmt, {"value": 3}).scalar() == 4
+        assert info["prepared_generation"] == generation + 1
+        assert info["prepared_statements"] == {stmt.prepared_name}
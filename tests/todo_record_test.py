@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from src.common import PriorityType
+from src.core import Todo, TodoRecord
+
+
+def test_todo_record_matches_todo():
+    record = TodoRecord(
+        id=1,
+        user_id=1,
+        description="This is a todo",
+        date_created=datetime.now(),
+        date_due=None,
+        priority=PriorityType.URGENT,
+        completed=False,
+    )
+    todo = record.to_todo()
+
+    assert record.to_dict() == todo.model_dump()
+    assert todo == record
+    assert record == todo